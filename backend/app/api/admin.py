@@ -0,0 +1,87 @@
+import hmac
+
+from fastapi import APIRouter, Depends, Header, Query
+
+from app.config import settings
+from app.core.exceptions import AdminAuthError
+from app.core.generations import generations
+from app.core.priority import priorities
+from app.core.workers import worker_control
+from app.providers.key_pool import key_pools
+
+
+def require_admin(x_admin_token: str | None = Header(None)) -> None:
+    """Admin endpoints need X-Admin-Token to match ADMIN_TOKEN; without ADMIN_TOKEN they are disabled."""
+    if not settings.admin_token:
+        raise AdminAuthError("Admin endpoints are disabled; set ADMIN_TOKEN to enable them.")
+    if not hmac.compare_digest(x_admin_token or "", settings.admin_token):
+        raise AdminAuthError()
+
+
+router = APIRouter(dependencies=[Depends(require_admin)])
+
+
+# Each forked worker has its own generation registry, so these commands run in all of them
+@worker_control.command("list_generations")
+def _list_generations(provider: str | None) -> list[dict]:
+    return generations.list(provider)
+
+
+@worker_control.command("cancel_generation")
+def _cancel_generation(generation_id: str) -> int:
+    return 1 if generations.cancel(generation_id) else 0
+
+
+@worker_control.command("cancel_provider")
+def _cancel_provider(provider: str, model: str | None) -> int:
+    return generations.cancel_provider(provider, model)
+
+
+@router.get("/generations")
+def list_generations(provider: str | None = Query(None)) -> dict:
+    """
+    In-flight provider calls and streams, across all workers, with their
+    endpoint, user, client, provider/model, start time, tokens so far and
+    current output rate.
+    """
+    active = [
+        generation
+        for worker in worker_control.broadcast("list_generations", provider=provider)
+        for generation in worker
+    ]
+    return {"count": len(active), "generations": active}
+
+
+@router.delete("/generations/{generation_id}")
+def cancel_generation(generation_id: str) -> dict:
+    """Cancel one generation, breaking its upstream connection."""
+    return {"cancelled": sum(worker_control.broadcast("cancel_generation", generation_id=generation_id))}
+
+
+@router.delete("/generations")
+def cancel_provider_generations(
+    provider: str = Query(..., description="Cancel every generation on this provider"),
+    model: str | None = Query(None, description="Only those on this model"),
+) -> dict:
+    """Shed load from one provider (or model) during an incident, on every worker."""
+    return {"cancelled": sum(worker_control.broadcast("cancel_provider", provider=provider, model=model))}
+
+
+@router.get("/keys")
+def get_key_pools() -> dict:
+    """
+    Per provider, each server API key (masked) with its remaining request and
+    token quota from the latest rate-limit headers, headroom, 429 cooldown
+    and how often it was picked.
+    """
+    return key_pools.snapshot()
+
+
+@router.get("/priorities")
+def get_priorities() -> dict:
+    """
+    Interactive and background concurrency pools (limit, active, waiting),
+    and the interactive p95 time to first token that the background limit
+    backs off on.
+    """
+    return priorities.snapshot()
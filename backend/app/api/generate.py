@@ -1,27 +1,49 @@
+import asyncio
 import json
 import logging
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from typing import Iterator
 
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Request, Response, WebSocket, WebSocketDisconnect
 from fastapi.responses import StreamingResponse
+from pydantic import ValidationError
 
-from app.schema.generation import GenerateRequest, GenerateResponse
-from app.providers import get_provider
+from app.schema.generation import BulkImagePromptRequest, GenerateRequest, GenerateResponse
+from app.providers import DEFAULT_MODELS, LLMProvider, get_provider
+from app.providers.routing import model_router
 from app.text_generation.generator_next import TextGeneratorNext
 from app.text_generation.generator_between import TextGeneratorBetween
 from app.text_generation.generator_start import TextGeneratorStart
+from app.text_generation.generator_summary import TextGeneratorSummary
 from app.text_generation.generator_modify import TextGeneratorModify
 from app.text_generation.generator_image_prompt import TextGeneratorImagePrompt
 from app.text_generation.generator_start_lore import TextGeneratorStartLore
-from app.core.exceptions import GenerationError, ProviderError
+from app.text_generation.lore import LoreVersion, lore_fields
+from app.text_generation.markdown_filter import strip_markdown, strip_markdown_stream
+from app.text_generation.story_memory import StoryMemory
+from app.text_generation.repetition import get_repetition_detector, repetition_stats, trim_repetition
+from app.core.exceptions import GenerationCancelledError, GenerationError, InvalidRequestError, ProviderError
+from app.config import settings
+from app.core.channel import ERROR_FRAME, GenerationChannel, channel_connections
+from app.core.lifecycle import lifecycle
+from app.core.lore_store import lore_store
+from app.core.priority import endpoint_priority
+from app.core.rate_limit import get_client_ip, rate_limiter
+from app.core.speculation import speculation, speculation_key
+from app.core.story_sessions import StorySession, story_sessions
+from app.core.usage import user_id_for
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
 
-def _handle_generation_error(e: Exception, provider_name: str | None) -> None:
-    """Convert various exceptions to appropriate HTTP errors."""
+def _handle_generation_error(e: Exception, provider_name: str | None, provider: LLMProvider | None = None) -> None:
+    """
+    Convert various exceptions to appropriate HTTP errors. Failures after
+    `provider` was built count against its circuit, under the provider
+    actually used (the one provider="auto" picked, not "auto").
+    """
     error_msg = str(e)
     logger.error(f"Generation error with provider '{provider_name}': {error_msg}")
 
@@ -29,6 +51,9 @@ def _handle_generation_error(e: Exception, provider_name: str | None) -> None:
     if isinstance(e, HTTPException):
         raise e
 
+    if provider is not None:
+        lifecycle.record_upstream(provider.name, ok=False)
+
     # Handle specific provider errors
     if "api_key" in error_msg.lower() or "authentication" in error_msg.lower():
         raise ProviderError(provider_name or "unknown", "Authentication failed. Check your API key.")
@@ -43,6 +68,75 @@ def _handle_generation_error(e: Exception, provider_name: str | None) -> None:
     raise GenerationError(error_msg)
 
 
+def _resolve_story(request: GenerateRequest) -> tuple[str, StorySession | None]:
+    """Return the story text and, when the request references one, the session it was read from."""
+    if request.session_id:
+        session = story_sessions.get(request.session_id, request.session_hash)
+        return session.text, session
+    return request.text, None
+
+
+def _resolve_story_text(request: GenerateRequest) -> str:
+    """Return the story text, reading it from the session store when referenced."""
+    return _resolve_story(request)[0]
+
+
+def _resolve_lore(request: GenerateRequest):
+    """
+    Return the stored version for `lore_ref`, or the inline lore. Inline
+    LoreItem models are already validated and are handed to the generators
+    as-is rather than copied into dicts.
+    """
+    if request.lore_ref:
+        return lore_store.resolve(request.lore_ref)
+    return request.lore or None
+
+
+def _get_provider(request: GenerateRequest, endpoint: str, client: str | None = None) -> LLMProvider:
+    """
+    The request's provider, tagged so its token usage is attributed to the
+    user and endpoint and its generations show who they're for, with the
+    request's priority class (the endpoint's unless the request overrides it).
+    """
+    provider = get_provider(
+        provider_name=request.provider,
+        api_key=request.api_key,
+        model=request.model
+    )
+    provider.usage_tags = {"user": user_id_for(request.api_key), "endpoint": endpoint}
+    provider.client = client
+    provider.priority = request.priority or endpoint_priority(endpoint)
+    return provider
+
+
+def _story_memory(request: GenerateRequest, provider: LLMProvider, session: StorySession | None = None) -> StoryMemory | None:
+    """
+    Build the rolling-summary memory for long stories, if enabled. Summaries
+    run on the request's provider (the routed one for "auto") at its priority.
+    A story session's paragraph index is reused, so only the paragraphs
+    edited since the last request are re-scanned.
+    """
+    enabled = settings.story_memory_enabled if request.story_memory is None else request.story_memory
+    if not enabled:
+        return None
+
+    summarizer = get_provider(
+        provider_name=provider.name,
+        # Auto-routed providers run on the server's keys
+        api_key=None if provider.route else request.api_key,
+        model=settings.story_memory_model or DEFAULT_MODELS.get(provider.name)
+    )
+    summarizer.usage_tags = {"user": user_id_for(request.api_key), "endpoint": "story-memory"}
+    summarizer.priority = provider.priority
+    return StoryMemory(
+        TextGeneratorSummary(summarizer),
+        window_chars=settings.story_memory_window_chars,
+        block_words=settings.story_memory_block_words,
+        fanout=settings.story_memory_fanout,
+        index=session.index if session is not None else None,
+    )
+
+
 def _sse_format(chunks: Iterator[str]) -> Iterator[str]:
     """Format chunks as Server-Sent Events."""
     for chunk in chunks:
@@ -52,12 +146,71 @@ def _sse_format(chunks: Iterator[str]) -> Iterator[str]:
     yield "data: [DONE]\n\n"
 
 
-def _sse_format_with_error_handling(chunks: Iterator[str], provider_name: str | None) -> Iterator[str]:
-    """Format chunks as SSE with error handling for streaming."""
+def _guard_stream(
+    chunks: Iterator[str],
+    endpoint: str,
+    clean_markdown: bool = False,
+    provider_name: str | None = None,
+) -> Iterator[tuple[str, object]]:
+    """
+    Run generated chunks through the output filters, yielding `("text", chunk)`
+    and at most one final `("repetition", {"trim", "length"})` event.
+
+    With `clean_markdown` set, markdown syntax is removed incrementally. If
+    the output falls into a repetition loop the upstream stream is closed and
+    the event tells the client how many already-sent characters to trim.
+    Whether the upstream stream completed is recorded for readiness against
+    `provider_name`, the name of the provider actually streaming.
+    """
+    detector = get_repetition_detector(endpoint)
+    if clean_markdown:
+        chunks = strip_markdown_stream(chunks)
+    sent = 0
     try:
         for chunk in chunks:
-            data = json.dumps({"text": chunk})
-            yield f"data: {data}\n\n"
+            cut = detector.feed(chunk) if detector else None
+            if cut is None:
+                sent += len(chunk)
+                yield "text", chunk
+                continue
+
+            if cut > sent:
+                yield "text", chunk[:cut - sent]
+            trimmed = max(sent - cut, 0)
+            repetition_stats.record(endpoint, True, trimmed)
+            logger.warning(f"Repetition loop detected on '{endpoint}', trimmed {trimmed} chars")
+            yield "repetition", {"trim": trimmed, "length": cut}
+            if provider_name:
+                lifecycle.record_upstream(provider_name, ok=True)
+            return
+
+        if detector:
+            repetition_stats.record(endpoint, False)
+        if provider_name:
+            lifecycle.record_upstream(provider_name, ok=True)
+    except GenerationCancelledError:
+        raise
+    except Exception:
+        if provider_name:
+            lifecycle.record_upstream(provider_name, ok=False)
+        raise
+    finally:
+        chunks.close()
+
+
+def _sse_format_with_error_handling(
+    chunks: Iterator[str],
+    provider_name: str | None,
+    endpoint: str,
+    clean_markdown: bool = False,
+) -> Iterator[str]:
+    """Format filtered chunks as SSE with error handling for streaming."""
+    try:
+        for kind, data in _guard_stream(chunks, endpoint, clean_markdown, provider_name):
+            if kind == "repetition":
+                yield f"event: repetition\ndata: {json.dumps({'repetition': data})}\n\n"
+            else:
+                yield f"data: {json.dumps({'text': data})}\n\n"
         yield "data: [DONE]\n\n"
     except Exception as e:
         error_msg = str(e)
@@ -68,192 +221,374 @@ def _sse_format_with_error_handling(chunks: Iterator[str], provider_name: str |
         yield "data: [DONE]\n\n"
 
 
+def _route_headers(provider: LLMProvider) -> dict:
+    """Response headers reporting which model provider="auto" picked and why."""
+    if provider.route is None:
+        return {}
+    return {
+        "X-Route-Provider": provider.name,
+        "X-Route-Model": provider.model,
+        "X-Route-Class": provider.route["class"],
+        "X-Route-Reason": provider.route["reason"],
+    }
+
+
+def _open_stream(
+    endpoint: str, request: GenerateRequest, client: str | None = None
+) -> tuple[Iterator[str], dict, LLMProvider]:
+    """
+    Start the generator behind a streaming endpoint. Returns the chunk stream,
+    extra response headers (the auto-routing decision and, for "next",
+    whether it was served from a speculative run claimed for `client`) and
+    the provider.
+    """
+    provider = _get_provider(request, endpoint, client)
+    lore_data = _resolve_lore(request)
+    headers = _route_headers(provider)
+
+    if endpoint == "next":
+        text, session = _resolve_story(request)
+        # Serve a matching speculative continuation if one was started for this client
+        if settings.speculation_enabled and client is not None:
+            key = speculation_key(
+                text, lore_data, request.provider, request.model,
+                request.additional_instructions, request.word_count, request.story_memory,
+            )
+            run = speculation.claim(client, key)
+            if run is not None:
+                return run.chunks(), {**headers, "X-Speculation": "hit"}, provider
+            headers["X-Speculation"] = "miss"
+
+        generator = TextGeneratorNext(provider, _story_memory(request, provider, session))
+        return generator.stream(
+            text=text,
+            additional_instructions=request.additional_instructions,
+            word_count=request.word_count,
+            lore=lore_data
+        ), headers, provider
+
+    if endpoint == "between":
+        text, session = _resolve_story(request)
+        generator = TextGeneratorBetween(provider, _story_memory(request, provider, session))
+        return generator.stream(
+            text=text,
+            additional_instructions=request.additional_instructions,
+            word_count=request.word_count,
+            current_position=request.current_position,
+            lore=lore_data
+        ), headers, provider
+
+    if endpoint == "modify":
+        generator = TextGeneratorModify(provider, _story_memory(request, provider))
+        return generator.stream(
+            selected_text=request.selected_text or "",
+            additional_instructions=request.additional_instructions or "",
+            lore=lore_data,
+            text_before=request.text_before or "",
+            text_after=request.text_after or "",
+            edit_mode=request.edit_mode,
+        ), headers, provider
+
+    if endpoint == "image-prompt":
+        generator = TextGeneratorImagePrompt(provider)
+        return generator.stream(
+            selected_text=request.selected_text or "",
+            lore=lore_data,
+            text_before=request.text_before or "",
+            text_after=request.text_after or "",
+        ), headers, provider
+
+    if endpoint == "start":
+        generator = TextGeneratorStart(provider)
+        return generator.stream(
+            text=request.text,
+            word_count=request.word_count,
+            lore=lore_data,
+            long_form=request.long_form
+        ), headers, provider
+
+    raise InvalidRequestError(f"Unknown generation endpoint '{endpoint}'")
+
+
+STREAM_ENDPOINTS = ("next", "between", "modify", "image-prompt", "start")
+
+
+@router.get("/repetition-stats")
+def get_repetition_stats() -> dict:
+    """Returns how often repetition detection has fired, per endpoint."""
+    return repetition_stats.snapshot()
+
+
+@router.get("/routing-stats")
+def get_routing_stats() -> dict:
+    """Live latency and error statistics per provider/model used by provider="auto"."""
+    return model_router.snapshot()
+
+
 @router.post("/next")
-def generate_next(request: GenerateRequest) -> GenerateResponse:
+def generate_next(request: GenerateRequest, response: Response, http_request: Request) -> GenerateResponse:
+    provider = None
     try:
-        provider = get_provider(
-            provider_name=request.provider,
-            api_key=request.api_key,
-            model=request.model
-        )
+        provider = _get_provider(request, "next", get_client_ip(http_request))
+        response.headers.update(_route_headers(provider))
 
-        generator = TextGeneratorNext(provider)
-        lore_data = [item.dict() for item in request.lore] if request.lore else None
+        text, session = _resolve_story(request)
+        generator = TextGeneratorNext(provider, _story_memory(request, provider, session))
+        lore_data = _resolve_lore(request)
 
         generated_text = generator.generate(
-            text=request.text,
+            text=text,
             additional_instructions=request.additional_instructions,
             word_count=request.word_count,
             lore=lore_data
         )
 
-        return {"generated_text": generated_text}
+        if request.strip_markdown:
+            generated_text = strip_markdown(generated_text)
+
+        return {"generated_text": trim_repetition(generated_text, "next")}
     except Exception as e:
-        _handle_generation_error(e, request.provider)
+        _handle_generation_error(e, request.provider, provider)
 
 
 @router.post("/between")
-def generate_between(request: GenerateRequest) -> GenerateResponse:
+def generate_between(request: GenerateRequest, response: Response, http_request: Request) -> GenerateResponse:
+    provider = None
     try:
-        provider = get_provider(
-            provider_name=request.provider,
-            api_key=request.api_key,
-            model=request.model
-        )
+        provider = _get_provider(request, "between", get_client_ip(http_request))
+        response.headers.update(_route_headers(provider))
 
-        generator = TextGeneratorBetween(provider)
-        lore_data = [item.dict() for item in request.lore] if request.lore else None
+        text, session = _resolve_story(request)
+        generator = TextGeneratorBetween(provider, _story_memory(request, provider, session))
+        lore_data = _resolve_lore(request)
 
         generated_text = generator.generate(
-            text=request.text,
+            text=text,
             additional_instructions=request.additional_instructions,
             word_count=request.word_count,
             current_position=request.current_position,
             lore=lore_data
         )
 
-        return {"generated_text": generated_text}
+        if request.strip_markdown:
+            generated_text = strip_markdown(generated_text)
+
+        return {"generated_text": trim_repetition(generated_text, "between")}
     except Exception as e:
-        _handle_generation_error(e, request.provider)
+        _handle_generation_error(e, request.provider, provider)
 
 
 @router.post("/start")
-def generate_new_story(request: GenerateRequest) -> GenerateResponse:
+def generate_new_story(request: GenerateRequest, response: Response, http_request: Request) -> GenerateResponse:
+    provider = None
     try:
-        provider = get_provider(
-            provider_name=request.provider,
-            api_key=request.api_key,
-            model=request.model
-        )
+        provider = _get_provider(request, "start", get_client_ip(http_request))
+        response.headers.update(_route_headers(provider))
 
         generator = TextGeneratorStart(provider)
-        lore_data = [item.dict() for item in request.lore] if request.lore else None
+        lore_data = _resolve_lore(request)
 
         generated_text = generator.generate(
             text=request.text,
             word_count=request.word_count,
-            lore=lore_data
+            lore=lore_data,
+            long_form=request.long_form
         )
 
-        return {"generated_text": generated_text}
+        if request.strip_markdown:
+            generated_text = strip_markdown(generated_text)
+
+        return {"generated_text": trim_repetition(generated_text, "start")}
     except Exception as e:
-        _handle_generation_error(e, request.provider)
+        _handle_generation_error(e, request.provider, provider)
 
 
 # Streaming endpoints
 
 @router.post("/next/stream")
-def stream_next(request: GenerateRequest) -> StreamingResponse:
-    # Validate provider config before starting stream
+def stream_next(request: GenerateRequest, http_request: Request) -> StreamingResponse:
     try:
-        provider = get_provider(
-            provider_name=request.provider,
-            api_key=request.api_key,
-            model=request.model
-        )
+        chunks, headers, provider = _open_stream("next", request, get_client_ip(http_request))
     except Exception as e:
         _handle_generation_error(e, request.provider)
 
-    generator = TextGeneratorNext(provider)
-    lore_data = [item.dict() for item in request.lore] if request.lore else None
-
-    chunks = generator.stream(
-        text=request.text,
-        additional_instructions=request.additional_instructions,
-        word_count=request.word_count,
-        lore=lore_data
-    )
-
     return StreamingResponse(
-        _sse_format_with_error_handling(chunks, request.provider),
+        _sse_format_with_error_handling(chunks, provider.name, "next", request.strip_markdown),
         media_type="text/event-stream",
-        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no", **headers}
     )
 
 
-@router.post("/between/stream")
-def stream_between(request: GenerateRequest) -> StreamingResponse:
+@router.post("/next/speculate")
+def speculate_next(request: GenerateRequest, http_request: Request) -> dict:
+    """
+    Start generating the next continuation in the background. Clients call
+    this when the cursor is idle at the end of the story or right after a
+    continuation has been applied; a matching /next/stream is then served
+    from the buffered or still-running result.
+    """
+    if not settings.speculation_enabled:
+        return {"started": False, "reason": "speculation is disabled"}
+
+    client = get_client_ip(http_request)
     try:
-        provider = get_provider(
-            provider_name=request.provider,
-            api_key=request.api_key,
-            model=request.model
-        )
+        provider = _get_provider(request, "next/speculate", client)
+        text, session = _resolve_story(request)
     except Exception as e:
         _handle_generation_error(e, request.provider)
 
-    generator = TextGeneratorBetween(provider)
-    lore_data = [item.dict() for item in request.lore] if request.lore else None
+    generator = TextGeneratorNext(provider, _story_memory(request, provider, session))
+    lore_data = _resolve_lore(request)
+    key = speculation_key(
+        text, lore_data, request.provider, request.model,
+        request.additional_instructions, request.word_count, request.story_memory,
+    )
 
-    chunks = generator.stream(
-        text=request.text,
-        additional_instructions=request.additional_instructions,
-        word_count=request.word_count,
-        current_position=request.current_position,
-        lore=lore_data
+    started, reason = speculation.start(
+        client,
+        key,
+        lambda: generator.stream(
+            text=text,
+            additional_instructions=request.additional_instructions,
+            word_count=request.word_count,
+            lore=lore_data
+        ),
+        tokens=provider.max_tokens_for_words(request.word_count),
+        session_id=request.session_id,
     )
+    return {"started": started, "reason": reason}
+
+
+@router.delete("/next/speculate")
+def cancel_speculation(http_request: Request) -> dict:
+    """Cancel this client's speculative continuations, e.g. when the text changes."""
+    return {"cancelled": speculation.cancel_client(get_client_ip(http_request))}
+
+
+@router.get("/speculation-stats")
+def get_speculation_stats() -> dict:
+    """Returns speculative pre-generation hit rate and counters."""
+    return speculation.snapshot()
+
+
+@router.post("/between/stream")
+def stream_between(request: GenerateRequest, http_request: Request) -> StreamingResponse:
+    try:
+        chunks, headers, provider = _open_stream("between", request, get_client_ip(http_request))
+    except Exception as e:
+        _handle_generation_error(e, request.provider)
 
     return StreamingResponse(
-        _sse_format_with_error_handling(chunks, request.provider),
+        _sse_format_with_error_handling(chunks, provider.name, "between", request.strip_markdown),
         media_type="text/event-stream",
-        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no", **headers}
     )
 
 
 @router.post("/modify/stream")
-def stream_modify(request: GenerateRequest) -> StreamingResponse:
+def stream_modify(request: GenerateRequest, http_request: Request) -> StreamingResponse:
     try:
-        provider = get_provider(
-            provider_name=request.provider,
-            api_key=request.api_key,
-            model=request.model
-        )
+        chunks, headers, provider = _open_stream("modify", request, get_client_ip(http_request))
     except Exception as e:
         _handle_generation_error(e, request.provider)
 
-    generator = TextGeneratorModify(provider)
-    lore_data = [item.dict() for item in request.lore] if request.lore else None
-
-    chunks = generator.stream(
-        selected_text=request.selected_text or "",
-        additional_instructions=request.additional_instructions or "",
-        lore=lore_data,
-        text_before=request.text_before or "",
-        text_after=request.text_after or "",
-    )
-
     return StreamingResponse(
-        _sse_format_with_error_handling(chunks, request.provider),
+        _sse_format_with_error_handling(chunks, provider.name, "modify", request.strip_markdown),
         media_type="text/event-stream",
-        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no", **headers}
     )
 
 
 @router.post("/image-prompt/stream")
-def stream_image_prompt(request: GenerateRequest) -> StreamingResponse:
+def stream_image_prompt(request: GenerateRequest, http_request: Request) -> StreamingResponse:
     try:
-        provider = get_provider(
-            provider_name=request.provider,
-            api_key=request.api_key,
-            model=request.model
-        )
+        chunks, headers, provider = _open_stream("image-prompt", request, get_client_ip(http_request))
     except Exception as e:
         _handle_generation_error(e, request.provider)
 
-    generator = TextGeneratorImagePrompt(provider)
-    lore_data = [item.dict() for item in request.lore] if request.lore else None
-
-    chunks = generator.stream(
-        selected_text=request.selected_text or "",
-        lore=lore_data,
-        text_before=request.text_before or "",
-        text_after=request.text_after or "",
+    return StreamingResponse(
+        _sse_format_with_error_handling(chunks, provider.name, "image-prompt", request.strip_markdown),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no", **headers}
     )
 
+
+def _bulk_image_prompts(
+    generator: TextGeneratorImagePrompt,
+    text: str,
+    request: BulkImagePromptRequest,
+    lore_data,
+) -> Iterator[str]:
+    """
+    Generate one image prompt per range concurrently and emit each as an SSE
+    event as soon as it finishes, tagged with its index and range. A failed
+    range is reported in its own event and does not stop the others.
+    """
+    def generate_one(start: int, end: int) -> str:
+        if end <= start or end > len(text):
+            raise InvalidRequestError(f"Range {start}-{end} is outside the story text")
+        prompt = generator.generate(
+            selected_text=text[start:end],
+            lore=lore_data,
+            # The generator only uses the nearest 400/200 characters around the passage
+            text_before=text[max(start - 400, 0):start],
+            text_after=text[end:end + 200],
+        )
+        if request.strip_markdown:
+            prompt = strip_markdown(prompt)
+        return trim_repetition(prompt, "image-prompt")
+
+    pool = ThreadPoolExecutor(max_workers=settings.image_prompt_bulk_concurrency)
+    try:
+        futures = {
+            pool.submit(generate_one, r.start, r.end): (i, r)
+            for i, r in enumerate(request.ranges)
+        }
+        failed = 0
+        for future in as_completed(futures):
+            i, r = futures[future]
+            event = {"index": i, "range": {"start": r.start, "end": r.end}}
+            try:
+                event["prompt"] = future.result()
+            except Exception as e:
+                failed += 1
+                event["error"] = getattr(e, "detail", None) or str(e)
+                logger.error(f"Bulk image prompt {i} with provider '{request.provider}' failed: {event['error']}")
+            yield f"data: {json.dumps(event)}\n\n"
+
+        summary = {"completed": len(futures) - failed, "failed": failed}
+        yield f"event: summary\ndata: {json.dumps(summary)}\n\n"
+        yield "data: [DONE]\n\n"
+    finally:
+        # Client went away: don't start the prompts still queued
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+@router.post("/image-prompt/bulk")
+def bulk_image_prompts(request: BulkImagePromptRequest, http_request: Request) -> StreamingResponse:
+    """
+    Write image prompts for many passages of one story (e.g. every media tag)
+    in a single call. Results stream back as each finishes, so they arrive
+    out of order; match them up by `index` or `range`.
+    """
+    if len(request.ranges) > settings.image_prompt_bulk_max_ranges:
+        raise InvalidRequestError(f"At most {settings.image_prompt_bulk_max_ranges} ranges per request")
+
+    try:
+        provider = _get_provider(request, "image-prompt", get_client_ip(http_request))
+        text = _resolve_story_text(request)
+        lore_data = _resolve_lore(request)
+    except Exception as e:
+        _handle_generation_error(e, request.provider)
+
+    # Lore is formatted once and shared by every prompt of the batch
+    if lore_data and not isinstance(lore_data, LoreVersion):
+        lore_data = LoreVersion("inline", [dict(zip(("category", "text"), lore_fields(item))) for item in lore_data])
+
     return StreamingResponse(
-        _sse_format_with_error_handling(chunks, request.provider),
+        _bulk_image_prompts(TextGeneratorImagePrompt(provider), text, request, lore_data),
         media_type="text/event-stream",
-        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no", **_route_headers(provider)}
     )
 
 
@@ -261,11 +596,7 @@ def stream_image_prompt(request: GenerateRequest) -> StreamingResponse:
 def generate_start_lore(request: GenerateRequest):
     """Generate 4-5 starting lore items from a story prompt and its opening prose."""
     try:
-        provider = get_provider(
-            provider_name=request.provider,
-            api_key=request.api_key,
-            model=request.model
-        )
+        provider = _get_provider(request, "start-lore")
     except Exception as e:
         _handle_generation_error(e, request.provider)
 
@@ -278,31 +609,97 @@ def generate_start_lore(request: GenerateRequest):
         )
         return {"lore": items}
     except Exception as e:
-        _handle_generation_error(e, request.provider)
+        _handle_generation_error(e, request.provider, provider)
 
 
 @router.post("/start/stream")
-def stream_new_story(request: GenerateRequest) -> StreamingResponse:
+def stream_new_story(request: GenerateRequest, http_request: Request) -> StreamingResponse:
     try:
-        provider = get_provider(
-            provider_name=request.provider,
-            api_key=request.api_key,
-            model=request.model
-        )
+        chunks, headers, provider = _open_stream("start", request, get_client_ip(http_request))
     except Exception as e:
         _handle_generation_error(e, request.provider)
 
-    generator = TextGeneratorStart(provider)
-    lore_data = [item.dict() for item in request.lore] if request.lore else None
-
-    chunks = generator.stream(
-        text=request.text,
-        word_count=request.word_count,
-        lore=lore_data
-    )
-
     return StreamingResponse(
-        _sse_format_with_error_handling(chunks, request.provider),
+        _sse_format_with_error_handling(chunks, provider.name, "start", request.strip_markdown),
         media_type="text/event-stream",
-        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no", **headers}
     )
+
+
+@router.websocket("/ws")
+async def generation_channel(websocket: WebSocket) -> None:
+    """
+    One long-lived connection per editor session carrying many generations.
+
+    Client frames are JSON objects:
+      {"op": "start", "id": "r1", "endpoint": "next", "request": {...GenerateRequest}}
+      {"op": "cancel", "id": "r1"}
+    `endpoint` is one of next, between, modify, image-prompt or start. The
+    server pushes compact arrays tagged with the request ID: ["t", id, text],
+    ["r", id, {"trim", "length"}] on a repetition loop, ["e", id, message]
+    on failure and ["d", id] when the generation has ended or was cancelled.
+    Each start counts against the client's HTTP rate limit for that endpoint,
+    and a client may hold `channel_max_per_client` connections at once.
+    """
+    client = get_client_ip(websocket)
+    if not channel_connections.acquire(client, settings.channel_max_per_client):
+        await websocket.close(code=1008, reason="Too many connections from this client")
+        return
+    try:
+        await _run_channel(websocket, client)
+    finally:
+        channel_connections.release(client)
+
+
+async def _run_channel(websocket: WebSocket, client: str) -> None:
+    await websocket.accept()
+    channel = GenerationChannel(websocket, settings.channel_max_active, settings.channel_queue_frames)
+    writer = asyncio.create_task(channel.write())
+
+    try:
+        while True:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                break
+
+            try:
+                frame = json.loads(message.get("text") or message.get("bytes") or "")
+                op, request_id = frame["op"], str(frame["id"])
+            except (ValueError, KeyError, TypeError):
+                await channel.send([ERROR_FRAME, None, "Invalid frame"])
+                continue
+
+            if op == "cancel":
+                channel.cancel(request_id)
+                continue
+            if op != "start":
+                await channel.send([ERROR_FRAME, request_id, f"Unknown op '{op}'"])
+                continue
+
+            endpoint = frame.get("endpoint")
+            if endpoint not in STREAM_ENDPOINTS:
+                await channel.send([ERROR_FRAME, request_id, f"Unknown generation endpoint '{endpoint}'"])
+                continue
+            is_limited, message = rate_limiter.check_generation(client, f"/generate/{endpoint}/stream")
+            if is_limited:
+                await channel.send([ERROR_FRAME, request_id, message])
+                continue
+            try:
+                request = GenerateRequest(**(frame.get("request") or {}))
+            except ValidationError as e:
+                await channel.send([ERROR_FRAME, request_id, str(e)])
+                continue
+
+            def make_events(endpoint=endpoint, request=request):
+                # Runs on the channel's pump thread: provider setup may block
+                chunks, _, provider = _open_stream(endpoint, request, client)
+                return _guard_stream(chunks, endpoint, request.strip_markdown, provider.name)
+
+            error = channel.start(request_id, make_events)
+            if error:
+                await channel.send([ERROR_FRAME, request_id, error])
+    except WebSocketDisconnect:
+        pass
+    finally:
+        channel.close()
+        writer.cancel()
@@ -0,0 +1,27 @@
+from fastapi import APIRouter
+from fastapi.responses import JSONResponse
+
+from app.core.lifecycle import lifecycle
+from app.core.speculation import speculation
+
+
+router = APIRouter()
+
+
+@router.get("")
+def health() -> dict:
+    """Lifecycle state, in-flight generations and drain progress while shutting down."""
+    return {**lifecycle.snapshot(), "speculation_active": speculation.snapshot()["active"]}
+
+
+@router.get("/live")
+def liveness() -> dict:
+    """The process is up and serving requests, including while it drains."""
+    return {"status": "alive"}
+
+
+@router.get("/ready")
+def readiness() -> JSONResponse:
+    """503 while draining, at capacity, or while the default provider's circuit is open."""
+    ready, status = lifecycle.readiness()
+    return JSONResponse(status, status_code=200 if ready else 503)
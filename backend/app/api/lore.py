@@ -0,0 +1,73 @@
+from fastapi import APIRouter
+
+from app.config import settings
+from app.core.exceptions import InvalidRequestError
+from app.core.lore_store import lore_store
+from app.core.priority import endpoint_priority
+from app.core.usage import user_id_for
+from app.providers import DEFAULT_MODELS, get_provider, route_provider
+from app.schema.lore import LoreCompactRequest, LoreCompactResponse, LoreUpsertRequest, LoreVersionResponse
+from app.text_generation.lore import LoreVersion, lore_fields
+from app.text_generation.lore_compaction import TextGeneratorLoreMerge, compact_lore
+
+
+router = APIRouter()
+
+
+def _to_response(lore: LoreVersion) -> LoreVersionResponse:
+    return LoreVersionResponse(lore_id=lore.lore_id, version=lore.version, ref=lore.ref, items=lore.items)
+
+
+@router.post("/compact")
+def compact(request: LoreCompactRequest) -> LoreCompactResponse:
+    """
+    Propose a smaller lore set with overlapping items merged. Candidates are
+    found locally; only clusters of overlapping items are sent to the model.
+    """
+    if request.lore_ref:
+        items = lore_store.resolve(request.lore_ref).items
+    elif request.lore is not None:
+        items = request.lore
+    else:
+        raise InvalidRequestError("Provide either `lore` or `lore_ref`.")
+
+    provider_name = request.provider or settings.llm_provider
+    api_key, model = request.api_key, request.model
+    if provider_name == "auto":
+        # `model` names a routing class; merge on the provider it routes to, with the server's keys
+        provider_name, api_key, model = route_provider(request.model), None, None
+    merger = get_provider(
+        provider_name=provider_name,
+        api_key=api_key,
+        model=model or settings.lore_compaction_model or DEFAULT_MODELS.get(provider_name)
+    )
+    merger.usage_tags = {"user": user_id_for(request.api_key), "endpoint": "lore-compact"}
+    merger.priority = request.priority or endpoint_priority("lore-compact")
+
+    # Blank items are kept so cluster indices match the request's lore; they never cluster
+    result = compact_lore(
+        [lore_fields(item) for item in items],
+        TextGeneratorLoreMerge(merger),
+        threshold=request.threshold if request.threshold is not None else settings.lore_compaction_threshold,
+        concurrency=settings.lore_compaction_concurrency,
+    )
+    return LoreCompactResponse(**result)
+
+
+@router.put("/{lore_id}")
+def upsert_lore(lore_id: str, request: LoreUpsertRequest) -> LoreVersionResponse:
+    """Store a story's lore set and return its version for use as `lore_ref`."""
+    items = [item.dict() for item in request.items if item.text.strip()]
+    return _to_response(lore_store.upsert(lore_id, items))
+
+
+@router.get("/{lore_id}")
+def get_lore(lore_id: str) -> LoreVersionResponse:
+    """Returns the latest stored version of a story's lore."""
+    return _to_response(lore_store.latest(lore_id))
+
+
+@router.delete("/{lore_id}")
+def delete_lore(lore_id: str) -> dict:
+    lore_store.delete(lore_id)
+    return {"deleted": lore_id}
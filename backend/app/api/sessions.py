@@ -0,0 +1,50 @@
+from fastapi import APIRouter
+
+from app.core.speculation import speculation
+from app.core.story_sessions import story_sessions
+from app.schema.session import StoryDeltaRequest, StorySessionResponse, StoryUpload
+
+
+router = APIRouter()
+
+
+def _to_response(session) -> StorySessionResponse:
+    return StorySessionResponse(session_id=session.session_id, hash=session.hash, length=len(session.text))
+
+
+@router.post("")
+def create_session(request: StoryUpload) -> StorySessionResponse:
+    """Upload a story once; later edits are sent as deltas against the returned hash."""
+    return _to_response(story_sessions.create(request.text))
+
+
+@router.get("/{session_id}")
+def get_session(session_id: str) -> StorySessionResponse:
+    """Returns the stored hash and length so a client can check it is in sync."""
+    return _to_response(story_sessions.get(session_id))
+
+
+@router.patch("/{session_id}")
+def apply_deltas(session_id: str, request: StoryDeltaRequest) -> StorySessionResponse:
+    """
+    Apply offset/delete/insert edits. Responds 409 if `base_hash` does not
+    match the stored story; the client should then resync with PUT.
+    """
+    session = story_sessions.apply_deltas(session_id, request.base_hash, request.deltas)
+    speculation.cancel_session(session_id)
+    return _to_response(session)
+
+
+@router.put("/{session_id}")
+def resync_session(session_id: str, request: StoryUpload) -> StorySessionResponse:
+    """Replace the stored story with a full upload after a hash mismatch."""
+    session = story_sessions.replace(session_id, request.text)
+    speculation.cancel_session(session_id)
+    return _to_response(session)
+
+
+@router.delete("/{session_id}")
+def delete_session(session_id: str) -> dict:
+    story_sessions.delete(session_id)
+    speculation.cancel_session(session_id)
+    return {"deleted": session_id}
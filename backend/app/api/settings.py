@@ -3,7 +3,9 @@ from pydantic import BaseModel
 from typing import Optional
 
 from app.config import settings
-from app.providers import PROVIDER_MODELS
+from app.providers import PROVIDER_MODELS, get_provider_models
+from app.providers.catalog import model_catalog
+from app.providers.key_pool import configured_keys
 
 
 router = APIRouter()
@@ -15,6 +17,7 @@ class SettingsResponse(BaseModel):
     xai_api_key_configured: bool
     openai_api_key_configured: bool
     anthropic_api_key_configured: bool
+    openai_compatible_configured: bool
 
 
 class SettingsUpdateRequest(BaseModel):
@@ -28,16 +31,23 @@ def get_settings() -> SettingsResponse:
     return SettingsResponse(
         provider=settings.llm_provider,
         model=settings.llm_model,
-        xai_api_key_configured=bool(settings.xai_api_key),
-        openai_api_key_configured=bool(settings.openai_api_key),
-        anthropic_api_key_configured=bool(settings.anthropic_api_key)
+        xai_api_key_configured=bool(configured_keys("xai")),
+        openai_api_key_configured=bool(configured_keys("openai")),
+        anthropic_api_key_configured=bool(configured_keys("anthropic")),
+        openai_compatible_configured=bool(settings.openai_compatible_base_url)
     )
 
 
 @router.get("/models")
 def get_models() -> dict:
     """Returns available providers and their models for the frontend dropdown."""
-    return PROVIDER_MODELS
+    return get_provider_models()
+
+
+@router.get("/models/catalog")
+def get_model_catalog() -> dict:
+    """Per provider: models with context windows, and where and how long ago the list was fetched."""
+    return model_catalog.snapshot()
 
 
 @router.post("")
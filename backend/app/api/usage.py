@@ -0,0 +1,61 @@
+from fastapi import APIRouter, Query
+
+from app.config import settings
+from app.core.exceptions import InvalidRequestError
+from app.core.usage import GROUP_COLUMNS, usage_ledger
+
+
+router = APIRouter()
+
+_TOTALS = ("requests", "input_tokens", "output_tokens", "cached_tokens", "estimated_requests")
+
+
+def _cost(row: dict) -> float | None:
+    """USD cost of a per-model row from settings.model_prices, or None if the model has no price."""
+    prices = settings.model_prices.get(row["model"])
+    if prices is None:
+        return None
+    cached = row["cached_tokens"]
+    return (
+        (row["input_tokens"] - cached) * prices.get("input", 0.0)
+        + cached * prices.get("cached", prices.get("input", 0.0))
+        + row["output_tokens"] * prices.get("output", 0.0)
+    ) / 1_000_000
+
+
+@router.get("")
+def get_usage(
+    group_by: list[str] = Query(["model"], description=f"Any of: {', '.join(GROUP_COLUMNS)}"),
+    since: float | None = Query(None, description="Unix timestamp, inclusive"),
+    until: float | None = Query(None, description="Unix timestamp, exclusive"),
+) -> dict:
+    """
+    Token totals from the usage ledger, grouped for capacity planning, with a
+    cost estimate where model prices are configured. Rows written in the
+    last couple of seconds may not be included yet.
+    """
+    if not usage_ledger.enabled:
+        return {"enabled": False, "rows": []}
+    unknown = [column for column in group_by if column not in GROUP_COLUMNS]
+    if unknown:
+        raise InvalidRequestError(f"Cannot group usage by {', '.join(unknown)}; use {', '.join(GROUP_COLUMNS)}")
+    group_by = list(dict.fromkeys(group_by))
+
+    # Cost depends on the model, so aggregate per model first and roll up after
+    rows = usage_ledger.report(group_by if "model" in group_by else [*group_by, "model"], since, until)
+    merged: dict[tuple, dict] = {}
+    for row in rows:
+        cost = _cost(row)
+        key = tuple(row[column] for column in group_by)
+        total = merged.setdefault(key, {**{c: row[c] for c in group_by}, **dict.fromkeys(_TOTALS, 0), "cost_usd": 0.0})
+        for field in _TOTALS:
+            total[field] += row[field]
+        if cost is None:
+            total["cost_usd"] = None
+        elif total["cost_usd"] is not None:
+            total["cost_usd"] += cost
+
+    for total in merged.values():
+        if total["cost_usd"] is not None:
+            total["cost_usd"] = round(total["cost_usd"], 6)
+    return {"enabled": True, "dropped": usage_ledger.dropped, "rows": list(merged.values())}
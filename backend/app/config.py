@@ -14,6 +14,126 @@ class Settings(BaseSettings):
     xai_api_key: str | None = None
     openai_api_key: str | None = None
     anthropic_api_key: str | None = None
+    # More server keys per provider, as JSON lists (OPENAI_API_KEYS='["sk-a", "sk-b"]').
+    # Requests without their own key are spread across all of them by rate-limit headroom
+    xai_api_keys: list[str] = []
+    openai_api_keys: list[str] = []
+    anthropic_api_keys: list[str] = []
+    api_key_cooldown_seconds: float = 30.0  # After a 429 without Retry-After
+
+    # Self-hosted OpenAI-compatible server (llama.cpp, vLLM, Ollama), e.g. "http://localhost:8080/v1"
+    openai_compatible_base_url: str | None = None
+    openai_compatible_api_key: str | None = None
+    openai_compatible_max_concurrency: int = 4
+
+    # provider="auto": route each request to the fastest healthy model of a class
+    # (the request's `model` names the class). Candidates are "provider:model".
+    routing_classes: dict[str, list[str]] = {
+        "fast-drafting": ["xai:grok-3-mini", "openai:gpt-4o-mini", "anthropic:claude-3-5-haiku-latest"],
+    }
+    routing_default_class: str = "fast-drafting"
+    routing_ewma_alpha: float = 0.2
+    routing_exploration: float = 0.1      # Share of requests sent to a non-best candidate
+    routing_max_error_rate: float = 0.3   # Candidates above this are skipped unless all are
+
+    # Repetition loop detection on generated text
+    repetition_detection: bool = True
+    repetition_ngram_size: int = 8
+    repetition_window_words: int = 300
+    repetition_max_repeats: int = 3
+    # Per-endpoint overrides, e.g. {"image-prompt": {"enabled": false}, "start": {"max_repeats": 4}}
+    repetition_overrides: dict[str, dict] = {}
+
+    # Server-side story sessions (LRU-evicted)
+    story_session_max_chars: int = 200_000_000
+    story_session_max_count: int = 2_000
+
+    # Upper bound on a request body after decompression
+    max_request_body_bytes: int = 32 * 1024 * 1024
+
+    # Model catalog from the providers' model-listing APIs; fetched (and
+    # connections warmed) at startup, then refreshed in the background
+    model_catalog_ttl_seconds: float = 3600.0
+    model_catalog_retry_seconds: float = 60.0
+    model_catalog_startup_timeout: float = 10.0
+    # Also warm the API hosts of providers without server credentials, for
+    # deployments where users bring their own keys
+    model_catalog_warm_unconfigured: bool = False
+
+    # Server-side lore sets referenced as lore_id@version
+    lore_store_max_sets: int = 2_000
+    # POST /lore/compact: overlap needed to merge two items, and the merging model
+    lore_compaction_threshold: float = 0.5
+    lore_compaction_model: str | None = None  # If None, use the provider's default (cheap) model
+    lore_compaction_concurrency: int = 4
+
+    # Rolling summaries of long stories: earlier text is sent as a summary,
+    # the most recent `story_memory_window_chars` verbatim
+    story_memory_enabled: bool = False
+    story_memory_model: str | None = None  # If None, use the provider's default (cheap) model
+    story_memory_window_chars: int = 12_000
+    story_memory_block_words: int = 1_200
+    story_memory_fanout: int = 4
+    story_memory_cache_size: int = 20_000
+
+    # Speculative pre-generation of /generate/next (opt-in)
+    speculation_enabled: bool = False
+    speculation_max_per_client: int = 2
+    speculation_max_global: int = 8
+    speculation_tokens_per_client_per_hour: int = 50_000
+    speculation_ttl_seconds: float = 120.0
+
+    # Token usage ledger (SQLite); set to empty to disable
+    usage_ledger_path: str | None = str(Path(__file__).parent.parent / "usage.db")
+    # USD per million tokens for cost reports: {"gpt-4o-mini": {"input": 0.15, "output": 0.6, "cached": 0.075}}
+    model_prices: dict[str, dict[str, float]] = {}
+
+    # Priority classes per endpoint (others are interactive); a request may override
+    # its endpoint's class with `priority`. Each class has its own concurrency pool
+    # and rate-limit budget
+    priority_classes: dict[str, str] = {
+        "next": "interactive",
+        "between": "interactive",
+        "modify": "interactive",
+        "start": "interactive",
+        "image-prompt": "background",
+        "start-lore": "background",
+        "next/speculate": "background",
+        "lore-compact": "background",
+    }
+    # Requests wait for these on the event loop; together they should stay below
+    # the server's 40 worker threads, which also run every other sync route
+    priority_interactive_concurrency: int = 24
+    priority_background_concurrency: int = 8
+    priority_background_max_waiting: int = 32  # Further background requests get a 503
+    priority_ttft_target_seconds: float = 2.0  # Background backs off while interactive p95 TTFT is above this
+    # How long an interactive request waits on a full self-hosted server before a
+    # background stream there is cancelled to make room; null never preempts
+    priority_preempt_after_seconds: float | None = 1.0
+
+    # Required as X-Admin-Token on /admin endpoints, which are disabled while it is unset
+    admin_token: str | None = None
+
+    # Graceful shutdown and readiness
+    drain_timeout_seconds: float = 120.0      # How long SIGTERM waits for active generations
+    max_active_generations: int = 256         # Readiness fails at this many in-flight generations
+    upstream_failure_threshold: int = 5       # Consecutive provider failures that open its circuit
+    upstream_cooldown_seconds: float = 30.0
+
+    # Long-form /generate/start: outline first, then draft sections concurrently
+    long_form_min_words: int = 1_500       # Word counts from here on use it unless the request says otherwise
+    long_form_section_words: int = 700
+    long_form_max_sections: int = 8
+    long_form_concurrency: int = 4
+
+    # Bulk image prompts (/generate/image-prompt/bulk)
+    image_prompt_bulk_concurrency: int = 4
+    image_prompt_bulk_max_ranges: int = 200
+
+    # WebSocket generation channel (/generate/ws)
+    channel_max_active: int = 8        # Concurrent generations per connection
+    channel_queue_frames: int = 256    # Outgoing frames buffered before generations are paused
+    channel_max_per_client: int = 4    # Open connections per client address
 
     model_config = SettingsConfigDict(
         env_file=str(_ENV_FILE) if _ENV_FILE.exists() else None,
@@ -0,0 +1,138 @@
+import asyncio
+import json
+import logging
+import threading
+from collections import Counter
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from typing import Callable, Iterator
+
+from fastapi import WebSocket
+
+from app.core.lifecycle import lifecycle
+
+logger = logging.getLogger(__name__)
+
+# Server -> client frames are compact JSON arrays: ["t", id, text],
+# ["r", id, {trim, length}], ["e", id, message] and ["d", id]
+_FRAME_KINDS = {"text": "t", "repetition": "r"}
+ERROR_FRAME = "e"
+DONE_FRAME = "d"
+
+
+class GenerationChannel:
+    """
+    Many concurrent generations multiplexed over one WebSocket, keyed by a
+    client-chosen request ID.
+
+    Each generation is pumped from its (blocking) provider stream by a
+    thread into a bounded outbox drained by a single writer. When the client
+    reads slowly the outbox fills, the pumps block and stop reading from the
+    upstream provider, so memory stays bounded per connection.
+    """
+
+    def __init__(self, websocket: WebSocket, max_active: int, queue_size: int):
+        self.websocket = websocket
+        self.max_active = max_active
+        self.loop = asyncio.get_running_loop()
+        self._outbox: asyncio.Queue[list] = asyncio.Queue(maxsize=queue_size)
+        self._active: dict[str, threading.Event] = {}
+        self._closed = threading.Event()
+        self._lock = threading.Lock()
+
+    async def write(self) -> None:
+        """Send queued frames until the connection closes."""
+        while True:
+            frame = await self._outbox.get()
+            await self.websocket.send_text(json.dumps(frame, separators=(",", ":"), ensure_ascii=False))
+
+    async def send(self, frame: list) -> None:
+        await self._outbox.put(frame)
+
+    def start(self, request_id: str, make_events: Callable[[], Iterator[tuple[str, object]]]) -> str | None:
+        """Start a generation; returns an error message if it cannot be started."""
+        if not lifecycle.accepting:
+            return "Server is restarting, retry shortly."
+        with self._lock:
+            if request_id in self._active:
+                return f"Generation '{request_id}' is already running"
+            if len(self._active) >= self.max_active:
+                return f"Too many concurrent generations (max {self.max_active})"
+            cancelled = threading.Event()
+            self._active[request_id] = cancelled
+
+        threading.Thread(target=self._pump, args=(request_id, make_events, cancelled), daemon=True).start()
+        return None
+
+    def cancel(self, request_id: str) -> bool:
+        with self._lock:
+            cancelled = self._active.get(request_id)
+        if cancelled is None:
+            return False
+        cancelled.set()
+        return True
+
+    def close(self) -> None:
+        """Cancel every generation on this connection."""
+        self._closed.set()
+        with self._lock:
+            for cancelled in self._active.values():
+                cancelled.set()
+
+    def _pump(self, request_id: str, make_events: Callable, cancelled: threading.Event) -> None:
+        with lifecycle.track():
+            self._run(request_id, make_events, cancelled)
+
+    def _run(self, request_id: str, make_events: Callable, cancelled: threading.Event) -> None:
+        try:
+            events = make_events()
+            try:
+                for kind, data in events:
+                    if cancelled.is_set() or not self._push([_FRAME_KINDS[kind], request_id, data], cancelled):
+                        break
+            finally:
+                events.close()
+            # Also sent after a cancel, so the client knows no more frames follow for this ID
+            self._push([DONE_FRAME, request_id], self._closed)
+        except Exception as e:
+            message = getattr(e, "detail", None) or str(e)
+            logger.error(f"Channel generation '{request_id}' failed: {message}")
+            self._push([ERROR_FRAME, request_id, message], self._closed)
+        finally:
+            with self._lock:
+                self._active.pop(request_id, None)
+
+    def _push(self, frame: list, stop: threading.Event) -> bool:
+        """Queue a frame from a pump thread, waiting while the outbox is full unless `stop` is set."""
+        future = asyncio.run_coroutine_threadsafe(self._outbox.put(frame), self.loop)
+        while True:
+            try:
+                future.result(timeout=0.5)
+                return True
+            except FutureTimeoutError:
+                if stop.is_set():
+                    future.cancel()
+                    return False
+
+
+class ChannelConnections:
+    """Open channels per client, so one client can't hold an unbounded number of connections."""
+
+    def __init__(self):
+        self._open: Counter[str] = Counter()
+        self._lock = threading.Lock()
+
+    def acquire(self, client: str, limit: int) -> bool:
+        with self._lock:
+            if self._open[client] >= limit:
+                return False
+            self._open[client] += 1
+            return True
+
+    def release(self, client: str) -> None:
+        with self._lock:
+            self._open[client] -= 1
+            if self._open[client] <= 0:
+                del self._open[client]
+
+
+channel_connections = ChannelConnections()
@@ -0,0 +1,203 @@
+import zlib
+
+from starlette.middleware.gzip import GZipMiddleware
+from starlette.responses import JSONResponse
+
+# Optional codecs: only advertised when the package is installed
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+class _ZlibDecoder:
+    def __init__(self, wbits: int):
+        self._decompressor = zlib.decompressobj(wbits)
+
+    def decompress(self, data: bytes, limit: int) -> bytes | None:
+        """Return the decompressed data, or None if it would exceed `limit` bytes."""
+        out = self._decompressor.decompress(data, limit + 1)
+        if len(out) > limit or self._decompressor.unconsumed_tail:
+            return None
+        return out
+
+
+class _BrotliDecoder:
+    def __init__(self):
+        self._decompressor = brotli.Decompressor()
+
+    def decompress(self, data: bytes, limit: int) -> bytes | None:
+        # Output is produced in bounded steps; input the decompressor couldn't
+        # take yet is held back until it can accept more
+        out = self._decompressor.process(data, output_buffer_limit=limit + 1)
+        parts, size = [out], len(out)
+        while size <= limit and not self._decompressor.can_accept_more_data():
+            out = self._decompressor.process(b"", output_buffer_limit=limit + 1 - size)
+            if not out:
+                break
+            parts.append(out)
+            size += len(out)
+        return b"".join(parts) if size <= limit else None
+
+
+class _ZstdDecoder:
+    """Feeds a zstandard stream writer whose sink stops as soon as the output passes the limit."""
+
+    def __init__(self):
+        self._writer = zstandard.ZstdDecompressor().stream_writer(self)
+        self._parts: list[bytes] = []
+        self._size = 0
+        self._limit = 0
+
+    def write(self, data: bytes) -> int:
+        self._size += len(data)
+        if self._size > self._limit:
+            raise OverflowError
+        self._parts.append(data)
+        return len(data)
+
+    def decompress(self, data: bytes, limit: int) -> bytes | None:
+        self._parts, self._size, self._limit = [], 0, limit
+        try:
+            self._writer.write(data)
+        except OverflowError:
+            return None
+        return b"".join(self._parts)
+
+
+def _decoders() -> dict:
+    decoders = {
+        "gzip": lambda: _ZlibDecoder(16 + zlib.MAX_WBITS),
+        "deflate": lambda: _ZlibDecoder(zlib.MAX_WBITS),
+    }
+    # Older brotli bindings can't bound the output of a step, so br isn't accepted with them
+    if brotli is not None and hasattr(brotli.Decompressor, "can_accept_more_data"):
+        decoders["br"] = _BrotliDecoder
+    if zstandard is not None:
+        decoders["zstd"] = _ZstdDecoder
+    return decoders
+
+
+class RequestDecompressionMiddleware:
+    """
+    Decompresses request bodies sent with a Content-Encoding of gzip, deflate,
+    br or zstd (the last two when brotli >= 1.2 / zstandard are installed).
+
+    The body is decompressed chunk by chunk as it arrives, every codec in
+    bounded steps, and rejected with 413 as soon as the decompressed size
+    passes `max_body_size`, so a small compressed bomb can't balloon in memory.
+    """
+
+    def __init__(self, app, max_body_size: int = 32 * 1024 * 1024):
+        self.app = app
+        self.max_body_size = max_body_size
+        self.decoders = _decoders()
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        headers = [(k, v) for k, v in scope["headers"] if k != b"content-encoding"]
+        encoding = next((v for k, v in scope["headers"] if k == b"content-encoding"), b"").decode("latin-1")
+        encoding = encoding.strip().lower()
+        if not encoding or encoding == "identity":
+            await self.app(scope, receive, send)
+            return
+
+        factory = self.decoders.get(encoding)
+        if factory is None:
+            response = JSONResponse(
+                status_code=415,
+                content={
+                    "detail": f"Unsupported Content-Encoding '{encoding}'. Supported: {', '.join(self.decoders)}",
+                    "error_type": "unsupported_encoding",
+                },
+            )
+            await response(scope, receive, send)
+            return
+
+        decoder = factory()
+        parts = []
+        size = 0
+        more_body = True
+        try:
+            while more_body:
+                message = await receive()
+                if message["type"] == "http.disconnect":
+                    return
+                more_body = message.get("more_body", False)
+                out = decoder.decompress(message.get("body", b""), self.max_body_size - size)
+                if out is None:
+                    raise OverflowError
+                parts.append(out)
+                size += len(out)
+        except OverflowError:
+            response = JSONResponse(
+                status_code=413,
+                content={
+                    "detail": f"Decompressed request body exceeds {self.max_body_size} bytes.",
+                    "error_type": "request_too_large",
+                },
+            )
+            await response(scope, receive, send)
+            return
+        except Exception:
+            response = JSONResponse(
+                status_code=400,
+                content={
+                    "detail": f"Request body is not valid {encoding} data.",
+                    "error_type": "invalid_encoding",
+                },
+            )
+            await response(scope, receive, send)
+            return
+
+        body = b"".join(parts)
+        headers = [(k, v) for k, v in headers if k != b"content-length"]
+        headers.append((b"content-length", str(len(body)).encode("latin-1")))
+        scope = dict(scope, headers=headers)
+
+        sent = False
+
+        async def replay():
+            nonlocal sent
+            if not sent:
+                sent = True
+                return {"type": "http.request", "body": body, "more_body": False}
+            return await receive()
+
+        await self.app(scope, replay, send)
+
+
+class ResponseCompressionMiddleware:
+    """Gzip non-streaming responses; SSE streams pass through untouched."""
+
+    def __init__(self, app, minimum_size: int = 1024):
+        self.app = app
+        self.gzip = GZipMiddleware(app, minimum_size=minimum_size)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http" and not scope["path"].endswith("/stream"):
+            await self.gzip(scope, receive, send)
+            return
+        await self.app(scope, receive, send)
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse rendered with orjson when it is installed."""
+
+    def render(self, content) -> bytes:
+        if orjson is None:
+            return super().render(content)
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
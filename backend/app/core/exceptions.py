@@ -50,3 +50,54 @@ class GenerationError(HTTPException):
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Text generation failed: {detail}",
         )
+
+
+class SessionNotFoundError(HTTPException):
+    """Raised when a story session does not exist or has been evicted."""
+
+    def __init__(self, session_id: str):
+        super().__init__(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Story session '{session_id}' not found. Upload the story again.",
+        )
+
+
+class SessionConflictError(HTTPException):
+    """Raised when the client's content hash does not match the stored story."""
+
+    def __init__(self, session_id: str, current_hash: str):
+        super().__init__(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Story session '{session_id}' is out of sync. Re-upload the full story.",
+            headers={"X-Story-Hash": current_hash},
+        )
+
+
+class LoreNotFoundError(HTTPException):
+    """Raised when a stored lore set or version is unknown or has been evicted."""
+
+    def __init__(self, ref: str):
+        super().__init__(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Lore '{ref}' not found. Upload the lore again.",
+        )
+
+
+class GenerationCancelledError(HTTPException):
+    """Raised in a generation that was cancelled through the admin API."""
+
+    def __init__(self, reason: str | None = None):
+        super().__init__(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=f"Generation cancelled: {reason or 'by the server'}",
+        )
+
+
+class AdminAuthError(HTTPException):
+    """Raised when an admin endpoint is called without the configured admin token, or none is configured."""
+
+    def __init__(self, detail: str = "Missing or invalid X-Admin-Token header."):
+        super().__init__(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail=detail,
+        )
@@ -0,0 +1,214 @@
+import itertools
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Iterator
+
+from app.core.exceptions import GenerationCancelledError
+
+logger = logging.getLogger(__name__)
+
+# Same estimate the usage ledger uses when a provider reports no usage
+CHARS_PER_TOKEN = 4
+# Window over which the current output rate is measured
+_RATE_WINDOW_SECONDS = 2.0
+
+# The generation whose provider stream is being advanced on this thread, so
+# providers can attach the upstream response they open (see register_upstream)
+_current = threading.local()
+
+
+class Generation:
+    """One in-flight provider call or stream."""
+
+    def __init__(self, generation_id: str, kind: str, provider, client: str | None):
+        tags = provider.usage_tags or {}
+        self.id = generation_id
+        self.kind = kind
+        self.endpoint = tags.get("endpoint")
+        self.user = tags.get("user")
+        self.client = client
+        self.provider = provider.name
+        self.model = provider.model
+        self.priority = provider.priority
+        self.started = time.time()
+        self.first_chunk: float | None = None
+        self.last_chunk: float | None = None
+        self.chars = 0
+        self.rate = 0.0
+        self.cancel_reason: str | None = None
+        self.cancelled = threading.Event()
+        self._aborts: list[Callable[[], None]] = []
+        self._mark = (time.monotonic(), 0)
+        self._lock = threading.Lock()
+
+    def add_chunk(self, chunk: str) -> None:
+        now = time.monotonic()
+        if self.first_chunk is None:
+            self.first_chunk = now
+        self.last_chunk = now
+        self.chars += len(chunk)
+        mark_time, mark_chars = self._mark
+        if now - mark_time >= _RATE_WINDOW_SECONDS:
+            self.rate = (self.chars - mark_chars) / CHARS_PER_TOKEN / (now - mark_time)
+            self._mark = (now, self.chars)
+
+    def attach(self, abort: Callable[[], None]) -> None:
+        """Register a way to break the upstream connection; runs at once if already cancelled."""
+        with self._lock:
+            self._aborts.append(abort)
+        if self.cancelled.is_set():
+            self._abort()
+
+    def cancel(self, reason: str) -> None:
+        if self.cancelled.is_set():
+            return
+        self.cancel_reason = reason
+        self.cancelled.set()
+        self._abort()
+
+    def _abort(self) -> None:
+        with self._lock:
+            aborts, self._aborts = self._aborts, []
+        for abort in aborts:
+            try:
+                abort()
+            except Exception as e:
+                logger.warning(f"Could not abort upstream of generation {self.id}: {e}")
+
+    def to_dict(self) -> dict:
+        now = time.monotonic()
+        rate = self.rate
+        if self.last_chunk is not None and now - self.last_chunk > _RATE_WINDOW_SECONDS:
+            rate = 0.0  # Stalled upstream
+        elif not self._mark[1] and self.first_chunk is not None and now > self.first_chunk:
+            # First window not complete yet: average since the first chunk
+            rate = self.chars / CHARS_PER_TOKEN / (now - self.first_chunk)
+        return {
+            "id": self.id,
+            "kind": self.kind,
+            "endpoint": self.endpoint,
+            "user": self.user,
+            "client": self.client,
+            "provider": self.provider,
+            "model": self.model,
+            "priority": self.priority,
+            "started_at": self.started,
+            "elapsed_seconds": round(time.time() - self.started, 1),
+            "tokens_so_far": self.chars // CHARS_PER_TOKEN,
+            "tokens_per_second": round(rate, 1),
+            "seconds_since_last_token": round(now - self.last_chunk, 1) if self.last_chunk is not None else None,
+            "cancelled": self.cancelled.is_set(),
+        }
+
+
+class GenerationRegistry:
+    """
+    Every in-flight provider call and stream made by the text generators,
+    for live inspection and for cancelling them during incidents.
+
+    Cancelling a stream breaks its upstream connection, so it ends even if
+    the provider has stalled, and the request gets a GenerationCancelledError.
+    A non-streaming call can't be interrupted; its result is discarded.
+    """
+
+    def __init__(self):
+        self._active: dict[str, Generation] = {}
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def track_call(self, provider):
+        generation = self._register("call", provider)
+        try:
+            yield generation
+        finally:
+            self._unregister(generation)
+        if generation.cancelled.is_set():
+            raise GenerationCancelledError(generation.cancel_reason)
+
+    def track_stream(self, provider, chunks: Iterator[str]) -> Iterator[str]:
+        """Pass a provider stream through, registered for its lifetime."""
+        generation = self._register("stream", provider)
+        try:
+            while True:
+                if generation.cancelled.is_set():
+                    raise GenerationCancelledError(generation.cancel_reason)
+                _current.generation = generation
+                try:
+                    chunk = next(chunks)
+                except StopIteration:
+                    return
+                except Exception:
+                    # An aborted upstream fails with a connection error
+                    if generation.cancelled.is_set():
+                        raise GenerationCancelledError(generation.cancel_reason)
+                    raise
+                finally:
+                    _current.generation = None
+                generation.add_chunk(chunk)
+                yield chunk
+        finally:
+            self._unregister(generation)
+            chunks.close()
+
+    def list(self, provider: str | None = None) -> list[dict]:
+        with self._lock:
+            generations = list(self._active.values())
+        return [
+            generation.to_dict() for generation in generations
+            if provider is None or generation.provider == provider
+        ]
+
+    def cancel(self, generation_id: str, reason: str = "Cancelled by an administrator") -> bool:
+        with self._lock:
+            generation = self._active.get(generation_id)
+        if generation is None:
+            return False
+        generation.cancel(reason)
+        return True
+
+    def cancel_provider(self, provider: str, model: str | None = None, reason: str = "Cancelled by an administrator") -> int:
+        """Cancel every generation on a provider, or on one of its models."""
+        with self._lock:
+            generations = [
+                generation for generation in self._active.values()
+                if generation.provider == provider and model in (None, generation.model)
+            ]
+        for generation in generations:
+            generation.cancel(reason)
+        if generations:
+            logger.warning(f"Cancelled {len(generations)} generation(s) on {provider}{':' + model if model else ''}")
+        return len(generations)
+
+    def _register(self, kind: str, provider) -> Generation:
+        # Prefixed with the worker's PID, as each forked worker has its own registry
+        generation = Generation(f"{os.getpid()}-{next(self._ids)}", kind, provider, provider.client)
+        with self._lock:
+            self._active[generation.id] = generation
+        return generation
+
+    def _unregister(self, generation: Generation) -> None:
+        with self._lock:
+            self._active.pop(generation.id, None)
+
+
+def current_generation() -> Generation | None:
+    """The generation whose provider stream is being advanced on this thread, if any."""
+    return getattr(_current, "generation", None)
+
+
+def register_upstream(abort: Callable[[], None]) -> None:
+    """
+    Called by a provider when it opens a streaming response, with a function
+    that breaks the connection; cancelling the generation reading the
+    stream on this thread calls it.
+    """
+    generation = current_generation()
+    if generation is not None:
+        generation.attach(abort)
+
+
+generations = GenerationRegistry()
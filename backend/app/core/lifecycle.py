@@ -0,0 +1,202 @@
+import json
+import logging
+import os
+import signal
+import threading
+import time
+from contextlib import contextmanager
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class Lifecycle:
+    """
+    Process lifecycle for graceful shutdown.
+
+    Counts in-flight generations and, once draining starts (on SIGTERM),
+    makes the app refuse new ones while active streams run to completion
+    or until the drain deadline. Also keeps a per-provider circuit that
+    opens after consecutive upstream failures, for readiness reporting.
+    """
+
+    def __init__(self, max_active: int, failure_threshold: int, cooldown_seconds: float):
+        self.max_active = max_active
+        self.failure_threshold = failure_threshold
+        self.cooldown_seconds = cooldown_seconds
+        self.state = "starting"
+        self.active = 0
+        self.drain_started_at: float | None = None
+        self.drain_deadline: float | None = None
+        self._failures: dict[str, int] = {}
+        self._opened_at: dict[str, float] = {}
+        self._cond = threading.Condition()
+
+    @property
+    def accepting(self) -> bool:
+        return self.state in ("starting", "running")
+
+    @contextmanager
+    def track(self):
+        """Count a generation as in flight for the duration of the block."""
+        with self._cond:
+            self.active += 1
+        try:
+            yield
+        finally:
+            with self._cond:
+                self.active -= 1
+                self._cond.notify_all()
+
+    def begin_drain(self, timeout: float) -> None:
+        with self._cond:
+            if self.state == "draining":
+                return
+            self.state = "draining"
+            self.drain_started_at = time.monotonic()
+            self.drain_deadline = self.drain_started_at + timeout
+        logger.info(f"Draining: waiting up to {timeout:.0f}s for {self.active} active generation(s)")
+
+    def wait_drained(self) -> bool:
+        """Block until no generations are active or the deadline passes; True if fully drained."""
+        with self._cond:
+            while self.active:
+                remaining = self.drain_deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+            return True
+
+    def record_upstream(self, provider: str, ok: bool) -> None:
+        with self._cond:
+            if ok:
+                self._failures.pop(provider, None)
+                self._opened_at.pop(provider, None)
+                return
+            self._failures[provider] = self._failures.get(provider, 0) + 1
+            if self._failures[provider] >= self.failure_threshold:
+                self._opened_at[provider] = time.monotonic()
+
+    def circuits(self) -> dict[str, str]:
+        """"open" while in cooldown after repeated failures, then "half-open" until a success."""
+        now = time.monotonic()
+        with self._cond:
+            return {
+                provider: "open" if now - opened_at < self.cooldown_seconds else "half-open"
+                for provider, opened_at in self._opened_at.items()
+            }
+
+    def readiness(self) -> tuple[bool, dict]:
+        circuits = self.circuits()
+        reasons = []
+        if not self.accepting:
+            reasons.append(self.state)
+        if self.active >= self.max_active:
+            reasons.append("at capacity")
+        if settings.llm_provider in circuits and circuits[settings.llm_provider] == "open":
+            reasons.append(f"upstream '{settings.llm_provider}' circuit open")
+        return not reasons, {
+            "ready": not reasons,
+            "reasons": reasons,
+            "active_generations": self.active,
+            "max_active_generations": self.max_active,
+            "upstream_circuits": circuits,
+        }
+
+    def snapshot(self) -> dict:
+        status = {"state": self.state, "active_generations": self.active}
+        if self.drain_started_at is not None:
+            now = time.monotonic()
+            status["drain"] = {
+                "elapsed_seconds": round(now - self.drain_started_at, 1),
+                "remaining_seconds": round(max(self.drain_deadline - now, 0.0), 1),
+            }
+        return status
+
+    def install_signal_handler(self, timeout: float) -> None:
+        """
+        Make SIGTERM drain before the server's own shutdown handler runs.
+
+        The first SIGTERM starts draining and hands over to the previous
+        handler (uvicorn's) once active generations finish or the deadline
+        passes; a second SIGTERM hands over immediately.
+        """
+        if threading.current_thread() is not threading.main_thread():
+            return
+        previous = signal.getsignal(signal.SIGTERM)
+
+        def hand_over(signum, frame):
+            if callable(previous):
+                previous(signum, frame)
+            else:
+                signal.signal(signum, signal.SIG_DFL)
+                os.kill(os.getpid(), signum)
+
+        def handle_sigterm(signum, frame):
+            if self.state == "draining":
+                hand_over(signum, frame)
+                return
+            self.begin_drain(timeout)
+
+            def finish():
+                if not self.wait_drained():
+                    logger.warning(f"Drain deadline passed with {self.active} generation(s) still active")
+                hand_over(signum, frame)
+
+            threading.Thread(target=finish, daemon=True).start()
+
+        signal.signal(signal.SIGTERM, handle_sigterm)
+
+
+lifecycle = Lifecycle(
+    max_active=settings.max_active_generations,
+    failure_threshold=settings.upstream_failure_threshold,
+    cooldown_seconds=settings.upstream_cooldown_seconds,
+)
+
+
+class DrainMiddleware:
+    """
+    Pure ASGI middleware that counts generation requests as in flight until
+    their response (including a full SSE stream) has been sent, and rejects
+    new ones with 503 while draining. WebSocket channels are refused while
+    draining; their generations are counted by the channel itself.
+    """
+
+    def __init__(self, app, prefix: str = "/generate"):
+        self.app = app
+        self.prefix = prefix
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] not in ("http", "websocket") or not scope["path"].startswith(self.prefix):
+            await self.app(scope, receive, send)
+            return
+
+        if scope["type"] == "websocket":
+            if not lifecycle.accepting:
+                await send({"type": "websocket.close", "code": 1012})
+                return
+            await self.app(scope, receive, send)
+            return
+
+        if scope["method"] != "POST":
+            await self.app(scope, receive, send)
+            return
+
+        if not lifecycle.accepting:
+            body = json.dumps({"detail": "Server is restarting, retry shortly.", "error_type": "draining"}).encode()
+            await send({
+                "type": "http.response.start",
+                "status": 503,
+                "headers": [
+                    (b"content-type", b"application/json"),
+                    (b"content-length", str(len(body)).encode()),
+                    (b"retry-after", b"5"),
+                ],
+            })
+            await send({"type": "http.response.body", "body": body})
+            return
+
+        with lifecycle.track():
+            await self.app(scope, receive, send)
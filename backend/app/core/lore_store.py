@@ -0,0 +1,67 @@
+import threading
+from collections import OrderedDict
+
+from app.config import settings
+from app.core.exceptions import InvalidRequestError, LoreNotFoundError
+from app.text_generation.lore import LoreVersion
+
+
+class LoreStore:
+    """
+    In-memory store of per-story lore sets, referenced from generation
+    requests as `lore_id@version`.
+
+    Each lore set keeps its last few versions so requests issued just before
+    an update still resolve. Whole sets are evicted least recently used first.
+    """
+
+    def __init__(self, max_sets: int, versions_per_set: int = 4):
+        self.max_sets = max_sets
+        self.versions_per_set = versions_per_set
+        self._sets: OrderedDict[str, OrderedDict[str, LoreVersion]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def upsert(self, lore_id: str, items: list[dict]) -> LoreVersion:
+        """Store the full lore set for a story; unchanged content keeps its version."""
+        lore = LoreVersion(lore_id, items)
+        with self._lock:
+            versions = self._sets.setdefault(lore_id, OrderedDict())
+            self._sets.move_to_end(lore_id)
+            if lore.version in versions:
+                versions.move_to_end(lore.version)
+                return versions[lore.version]
+
+            versions[lore.version] = lore
+            while len(versions) > self.versions_per_set:
+                versions.popitem(last=False)
+            while len(self._sets) > self.max_sets:
+                self._sets.popitem(last=False)
+        return lore
+
+    def latest(self, lore_id: str) -> LoreVersion:
+        with self._lock:
+            versions = self._sets.get(lore_id)
+            if not versions:
+                raise LoreNotFoundError(lore_id)
+            self._sets.move_to_end(lore_id)
+            return next(reversed(versions.values()))
+
+    def resolve(self, ref: str) -> LoreVersion:
+        """Look up a `lore_id@version` reference."""
+        lore_id, sep, version = ref.rpartition("@")
+        if not sep or not lore_id or not version:
+            raise InvalidRequestError(f"Invalid lore reference '{ref}'. Expected 'lore_id@version'.")
+
+        with self._lock:
+            lore = self._sets.get(lore_id, {}).get(version)
+            if lore is None:
+                raise LoreNotFoundError(ref)
+            self._sets.move_to_end(lore_id)
+            return lore
+
+    def delete(self, lore_id: str) -> None:
+        with self._lock:
+            self._sets.pop(lore_id, None)
+
+
+lore_store = LoreStore(max_sets=settings.lore_store_max_sets)
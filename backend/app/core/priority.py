@@ -0,0 +1,353 @@
+import asyncio
+import json
+import logging
+import threading
+import time
+from collections import deque
+from contextlib import asynccontextmanager, contextmanager
+from typing import Iterator
+
+from app.config import settings
+from app.core.generations import Generation, current_generation
+
+logger = logging.getLogger(__name__)
+
+INTERACTIVE = "interactive"
+BACKGROUND = "background"
+PRIORITIES = (INTERACTIVE, BACKGROUND)
+
+# Interactive first-token latencies behind the p95, and how often the
+# background pool may be resized in response
+_TTFT_WINDOW_SECONDS = 60.0
+_MIN_TTFT_SAMPLES = 5
+_ADJUST_INTERVAL_SECONDS = 5.0
+# How often a queued request re-checks its pool's limit, which may have grown
+_ADMISSION_RECHECK_SECONDS = 1.0
+
+
+def endpoint_priority(endpoint: str) -> str:
+    """The priority class of an endpoint; endpoints not configured are interactive."""
+    return settings.priority_classes.get(endpoint, INTERACTIVE)
+
+
+def endpoint_for_path(path: str) -> str:
+    """The endpoint a request path's generations are tagged with, e.g. /generate/next/stream -> next."""
+    if path == "/lore/compact":
+        return "lore-compact"
+    return path.removeprefix("/generate/").removesuffix("/stream").removesuffix("/bulk")
+
+
+class _Pool:
+    """Counting slots whose limit can be changed while they are held."""
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.active = 0
+        self.waiting = 0
+        self._cond = threading.Condition()
+
+    @contextmanager
+    def slot(self):
+        with self._cond:
+            self.waiting += 1
+            try:
+                while self.active >= self.limit:
+                    self._cond.wait()
+            finally:
+                self.waiting -= 1
+            self.active += 1
+        try:
+            yield
+        finally:
+            with self._cond:
+                self.active -= 1
+                self._cond.notify()
+
+    def resize(self, limit: int) -> None:
+        with self._cond:
+            self.limit = limit
+            self._cond.notify_all()
+
+    def to_dict(self) -> dict:
+        return {"limit": self.limit, "active": self.active, "waiting": self.waiting}
+
+
+class _Admission:
+    """
+    Admission of HTTP requests to a pool, queued on the event loop so a
+    waiting request doesn't hold one of the server's worker threads. Follows
+    the pool's current limit; with `max_waiting` set, the queue is bounded.
+    """
+
+    def __init__(self, pool: _Pool, max_waiting: int | None = None):
+        self.pool = pool
+        self.max_waiting = max_waiting
+        self.active = 0
+        self.rejected = 0
+        self._waiters: deque[asyncio.Event] = deque()
+
+    def full(self) -> bool:
+        """Whether a new request would have to queue behind `max_waiting` others."""
+        if self.max_waiting is None or (self.active < self.pool.limit and not self._waiters):
+            return False
+        return len(self._waiters) >= self.max_waiting
+
+    @asynccontextmanager
+    async def admit(self):
+        if self.active < self.pool.limit and not self._waiters:
+            self.active += 1
+        else:
+            event = asyncio.Event()
+            self._waiters.append(event)
+            try:
+                while not event.is_set():
+                    try:
+                        await asyncio.wait_for(event.wait(), _ADMISSION_RECHECK_SECONDS)
+                    except asyncio.TimeoutError:
+                        self._wake()
+            except BaseException:
+                if event.is_set():
+                    # Admitted just as the client went away: pass the place on
+                    self.active -= 1
+                    self._wake()
+                else:
+                    self._waiters.remove(event)
+                raise
+        try:
+            yield
+        finally:
+            self.active -= 1
+            self._wake()
+
+    def _wake(self) -> None:
+        while self._waiters and self.active < self.pool.limit:
+            self.active += 1
+            self._waiters.popleft().set()
+
+    def to_dict(self) -> dict:
+        return {"active": self.active, "waiting": len(self._waiters), "rejected": self.rejected}
+
+
+class PriorityScheduler:
+    """
+    Separate concurrency pools for interactive generations (what a user is
+    waiting on) and background work, with background capacity that backs
+    off when interactive streams slow down.
+
+    Each interactive stream's time to first token, including any wait for a
+    slot, is sampled. While the p95 over the last minute is above
+    `ttft_target`, the background pool is halved (down to one slot) every
+    few seconds; once it is back under target the pool grows by one slot at
+    a time up to `background_concurrency`.
+
+    HTTP requests are admitted to their endpoint's class on the event loop
+    before they reach a worker thread (see AdmissionMiddleware); at most
+    `background_max_waiting` background requests queue for admission.
+    """
+
+    def __init__(
+        self,
+        interactive_concurrency: int,
+        background_concurrency: int,
+        ttft_target: float,
+        background_max_waiting: int | None = None,
+    ):
+        self.background_concurrency = background_concurrency
+        self.ttft_target = ttft_target
+        self.pools = {INTERACTIVE: _Pool(interactive_concurrency), BACKGROUND: _Pool(background_concurrency)}
+        self.admissions = {
+            INTERACTIVE: _Admission(self.pools[INTERACTIVE]),
+            BACKGROUND: _Admission(self.pools[BACKGROUND], background_max_waiting),
+        }
+        self._ttfts: deque[tuple[float, float]] = deque()
+        self._adjusted_at = 0.0
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def slot(self, priority: str):
+        """Hold a slot in the class's pool for the duration of the block."""
+        if priority == BACKGROUND:
+            self._adjust()
+        with self.pools[priority].slot():
+            yield
+
+    def track_stream(self, priority: str, chunks: Iterator[str]) -> Iterator[str]:
+        """Pass a provider stream through once it has a slot, sampling interactive TTFT."""
+        start = time.monotonic()
+        try:
+            with self.slot(priority):
+                first = True
+                for chunk in chunks:
+                    if first and priority == INTERACTIVE:
+                        self._record_ttft(time.monotonic() - start)
+                    first = False
+                    yield chunk
+        finally:
+            chunks.close()
+
+    def p95_ttft(self) -> float | None:
+        with self._lock:
+            self._expire(time.monotonic())
+            return self._p95()
+
+    def snapshot(self) -> dict:
+        p95 = self.p95_ttft()
+        return {
+            **{
+                priority: {**pool.to_dict(), "admission": self.admissions[priority].to_dict()}
+                for priority, pool in self.pools.items()
+            },
+            "background_max": self.background_concurrency,
+            "interactive_ttft_p95_seconds": round(p95, 3) if p95 is not None else None,
+            "interactive_ttft_samples": len(self._ttfts),
+            "ttft_target_seconds": self.ttft_target,
+        }
+
+    def _record_ttft(self, ttft: float) -> None:
+        with self._lock:
+            self._ttfts.append((time.monotonic(), ttft))
+        self._adjust()
+
+    def _expire(self, now: float) -> None:
+        while self._ttfts and now - self._ttfts[0][0] > _TTFT_WINDOW_SECONDS:
+            self._ttfts.popleft()
+
+    def _p95(self) -> float | None:
+        if len(self._ttfts) < _MIN_TTFT_SAMPLES:
+            return None
+        ttfts = sorted(ttft for _, ttft in self._ttfts)
+        return ttfts[min(int(len(ttfts) * 0.95), len(ttfts) - 1)]
+
+    def _adjust(self) -> None:
+        """Halve the background pool while interactive p95 TTFT is over target, else grow it by one."""
+        now = time.monotonic()
+        pool = self.pools[BACKGROUND]
+        with self._lock:
+            if now - self._adjusted_at < _ADJUST_INTERVAL_SECONDS:
+                return
+            self._expire(now)
+            p95 = self._p95()
+            if p95 is not None and p95 > self.ttft_target:
+                limit = max(pool.limit // 2, 1)
+            else:
+                limit = min(pool.limit + 1, self.background_concurrency)
+            if limit == pool.limit:
+                return
+            self._adjusted_at = now
+        if limit < pool.limit:
+            logger.warning(
+                f"Interactive p95 TTFT {p95:.2f}s over {self.ttft_target:.2f}s target, "
+                f"background concurrency reduced to {limit}"
+            )
+        pool.resize(limit)
+
+
+class PriorityLimiter:
+    """
+    Shared upstream capacity, such as a self-hosted server's concurrency
+    cap, where interactive requests go first.
+
+    A freed slot goes to a waiting interactive request before any background
+    one. An interactive request that has waited `preempt_after` seconds
+    cancels the most recently admitted background stream holding a slot,
+    whose upstream connection is then cut; with None nothing is preempted.
+    """
+
+    def __init__(self, capacity: int, preempt_after: float | None = None):
+        self.capacity = capacity
+        self.preempt_after = preempt_after
+        self.preempted = 0
+        self._holders: list[tuple[str, Generation | None]] = []
+        self._waiting = {priority: 0 for priority in PRIORITIES}
+        self._cond = threading.Condition()
+
+    @contextmanager
+    def slot(self, priority: str):
+        # Only streams have a generation that can be cancelled
+        holder = (priority, current_generation())
+        preempt_at = None
+        if priority == INTERACTIVE and self.preempt_after is not None:
+            preempt_at = time.monotonic() + self.preempt_after
+        with self._cond:
+            self._waiting[priority] += 1
+            try:
+                while not self._may_enter(priority):
+                    if preempt_at is None:
+                        self._cond.wait()
+                    elif time.monotonic() < preempt_at:
+                        self._cond.wait(preempt_at - time.monotonic())
+                    else:
+                        self._preempt()
+                        preempt_at = None
+            finally:
+                self._waiting[priority] -= 1
+            self._holders.append(holder)
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._holders.remove(holder)
+                self._cond.notify_all()
+
+    def _may_enter(self, priority: str) -> bool:
+        if len(self._holders) >= self.capacity:
+            return False
+        return priority == INTERACTIVE or not self._waiting[INTERACTIVE]
+
+    def _preempt(self) -> None:
+        for priority, generation in reversed(self._holders):
+            if priority == BACKGROUND and generation is not None and not generation.cancelled.is_set():
+                self.preempted += 1
+                logger.info(f"Preempting background generation {generation.id} for an interactive request")
+                generation.cancel("Preempted by interactive traffic")
+                return
+
+
+priorities = PriorityScheduler(
+    interactive_concurrency=settings.priority_interactive_concurrency,
+    background_concurrency=settings.priority_background_concurrency,
+    ttft_target=settings.priority_ttft_target_seconds,
+    background_max_waiting=settings.priority_background_max_waiting,
+)
+
+
+class AdmissionMiddleware:
+    """
+    Pure ASGI middleware that admits generation requests to their
+    endpoint's priority class before the route runs, holding the place
+    until the response (including a full SSE stream) has been sent.
+
+    Sync routes and streaming responses run on a fixed pool of worker
+    threads; queueing here, on the event loop, keeps requests waiting for
+    capacity from using them all up. Background requests past the queue
+    cap get a 503. A request's own `priority` override applies to the
+    pools behind this one.
+    """
+
+    def __init__(self, app, prefixes: tuple[str, ...] = ("/generate/", "/lore/compact")):
+        self.app = app
+        self.prefixes = prefixes
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] != "POST" or not scope["path"].startswith(self.prefixes):
+            await self.app(scope, receive, send)
+            return
+
+        admission = priorities.admissions[endpoint_priority(endpoint_for_path(scope["path"]))]
+        if admission.full():
+            admission.rejected += 1
+            body = json.dumps({"detail": "Too much background work queued, retry shortly.", "error_type": "overloaded"}).encode()
+            await send({
+                "type": "http.response.start",
+                "status": 503,
+                "headers": [
+                    (b"content-type", b"application/json"),
+                    (b"content-length", str(len(body)).encode()),
+                    (b"retry-after", b"5"),
+                ],
+            })
+            await send({"type": "http.response.body", "body": body})
+            return
+
+        async with admission.admit():
+            await self.app(scope, receive, send)
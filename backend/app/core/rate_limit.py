@@ -6,39 +6,36 @@ from fastapi import Request, Response
 from fastapi.responses import JSONResponse
 from starlette.middleware.base import BaseHTTPMiddleware
 
+from app.core.priority import endpoint_for_path, endpoint_priority
 
-class RateLimitMiddleware(BaseHTTPMiddleware):
+
+def get_client_ip(request: Request) -> str:
+    """Extract client IP from request."""
+    forwarded = request.headers.get("X-Forwarded-For")
+    if forwarded:
+        return forwarded.split(",")[0].strip()
+    return request.client.host if request.client else "unknown"
+
+
+class SlidingWindowLimiter:
     """
-    Simple in-memory rate limiter using a sliding window approach.
+    Simple in-memory rate limiter using a sliding window approach, keyed by
+    client (and priority class). Shared by the HTTP middleware and the
+    WebSocket generation channel, so both draw on the same budget.
 
     For production, consider using Redis-based rate limiting for
     distributed deployments.
     """
 
-    def __init__(
-        self,
-        app,
-        requests_per_minute: int = 30,
-        burst_limit: int = 5,
-        excluded_paths: list[str] | None = None,
-    ):
-        super().__init__(app)
+    def __init__(self, requests_per_minute: int = 30, burst_limit: int = 5):
         self.requests_per_minute = requests_per_minute
         self.burst_limit = burst_limit
-        self.excluded_paths = excluded_paths or ["/", "/settings", "/settings/models"]
-        # Track requests per client: {client_ip: [(timestamp, count), ...]}
+        # Track requests per client and priority class: {"<priority> <client_ip>": [timestamp, ...]}
         self.request_log: dict[str, list[float]] = defaultdict(list)
         # Track burst requests (requests in quick succession)
         self.burst_log: dict[str, list[float]] = defaultdict(list)
         self.burst_window = 2.0  # seconds
 
-    def _get_client_ip(self, request: Request) -> str:
-        """Extract client IP from request."""
-        forwarded = request.headers.get("X-Forwarded-For")
-        if forwarded:
-            return forwarded.split(",")[0].strip()
-        return request.client.host if request.client else "unknown"
-
     def _clean_old_requests(self, client_ip: str, current_time: float) -> None:
         """Remove requests older than 1 minute from the log."""
         cutoff = current_time - 60.0
@@ -51,8 +48,8 @@ class RateLimitMiddleware(BaseHTTPMiddleware):
             ts for ts in self.burst_log[client_ip] if ts > burst_cutoff
         ]
 
-    def _is_rate_limited(self, client_ip: str) -> tuple[bool, str | None]:
-        """Check if client should be rate limited."""
+    def is_rate_limited(self, client_ip: str) -> tuple[bool, str | None]:
+        """Check if client should be rate limited; counts the request if not."""
         current_time = time.time()
         self._clean_old_requests(client_ip, current_time)
 
@@ -69,6 +66,41 @@ class RateLimitMiddleware(BaseHTTPMiddleware):
         self.burst_log[client_ip].append(current_time)
         return False, None
 
+    def check_generation(self, client_ip: str, path: str) -> tuple[bool, str | None]:
+        """Rate-limit a generation request for `path` against its priority class's budget."""
+        priority = endpoint_priority(endpoint_for_path(path))
+        return self.is_rate_limited(f"{priority} {client_ip}")
+
+
+rate_limiter = SlidingWindowLimiter(
+    requests_per_minute=30,  # 30 generation requests per minute
+    burst_limit=5,           # Max 5 requests in quick succession (2 seconds)
+)
+
+
+class RateLimitMiddleware(BaseHTTPMiddleware):
+    """
+    Rate limits POST requests per client with a SlidingWindowLimiter.
+
+    Interactive and background endpoints (see settings.priority_classes)
+    are counted separately, so a burst of background work doesn't use up a
+    client's budget for the requests it is waiting on.
+    """
+
+    def __init__(
+        self,
+        app,
+        limiter: SlidingWindowLimiter = rate_limiter,
+        excluded_paths: list[str] | None = None,
+    ):
+        super().__init__(app)
+        self.limiter = limiter
+        self.excluded_paths = excluded_paths or ["/", "/settings", "/settings/models"]
+
+    def _get_client_ip(self, request: Request) -> str:
+        """Extract client IP from request."""
+        return get_client_ip(request)
+
     async def dispatch(self, request: Request, call_next: Callable) -> Response:
         # Skip rate limiting for excluded paths
         if request.url.path in self.excluded_paths:
@@ -79,7 +111,7 @@ class RateLimitMiddleware(BaseHTTPMiddleware):
             return await call_next(request)
 
         client_ip = self._get_client_ip(request)
-        is_limited, message = self._is_rate_limited(client_ip)
+        is_limited, message = self.limiter.check_generation(client_ip, request.url.path)
 
         if is_limited:
             return JSONResponse(
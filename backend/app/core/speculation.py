@@ -0,0 +1,285 @@
+import hashlib
+import json
+import logging
+import threading
+import time
+from collections import defaultdict, deque
+from typing import Callable, Iterator
+
+from app.config import settings
+from app.text_generation.lore import LoreVersion, lore_fields, lore_version
+
+logger = logging.getLogger(__name__)
+
+# How often every client's expired runs and token records are swept, so
+# clients that never come back don't leave entries behind
+_SWEEP_INTERVAL_SECONDS = 60.0
+
+
+def speculation_key(
+    text: str,
+    lore,
+    provider: str | None,
+    model: str | None,
+    additional_instructions: str | None,
+    word_count: int,
+    story_memory: bool | None,
+) -> str:
+    """Identify a continuation by everything that determines its output."""
+    if lore is None:
+        lore_key = ""
+    elif isinstance(lore, LoreVersion):
+        lore_key = lore.version
+    else:
+        lore_key = lore_version([dict(zip(("category", "text"), lore_fields(item))) for item in lore])
+
+    params = json.dumps([lore_key, provider, model, additional_instructions, word_count, story_memory])
+    digest = hashlib.sha256(text.encode("utf-8"))
+    digest.update(params.encode("utf-8"))
+    return digest.hexdigest()
+
+
+class SpeculativeRun:
+    """
+    A continuation generated in a background thread.
+
+    Chunks are buffered as they arrive so a later request can replay what
+    has already been produced and then follow the stream live.
+    """
+
+    def __init__(self, key: str, client: str, session_id: str | None, tokens: int):
+        self.key = key
+        self.client = client
+        self.session_id = session_id
+        self.tokens = tokens
+        self.started_at = time.monotonic()
+        self.finished_at: float | None = None
+        self.claimed = False
+        self.cancelled = False
+        self.error: Exception | None = None
+        self._chunks: list[str] = []
+        self._done = False
+        self._cond = threading.Condition()
+
+    @property
+    def done(self) -> bool:
+        return self._done
+
+    def run(self, make_stream: Callable[[], Iterator[str]], slots: threading.Semaphore, on_finish: Callable) -> None:
+        try:
+            with slots:
+                if self.cancelled:
+                    return
+                stream = make_stream()
+                try:
+                    for chunk in stream:
+                        if self.cancelled:
+                            break
+                        with self._cond:
+                            self._chunks.append(chunk)
+                            self._cond.notify_all()
+                finally:
+                    stream.close()
+        except Exception as e:
+            logger.warning(f"Speculative generation failed: {e}")
+            self.error = e
+        finally:
+            with self._cond:
+                self._done = True
+                self.finished_at = time.monotonic()
+                self._cond.notify_all()
+            on_finish(self)
+
+    def cancel(self) -> None:
+        self.cancelled = True
+
+    def chunks(self) -> Iterator[str]:
+        """Replay buffered chunks, then follow the live stream until it ends."""
+        index = 0
+        try:
+            while True:
+                with self._cond:
+                    while index >= len(self._chunks) and not self._done:
+                        self._cond.wait()
+                    pending = self._chunks[index:]
+                    done = self._done
+                index += len(pending)
+                yield from pending
+                if done and index >= len(self._chunks):
+                    break
+            if self.error is not None:
+                raise self.error
+        finally:
+            # A consumer that stops early (repetition, disconnect) no longer needs the upstream
+            if not self._done:
+                self.cancel()
+
+
+class SpeculationManager:
+    """
+    Opt-in background pre-generation of the next continuation.
+
+    Runs are keyed by `speculation_key` and owned by a client (IP). Each
+    client is limited to a number of concurrent runs and an hourly token
+    budget, and all speculative work shares a small global pool of slots so
+    it never crowds out real requests. Starting a run for new text cancels
+    the client's previous ones. A client's entries are removed once it has
+    no runs left and no tokens spent in the last hour.
+    """
+
+    def __init__(self, max_per_client: int, max_global: int, tokens_per_client_per_hour: int, ttl_seconds: float):
+        self.max_per_client = max_per_client
+        self.tokens_per_client_per_hour = tokens_per_client_per_hour
+        self.ttl_seconds = ttl_seconds
+        self._slots = threading.Semaphore(max_global)
+        self._runs: dict[str, list[SpeculativeRun]] = {}
+        self._inflight: dict[str, int] = defaultdict(int)  # Threads still running, cancelled or not
+        self._token_log: dict[str, deque[tuple[float, int]]] = {}
+        self._swept_at = time.monotonic()
+        self._lock = threading.Lock()
+        self.stats = defaultdict(int)
+
+    def start(
+        self,
+        client: str,
+        key: str,
+        make_stream: Callable[[], Iterator[str]],
+        tokens: int,
+        session_id: str | None = None,
+    ) -> tuple[bool, str | None]:
+        """Start a background run unless one exists or the client is over its caps."""
+        with self._lock:
+            self._sweep()
+            self._expire(client)
+            runs = self._runs.setdefault(client, [])
+            if any(run.key == key for run in runs):
+                return True, "already running"
+
+            # The text moved on: whatever was speculated before is stale
+            for run in runs:
+                self._cancel(run)
+            runs.clear()
+
+            if self._inflight.get(client, 0) >= self.max_per_client:
+                self.stats["rejected"] += 1
+                self._forget(client)
+                return False, "concurrency limit reached"
+            if self._tokens_used(client) + tokens > self.tokens_per_client_per_hour:
+                self.stats["rejected"] += 1
+                self._forget(client)
+                return False, "hourly speculative token budget exhausted"
+
+            run = SpeculativeRun(key, client, session_id, tokens)
+            runs.append(run)
+            self._inflight[client] += 1
+            self._token_log.setdefault(client, deque()).append((time.monotonic(), tokens))
+            self.stats["started"] += 1
+
+        threading.Thread(target=run.run, args=(make_stream, self._slots, self._finished), daemon=True).start()
+        return True, None
+
+    def claim(self, client: str, key: str) -> SpeculativeRun | None:
+        """Hand a matching run to a real request; stale runs for the client are cancelled."""
+        with self._lock:
+            self._expire(client)
+            runs = self._runs.get(client)
+            if not runs:
+                self._forget(client)
+                return None
+
+            for run in runs:
+                if run.key == key and run.error is None:
+                    runs.remove(run)
+                    self._forget(client)
+                    run.claimed = True
+                    self.stats["hits"] += 1
+                    return run
+
+            self.stats["misses"] += 1
+            for run in runs:
+                self._cancel(run)
+            runs.clear()
+            self._forget(client)
+            return None
+
+    def cancel_client(self, client: str) -> int:
+        with self._lock:
+            runs = self._runs.pop(client, [])
+            for run in runs:
+                self._cancel(run)
+            self._forget(client)
+            return len(runs)
+
+    def cancel_session(self, session_id: str) -> None:
+        """Cancel runs built from a story session that has just been edited."""
+        with self._lock:
+            for client, runs in list(self._runs.items()):
+                for run in [r for r in runs if r.session_id == session_id]:
+                    self._cancel(run)
+                    runs.remove(run)
+                self._forget(client)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            lookups = self.stats["hits"] + self.stats["misses"]
+            return {
+                **self.stats,
+                "hit_rate": round(self.stats["hits"] / lookups, 4) if lookups else 0.0,
+                "active": sum(1 for runs in self._runs.values() for run in runs if not run.done),
+                "buffered": sum(1 for runs in self._runs.values() for run in runs if run.done),
+            }
+
+    def _finished(self, run: SpeculativeRun) -> None:
+        with self._lock:
+            self._inflight[run.client] -= 1
+            if not self._inflight[run.client]:
+                del self._inflight[run.client]
+            runs = self._runs.get(run.client, [])
+            if run.cancelled and run in runs:
+                runs.remove(run)
+            self._forget(run.client)
+
+    def _cancel(self, run: SpeculativeRun) -> None:
+        run.cancel()
+        self.stats["cancelled"] += 1
+
+    def _expire(self, client: str) -> None:
+        now = time.monotonic()
+        runs = self._runs.get(client, [])
+        for run in [r for r in runs if r.done and now - r.finished_at > self.ttl_seconds]:
+            runs.remove(run)
+            self.stats["expired"] += 1
+
+    def _tokens_used(self, client: str) -> int:
+        log = self._token_log.get(client)
+        if log is None:
+            return 0
+        cutoff = time.monotonic() - 3600
+        while log and log[0][0] < cutoff:
+            log.popleft()
+        return sum(tokens for _, tokens in log)
+
+    def _forget(self, client: str) -> None:
+        """Drop a client's entries once it has no runs and no tokens in the last hour."""
+        if not self._runs.get(client):
+            self._runs.pop(client, None)
+        if not self._tokens_used(client):
+            self._token_log.pop(client, None)
+
+    def _sweep(self) -> None:
+        """Expire every client's old runs and token records, at most once per interval."""
+        now = time.monotonic()
+        if now - self._swept_at < _SWEEP_INTERVAL_SECONDS:
+            return
+        self._swept_at = now
+        for client in set(self._runs) | set(self._token_log):
+            self._expire(client)
+            self._forget(client)
+
+
+speculation = SpeculationManager(
+    max_per_client=settings.speculation_max_per_client,
+    max_global=settings.speculation_max_global,
+    tokens_per_client_per_hour=settings.speculation_tokens_per_client_per_hour,
+    ttl_seconds=settings.speculation_ttl_seconds,
+)
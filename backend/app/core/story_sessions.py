@@ -0,0 +1,137 @@
+import hashlib
+import threading
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass, field
+
+from app.config import settings
+from app.core.exceptions import InvalidRequestError, SessionConflictError, SessionNotFoundError
+from app.text_generation.story_index import StoryIndex
+
+
+def story_hash(text: str) -> str:
+    """Content hash clients use to prove they are editing the stored version."""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+@dataclass
+class StorySession:
+    session_id: str
+    text: str
+    hash: str
+    _index: StoryIndex | None = field(default=None, repr=False, compare=False)
+
+    @property
+    def index(self) -> StoryIndex:
+        """Paragraph index of the text, built on first use and carried across edits."""
+        if self._index is None:
+            self._index = StoryIndex(self.text)
+        return self._index
+
+
+class StorySessionStore:
+    """
+    In-memory store of uploaded stories, so clients can send edit deltas
+    instead of the whole manuscript on every generation.
+
+    Memory is bounded by total characters and session count; the least
+    recently used sessions are evicted first. Offsets are character (code
+    point) offsets, the same unit as `GenerateRequest.current_position`.
+    """
+
+    def __init__(self, max_chars: int, max_sessions: int):
+        self.max_chars = max_chars
+        self.max_sessions = max_sessions
+        self._sessions: OrderedDict[str, StorySession] = OrderedDict()
+        self._total_chars = 0
+        self._lock = threading.Lock()
+
+    def create(self, text: str) -> StorySession:
+        self._check_size(text)
+        session = StorySession(session_id=uuid.uuid4().hex, text=text, hash=story_hash(text))
+        with self._lock:
+            self._store(session)
+        return session
+
+    def replace(self, session_id: str, text: str) -> StorySession:
+        """Resync path: overwrite the stored story with a full upload."""
+        self._check_size(text)
+        session = StorySession(session_id=session_id, text=text, hash=story_hash(text))
+        with self._lock:
+            self._get(session_id)
+            self._discard(session_id)
+            self._store(session)
+        return session
+
+    def apply_deltas(self, session_id: str, base_hash: str, deltas: list) -> StorySession:
+        """
+        Apply offset/delete/insert edits in order to the stored story. If the
+        story has been indexed, the index is updated edit by edit rather than
+        rebuilt.
+        """
+        with self._lock:
+            session = self._get(session_id)
+            if session.hash != base_hash:
+                raise SessionConflictError(session_id, session.hash)
+
+            text, index = session.text, session._index
+            for delta in deltas:
+                if delta.offset + delta.delete > len(text):
+                    raise InvalidRequestError(
+                        f"Delta at offset {delta.offset} deleting {delta.delete} chars "
+                        f"is outside the story ({len(text)} chars)"
+                    )
+                if index is not None:
+                    index = index.edit(delta.offset, delta.delete, delta.insert)
+                    text = index.text
+                else:
+                    text = text[:delta.offset] + delta.insert + text[delta.offset + delta.delete:]
+
+            self._check_size(text)
+            self._discard(session_id)
+            session = StorySession(session_id=session_id, text=text, hash=story_hash(text), _index=index)
+            self._store(session)
+            return session
+
+    def get(self, session_id: str, expected_hash: str | None = None) -> StorySession:
+        """Fetch a session, optionally checking the client's view of its hash."""
+        with self._lock:
+            session = self._get(session_id)
+        if expected_hash is not None and session.hash != expected_hash:
+            raise SessionConflictError(session_id, session.hash)
+        return session
+
+    def delete(self, session_id: str) -> None:
+        with self._lock:
+            self._discard(session_id)
+
+    def _get(self, session_id: str) -> StorySession:
+        session = self._sessions.get(session_id)
+        if session is None:
+            raise SessionNotFoundError(session_id)
+        self._sessions.move_to_end(session_id)
+        return session
+
+    def _check_size(self, text: str) -> None:
+        if len(text) > self.max_chars:
+            raise InvalidRequestError(
+                f"Story is too large for a session ({len(text)} chars, limit {self.max_chars})"
+            )
+
+    def _store(self, session: StorySession) -> None:
+        self._sessions[session.session_id] = session
+        self._total_chars += len(session.text)
+        while self._total_chars > self.max_chars or len(self._sessions) > self.max_sessions:
+            _, evicted = self._sessions.popitem(last=False)
+            self._total_chars -= len(evicted.text)
+
+    def _discard(self, session_id: str) -> None:
+        session = self._sessions.pop(session_id, None)
+        if session is not None:
+            self._total_chars -= len(session.text)
+
+
+story_sessions = StorySessionStore(
+    max_chars=settings.story_session_max_chars,
+    max_sessions=settings.story_session_max_count,
+)
@@ -0,0 +1,159 @@
+import hashlib
+import logging
+import queue
+import sqlite3
+import threading
+import time
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS usage (
+    ts REAL NOT NULL,
+    user TEXT,
+    endpoint TEXT,
+    provider TEXT,
+    model TEXT,
+    input_tokens INTEGER NOT NULL,
+    output_tokens INTEGER NOT NULL,
+    cached_tokens INTEGER NOT NULL,
+    estimated INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS usage_ts ON usage (ts);
+"""
+
+GROUP_COLUMNS = ("user", "endpoint", "provider", "model")
+
+
+def user_id_for(api_key: str | None) -> str:
+    """Stable pseudonymous user ID: requests bring their own API key, so it identifies the user."""
+    if not api_key:
+        return "server"
+    return "key:" + hashlib.sha256(api_key.encode("utf-8")).hexdigest()[:12]
+
+
+class UsageLedger:
+    """
+    Token usage per provider call, persisted to SQLite.
+
+    `record` only puts a row on an in-memory queue; a background thread
+    writes queued rows in batches, so request threads never wait on disk.
+    If the writer falls far behind, new rows are dropped (and counted)
+    rather than growing memory.
+    """
+
+    def __init__(self, path: str | None, batch_size: int = 500, flush_interval: float = 2.0, max_pending: int = 100_000):
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.dropped = 0
+        self._queue: queue.Queue = queue.Queue()
+        self._writer: threading.Thread | None = None
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.path)
+
+    def record(
+        self,
+        provider: str,
+        model: str | None,
+        input_tokens: int,
+        output_tokens: int,
+        cached_tokens: int = 0,
+        estimated: bool = False,
+        user: str | None = None,
+        endpoint: str | None = None,
+    ) -> None:
+        if not self.enabled:
+            return
+        if self._queue.qsize() >= self.max_pending:
+            with self._lock:
+                self.dropped += 1
+            return
+        self._queue.put((
+            time.time(), user, endpoint, provider, model,
+            int(input_tokens), int(output_tokens), int(cached_tokens), int(estimated),
+        ))
+        self._ensure_writer()
+
+    def close(self, timeout: float = 5.0) -> None:
+        """Write out everything queued so far and stop the writer."""
+        if self._writer is not None:
+            self._queue.put(None)
+            self._writer.join(timeout)
+            self._writer = None
+
+    def report(self, group_by: list[str], since: float | None = None, until: float | None = None) -> list[dict]:
+        """Token totals grouped by any of GROUP_COLUMNS, optionally within a time range (unix seconds)."""
+        columns = ", ".join(group_by)
+        where, params = [], []
+        if since is not None:
+            where.append("ts >= ?")
+            params.append(since)
+        if until is not None:
+            where.append("ts < ?")
+            params.append(until)
+
+        sql = f"""
+            SELECT {columns + "," if columns else ""}
+                   COUNT(*), SUM(input_tokens), SUM(output_tokens), SUM(cached_tokens), SUM(estimated)
+            FROM usage
+            {"WHERE " + " AND ".join(where) if where else ""}
+            {"GROUP BY " + columns if columns else ""}
+            ORDER BY SUM(input_tokens) + SUM(output_tokens) DESC
+        """
+        with self._connect() as conn:
+            rows = conn.execute(sql, params).fetchall()
+
+        fields = [*group_by, "requests", "input_tokens", "output_tokens", "cached_tokens", "estimated_requests"]
+        return [dict(zip(fields, [value if value is not None else 0 for value in row])) for row in rows if row[len(group_by)]]
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=10)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript(_SCHEMA)
+        return conn
+
+    def _ensure_writer(self) -> None:
+        if self._writer is not None:
+            return
+        with self._lock:
+            if self._writer is None:
+                self._writer = threading.Thread(target=self._write_loop, daemon=True)
+                self._writer.start()
+
+    def _write_loop(self) -> None:
+        conn = self._connect()
+        try:
+            while True:
+                batch = [self._queue.get()]
+                deadline = time.monotonic() + self.flush_interval
+                while batch[-1] is not None and len(batch) < self.batch_size:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    try:
+                        batch.append(self._queue.get(timeout=remaining))
+                    except queue.Empty:
+                        break
+
+                stop = batch[-1] is None
+                rows = [row for row in batch if row is not None]
+                if rows:
+                    try:
+                        with conn:
+                            conn.executemany("INSERT INTO usage VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+                    except sqlite3.Error as e:
+                        logger.error(f"Failed to write {len(rows)} usage rows: {e}")
+                if stop:
+                    return
+        finally:
+            conn.close()
+
+
+usage_ledger = UsageLedger(settings.usage_ledger_path)
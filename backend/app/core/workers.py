@@ -0,0 +1,102 @@
+import json
+import logging
+import os
+import socket
+import threading
+from typing import Callable
+
+logger = logging.getLogger(__name__)
+
+# How long to wait for another worker to answer a command
+_REPLY_TIMEOUT_SECONDS = 2.0
+
+
+class WorkerControl:
+    """
+    Runs admin commands on every worker of a multi-worker server.
+
+    Each worker forked by app.serve listens on a Unix socket named after its
+    PID in a directory shared by all workers. A command that reaches one
+    worker over HTTP is run there and sent to every other worker's socket,
+    and the per-worker results are returned together. In a single process
+    (no directory set) commands only run locally.
+    """
+
+    def __init__(self):
+        self.directory: str | None = None
+        self._handlers: dict[str, Callable[..., object]] = {}
+
+    def command(self, name: str):
+        """Register a function as a command other workers can run in this one."""
+        def register(handler):
+            self._handlers[name] = handler
+            return handler
+        return register
+
+    def listen(self) -> None:
+        """Start answering other workers' commands; called in each worker after the fork."""
+        if self.directory is None:
+            return
+        server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        server.bind(self._path(os.getpid()))
+        server.listen(16)
+        threading.Thread(target=self._serve, args=(server,), daemon=True).start()
+
+    def broadcast(self, name: str, **args) -> list:
+        """Run a command here and in every other worker; returns each worker's result."""
+        results = [self._handlers[name](**args)]
+        if self.directory is None:
+            return results
+        own = os.path.basename(self._path(os.getpid()))
+        for entry in os.listdir(self.directory):
+            if entry != own and entry.endswith(".sock"):
+                result = self._send(os.path.join(self.directory, entry), name, args)
+                if result is not None:
+                    results.append(result)
+        return results
+
+    def _path(self, pid: int) -> str:
+        return os.path.join(self.directory, f"{pid}.sock")
+
+    def _serve(self, server: socket.socket) -> None:
+        while True:
+            conn, _ = server.accept()
+            threading.Thread(target=self._answer, args=(conn,), daemon=True).start()
+
+    def _answer(self, conn: socket.socket) -> None:
+        with conn, conn.makefile("rwb") as stream:
+            try:
+                request = json.loads(stream.readline())
+                reply = {"result": self._handlers[request["command"]](**request["args"])}
+            except Exception as e:
+                logger.warning(f"Worker command failed: {e}")
+                reply = {"error": str(e)}
+            stream.write(json.dumps(reply).encode() + b"\n")
+            stream.flush()
+
+    def _send(self, path: str, name: str, args: dict):
+        try:
+            with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as conn:
+                conn.settimeout(_REPLY_TIMEOUT_SECONDS)
+                conn.connect(path)
+                with conn.makefile("rwb") as stream:
+                    stream.write(json.dumps({"command": name, "args": args}).encode() + b"\n")
+                    stream.flush()
+                    reply = json.loads(stream.readline())
+        except (ConnectionRefusedError, FileNotFoundError):
+            # A worker that exited; its replacement listens under a new PID
+            try:
+                os.unlink(path)
+            except OSError:
+                pass
+            return None
+        except (OSError, ValueError) as e:
+            logger.warning(f"Worker at {path} did not answer {name}: {e}")
+            return None
+        if "error" in reply:
+            logger.warning(f"Worker at {path} failed {name}: {reply['error']}")
+            return None
+        return reply["result"]
+
+
+worker_control = WorkerControl()
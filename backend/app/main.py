@@ -1,10 +1,17 @@
 import logging
+from contextlib import asynccontextmanager
 
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
-from app.api import generate, settings
+from app.api import admin, generate, health, lore, sessions, settings, usage
+from app.config import settings as app_settings
+from app.core.compression import FastJSONResponse, RequestDecompressionMiddleware, ResponseCompressionMiddleware
+from app.core.lifecycle import DrainMiddleware, lifecycle
+from app.core.priority import AdmissionMiddleware
 from app.core.rate_limit import RateLimitMiddleware
+from app.core.usage import usage_ledger
+from app.providers.catalog import model_catalog
 
 # Configure logging
 logging.basicConfig(
@@ -12,25 +19,61 @@ logging.basicConfig(
     format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
 )
 
-app = FastAPI(title="vodnik-backend", version="0.1.0")
 
-# Add rate limiting middleware (before CORS)
-app.add_middleware(
-    RateLimitMiddleware,
-    requests_per_minute=30,  # 30 generation requests per minute
-    burst_limit=5,           # Max 5 requests in quick succession (2 seconds)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # On SIGTERM stop taking new generations and let active streams finish
+    # (up to drain_timeout_seconds) before the server shuts down
+    lifecycle.install_signal_handler(app_settings.drain_timeout_seconds)
+    # List models and open provider connections before taking traffic, so
+    # the first request doesn't pay for DNS, TLS and client setup
+    model_catalog.start(timeout=app_settings.model_catalog_startup_timeout)
+    lifecycle.state = "running"
+    yield
+    lifecycle.state = "stopped"
+    model_catalog.stop()
+    usage_ledger.close()
+
+
+app = FastAPI(
+    title="vodnik-backend",
+    version="0.1.0",
+    default_response_class=FastJSONResponse,
+    lifespan=lifespan,
 )
 
+# Queue generation requests for their priority class before they take a worker thread
+app.add_middleware(AdmissionMiddleware)
+
+# Track in-flight generations and refuse new ones while draining
+app.add_middleware(DrainMiddleware, prefix="/generate")
+
+# Compressed request bodies (gzip/deflate/br/zstd) and gzip for non-streaming responses
+app.add_middleware(ResponseCompressionMiddleware, minimum_size=1024)
+app.add_middleware(RequestDecompressionMiddleware, max_body_size=app_settings.max_request_body_bytes)
+
+# Add rate limiting middleware (before CORS); limits are set on rate_limiter,
+# which the WebSocket channel shares
+app.add_middleware(RateLimitMiddleware)
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # Let the browser read our informational response headers
+    expose_headers=["X-Route-Provider", "X-Route-Model", "X-Route-Class", "X-Route-Reason", "X-Speculation", "X-Story-Hash"],
 )
 
 app.include_router(generate.router, prefix="/generate", tags=["generation"])
 app.include_router(settings.router, prefix="/settings", tags=["settings"])
+app.include_router(sessions.router, prefix="/sessions", tags=["sessions"])
+app.include_router(lore.router, prefix="/lore", tags=["lore"])
+app.include_router(usage.router, prefix="/usage", tags=["usage"])
+app.include_router(health.router, prefix="/health", tags=["health"])
+app.include_router(admin.router, prefix="/admin", tags=["admin"])
 
 
 @app.get("/")
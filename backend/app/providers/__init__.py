@@ -1,14 +1,19 @@
 from app.providers.base import LLMProvider
-from app.providers.factory import get_provider, PROVIDER_MODELS
+from app.providers.factory import get_provider, get_provider_models, route_provider, DEFAULT_MODELS, PROVIDER_MODELS
 from app.providers.xai import XAIProvider
 from app.providers.openai import OpenAIProvider
 from app.providers.anthropic import AnthropicProvider
+from app.providers.openai_compatible import OpenAICompatibleProvider
 
 __all__ = [
     "LLMProvider",
     "get_provider",
+    "get_provider_models",
+    "route_provider",
     "PROVIDER_MODELS",
+    "DEFAULT_MODELS",
     "XAIProvider",
     "OpenAIProvider",
-    "AnthropicProvider"
+    "AnthropicProvider",
+    "OpenAICompatibleProvider"
 ]
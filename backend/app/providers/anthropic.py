@@ -2,15 +2,41 @@ from typing import Iterator
 
 import anthropic
 from app.providers.base import LLMProvider
+from app.providers.connections import MODELS_URLS, http_client
 
 
 DEFAULT_MODEL = "claude-3-5-haiku-latest"
 AVAILABLE_MODELS = ["claude-3-5-haiku-latest", "claude-sonnet-4-20250514", "claude-opus-4-20250514"]
+# Context windows in tokens by model name prefix, for when the models API doesn't report them
+CONTEXT_WINDOWS = {"claude-": 200_000}
+
+
+def list_models(api_key: str) -> dict[str, int | None]:
+    """Models the account can use, with context windows where the API reports them."""
+    models = {}
+    params = {"limit": 1000}
+    while True:
+        resp = http_client("anthropic").get(
+            MODELS_URLS["anthropic"],
+            params=params,
+            headers={"x-api-key": api_key, "anthropic-version": "2023-06-01"},
+            timeout=10,
+        )
+        if resp.status_code != 200:
+            raise RuntimeError(f"Anthropic API error listing models: {resp.text}")
+        data = resp.json()
+        for model in data.get("data", []):
+            models[model["id"]] = model.get("max_input_tokens")
+        if not data.get("has_more"):
+            return models
+        params = {"limit": 1000, "after_id": data["last_id"]}
 
 
 class AnthropicProvider(LLMProvider):
+    tokens_per_word = 1.45
+
     def __init__(self, api_key: str, model: str | None = None):
-        self.client = anthropic.Anthropic(api_key=api_key)
+        self.client = anthropic.Anthropic(api_key=api_key, http_client=http_client("anthropic"))
         self.model = model or DEFAULT_MODEL
 
     def _prepare_messages(self, messages: list[dict]) -> tuple[str | None, list[dict]]:
@@ -29,6 +55,14 @@ class AnthropicProvider(LLMProvider):
 
         return system_content, user_messages
 
+    def _usage(self, usage) -> tuple[int, int, int] | None:
+        """(input, output, cached input) tokens; input includes cache reads and writes."""
+        if usage is None:
+            return None
+        cached = getattr(usage, "cache_read_input_tokens", None) or 0
+        created = getattr(usage, "cache_creation_input_tokens", None) or 0
+        return usage.input_tokens + cached + created, usage.output_tokens, cached
+
     def generate(self, messages: list[dict], temperature: float, max_tokens: int) -> str:
         system_content, user_messages = self._prepare_messages(messages)
 
@@ -43,7 +77,9 @@ class AnthropicProvider(LLMProvider):
             kwargs["system"] = system_content
 
         response = self.client.messages.create(**kwargs)
-        return response.content[0].text.strip()
+        content = response.content[0].text
+        self._record_usage(self._usage(response.usage), messages, len(content))
+        return content.strip()
 
     def stream(self, messages: list[dict], temperature: float, max_tokens: int) -> Iterator[str]:
         system_content, user_messages = self._prepare_messages(messages)
@@ -58,6 +94,17 @@ class AnthropicProvider(LLMProvider):
         if system_content:
             kwargs["system"] = system_content
 
+        output_chars = 0
         with self.client.messages.stream(**kwargs) as stream:
-            for text in stream.text_stream:
-                yield text
+            self._track_upstream(stream.response)
+            try:
+                for text in stream.text_stream:
+                    output_chars += len(text)
+                    yield text
+            finally:
+                # Usage accumulated so far from message_start/message_delta events
+                try:
+                    usage = self._usage(stream.current_message_snapshot.usage)
+                except Exception:
+                    usage = None
+                self._record_usage(usage, messages, output_chars)
@@ -1,8 +1,42 @@
 from abc import ABC, abstractmethod
+from functools import partial
 from typing import Iterator
 
+from app.core.generations import register_upstream
+from app.core.priority import INTERACTIVE
+from app.core.usage import usage_ledger
+from app.providers.connections import abort_response
+
+
+# Extra room on top of the word estimate so the model can finish its sentence
+MAX_TOKENS_HEADROOM = 1.3
+MIN_MAX_TOKENS = 64
+# Rough characters per token, used only when a stream ends before reporting usage
+CHARS_PER_TOKEN = 4
+
+
+def openai_usage(usage: dict | None) -> tuple[int, int, int] | None:
+    """(input, output, cached input) tokens from an OpenAI-style `usage` object."""
+    if not usage:
+        return None
+    cached = (usage.get("prompt_tokens_details") or {}).get("cached_tokens") or 0
+    return usage.get("prompt_tokens") or 0, usage.get("completion_tokens") or 0, cached
+
 
 class LLMProvider(ABC):
+    # Average tokens per English prose word for this provider's tokenizer
+    tokens_per_word: float = 1.35
+    # Set by the factory and the API layer, and attached to usage records
+    name: str = ""
+    model: str | None = None
+    usage_tags: dict = {}
+    # How provider="auto" picked this provider: {"class", "reason"}; None when chosen explicitly
+    route: dict | None = None
+    # Address of the requesting client, when known, for the in-flight generation registry
+    client: str | None = None
+    # Priority class of the request: "interactive" or "background"
+    priority: str = INTERACTIVE
+
     @abstractmethod
     def generate(self, messages: list[dict], temperature: float, max_tokens: int) -> str:
         """Send messages to LLM and return generated text."""
@@ -12,3 +46,32 @@ class LLMProvider(ABC):
     def stream(self, messages: list[dict], temperature: float, max_tokens: int) -> Iterator[str]:
         """Stream messages from LLM, yielding text chunks."""
         pass
+
+    @property
+    def supports_prediction(self) -> bool:
+        """Whether generate/stream accept `prediction`, the expected output (OpenAI predicted outputs)."""
+        return False
+
+    def max_tokens_for_words(self, word_count: int) -> int:
+        """Estimate a max_tokens budget for about `word_count` words of output."""
+        return max(MIN_MAX_TOKENS, int(word_count * self.tokens_per_word * MAX_TOKENS_HEADROOM))
+
+    def _track_upstream(self, response) -> None:
+        """Let an admin cancelling the generation that reads this streaming response break its connection."""
+        register_upstream(partial(abort_response, response))
+
+    def _record_usage(self, usage: tuple[int, int, int] | None, messages: list[dict], output_chars: int) -> None:
+        """
+        Log a call's (input, output, cached input) tokens to the usage ledger.
+        Streams closed before the provider reported usage are logged with an
+        estimate from character counts and flagged as such.
+        """
+        if usage is not None:
+            usage_ledger.record(self.name, self.model, *usage, **self.usage_tags)
+            return
+        input_chars = sum(len(m.get("content") or "") for m in messages)
+        usage_ledger.record(
+            self.name, self.model,
+            input_chars // CHARS_PER_TOKEN, output_chars // CHARS_PER_TOKEN,
+            estimated=True, **self.usage_tags,
+        )
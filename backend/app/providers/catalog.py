@@ -0,0 +1,182 @@
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import Callable
+
+from app.config import settings
+from app.providers import anthropic, openai, openai_compatible, xai
+from app.providers.connections import MODELS_URLS, warm
+from app.providers.key_pool import configured_keys, key_pools
+
+logger = logging.getLogger(__name__)
+
+# Built-in model lists and context windows, used until a provider has been listed
+BUILTIN_MODELS = {
+    "xai": xai.AVAILABLE_MODELS,
+    "openai": openai.AVAILABLE_MODELS,
+    "anthropic": anthropic.AVAILABLE_MODELS,
+    "openai-compatible": [],
+}
+CONTEXT_WINDOWS = {
+    "xai": xai.CONTEXT_WINDOWS,
+    "openai": openai.CONTEXT_WINDOWS,
+    "anthropic": anthropic.CONTEXT_WINDOWS,
+    "openai-compatible": {},
+}
+
+
+class ModelCatalog:
+    """
+    The models each provider offers and their context windows, from the
+    providers' model-listing APIs.
+
+    Listings are fetched at startup and by a background thread once they
+    are older than `ttl` seconds. A failed fetch keeps the last good listing
+    (or the built-in list if there never was one) and is retried after
+    `retry` seconds. Only providers with server credentials are listed
+    (which also warms their pooled connections); with `warm_unconfigured`,
+    the others get a connection opened to their API host at startup, so the
+    first request with a user's key finds a warm pooled connection.
+    """
+
+    def __init__(self, ttl: float, retry: float, warm_unconfigured: bool = False):
+        self.ttl = ttl
+        self.retry = retry
+        self.warm_unconfigured = warm_unconfigured
+        self._listings: dict[str, dict[str, int | None]] = {}
+        self._fetched_at: dict[str, float] = {}
+        self._errors: dict[str, tuple[float, str]] = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def start(self, timeout: float) -> None:
+        """Fetch all listings (and warm connections), waiting up to `timeout`, then keep refreshing in the background."""
+        self.refresh(warm_others=self.warm_unconfigured, timeout=timeout)
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._refresh_loop, daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread = None
+
+    def refresh(self, providers: list[str] | None = None, warm_others: bool = False, timeout: float | None = None) -> None:
+        """Fetch listings for `providers` (default: all listable ones) concurrently."""
+        listable = self._listers()
+        listers = {
+            provider: lister for provider, lister in listable.items()
+            if providers is None or provider in providers
+        }
+        others = [provider for provider in MODELS_URLS if provider not in listable] if warm_others else []
+
+        pool = ThreadPoolExecutor(max_workers=max(len(listers) + len(others), 1))
+        futures = {pool.submit(warm, provider): provider for provider in others}
+        futures.update({pool.submit(self._fetch, provider, lister): provider for provider, lister in listers.items()})
+        pool.shutdown(wait=False)
+        _, pending = wait([*futures], timeout=timeout)
+        for future in pending:
+            logger.warning(f"Model listing or warmup for {futures[future]} still running after {timeout}s")
+
+    def models(self) -> dict[str, list[str]]:
+        """Model names per provider: the latest listing, or the built-in list."""
+        with self._lock:
+            listings = dict(self._listings)
+        return {provider: self._ordered(provider, listings.get(provider)) for provider in BUILTIN_MODELS}
+
+    def context_window(self, provider: str, model: str) -> int | None:
+        """Context window in tokens, as reported by the provider or from the built-in table."""
+        with self._lock:
+            reported = self._listings.get(provider, {}).get(model)
+        if reported:
+            return reported
+        # Longest matching name prefix, so dated snapshots inherit their family's window
+        prefixes = [prefix for prefix in CONTEXT_WINDOWS.get(provider, {}) if model.startswith(prefix)]
+        return CONTEXT_WINDOWS[provider][max(prefixes, key=len)] if prefixes else None
+
+    def snapshot(self) -> dict:
+        now = time.time()
+        models = self.models()
+        with self._lock:
+            fetched_at = dict(self._fetched_at)
+            errors = dict(self._errors)
+        return {
+            provider: {
+                "source": "api" if provider in fetched_at else "builtin",
+                "age_seconds": round(now - fetched_at[provider], 1) if provider in fetched_at else None,
+                "error": errors[provider][1] if provider in errors else None,
+                "models": [
+                    {"id": model, "context_window": self.context_window(provider, model)}
+                    for model in names
+                ],
+            }
+            for provider, names in models.items()
+        }
+
+    def _ordered(self, provider: str, listing: dict | None) -> list[str]:
+        """
+        Built-in models first in their usual order (defaults lead), then newly
+        listed ones. Without a built-in list the server's order is kept, as
+        its first model is the default.
+        """
+        builtin = BUILTIN_MODELS[provider]
+        if listing is None:
+            return list(builtin)
+        if not builtin:
+            return list(listing)
+        return [model for model in builtin if model in listing] + sorted(model for model in listing if model not in builtin)
+
+    def _listers(self) -> dict[str, Callable[[], dict[str, int | None]]]:
+        listers = {}
+        if configured_keys("xai"):
+            listers["xai"] = lambda: xai.list_models(key_pools.acquire("xai"))
+        if configured_keys("openai"):
+            listers["openai"] = lambda: openai.list_models(key_pools.acquire("openai"))
+        if configured_keys("anthropic"):
+            listers["anthropic"] = lambda: anthropic.list_models(key_pools.acquire("anthropic"))
+        if settings.openai_compatible_base_url:
+            listers["openai-compatible"] = lambda: openai_compatible.list_models(
+                settings.openai_compatible_base_url,
+                settings.openai_compatible_api_key,
+                settings.openai_compatible_max_concurrency,
+            )
+        return listers
+
+    def _fetch(self, provider: str, lister: Callable[[], dict[str, int | None]]) -> None:
+        try:
+            listing = lister()
+            if not listing:
+                raise RuntimeError("the provider listed no models")
+        except Exception as e:
+            logger.warning(f"Could not list {provider} models, keeping the previous list: {e}")
+            with self._lock:
+                self._errors[provider] = (time.time(), str(e))
+            return
+        with self._lock:
+            self._listings[provider] = listing
+            self._fetched_at[provider] = time.time()
+            self._errors.pop(provider, None)
+
+    def _due(self) -> list[str]:
+        now = time.time()
+        with self._lock:
+            return [
+                provider for provider in self._listers()
+                if now - self._fetched_at.get(provider, 0) >= self.ttl
+                and now - self._errors.get(provider, (0, ""))[0] >= self.retry
+            ]
+
+    def _refresh_loop(self) -> None:
+        while not self._stop.wait(min(self.ttl, self.retry)):
+            due = self._due()
+            if due:
+                self.refresh(due)
+
+
+model_catalog = ModelCatalog(
+    ttl=settings.model_catalog_ttl_seconds,
+    retry=settings.model_catalog_retry_seconds,
+    warm_unconfigured=settings.model_catalog_warm_unconfigured,
+)
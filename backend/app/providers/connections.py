@@ -0,0 +1,103 @@
+import logging
+import socket
+import threading
+
+import anthropic
+import httpx
+import openai
+import requests
+from requests.adapters import HTTPAdapter
+
+from app.providers.key_pool import key_pools
+
+logger = logging.getLogger(__name__)
+
+# Model-listing endpoint of each hosted provider; also used to open a
+# connection to its API host at startup
+MODELS_URLS = {
+    "openai": "https://api.openai.com/v1/models",
+    "anthropic": "https://api.anthropic.com/v1/models",
+    "xai": "https://api.x.ai/v1/models",
+}
+
+POOL_SIZE = 32
+# Idle connections are kept this long, so one opened at startup is still there
+# for the first request (the SDK default is 5 seconds)
+KEEPALIVE_SECONDS = 120.0
+
+# One connection pool per hosted provider, shared by every provider instance
+# whatever API key it was created with, so requests reuse warm TLS connections
+_clients: dict[str, object] = {}
+_lock = threading.Lock()
+
+
+def http_client(provider: str):
+    """The SDK HTTP client (an httpx client) shared by all OpenAI or Anthropic provider instances."""
+    with _lock:
+        if provider not in _clients:
+            sdk = {"openai": openai, "anthropic": anthropic}[provider]
+            _clients[provider] = sdk.DefaultHttpxClient(
+                limits=httpx.Limits(
+                    max_connections=POOL_SIZE,
+                    max_keepalive_connections=POOL_SIZE,
+                    keepalive_expiry=KEEPALIVE_SECONDS,
+                ),
+                event_hooks={"response": [lambda response: _observe(provider, response)]},
+            )
+        return _clients[provider]
+
+
+def http_session(provider: str) -> requests.Session:
+    """A pooled requests session shared by all instances of a provider that calls its API directly."""
+    with _lock:
+        if provider not in _clients:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=POOL_SIZE)
+            session.mount("https://", adapter)
+            session.hooks["response"].append(lambda response, *args, **kwargs: _observe(provider, response))
+            _clients[provider] = session
+        return _clients[provider]
+
+
+def _observe(provider: str, response) -> None:
+    """Feed every response's rate-limit headers to the key pool of the key that made the request."""
+    headers = response.request.headers
+    if "x-api-key" in headers:
+        key = headers["x-api-key"]
+    else:
+        key = headers.get("authorization", "").removeprefix("Bearer ")
+    key_pools.observe(provider, key, response.status_code, response.headers)
+
+
+def warm(provider: str, timeout: float = 10) -> None:
+    """
+    Open a pooled connection to a hosted provider's API host (DNS, TCP and
+    TLS) with an unauthenticated request, for providers we have no server
+    key for. The response, normally a 401, is discarded.
+    """
+    url = MODELS_URLS[provider]
+    try:
+        if provider == "xai":
+            http_session(provider).get(url, timeout=timeout).close()
+        else:
+            http_client(provider).get(url, timeout=timeout).close()
+    except Exception as e:
+        logger.warning(f"Could not warm connection to {provider}: {e}")
+
+
+def abort_response(response) -> None:
+    """
+    Break a streaming response (httpx or requests) that another thread is
+    reading. Closing it would wait for the reader, so the socket is shut
+    down instead, which makes a blocked read fail immediately.
+    """
+    network_stream = getattr(response, "extensions", {}).get("network_stream")
+    if network_stream is not None:
+        sock = network_stream.get_extra_info("socket")
+    else:
+        sock = getattr(getattr(response.raw, "_connection", None), "sock", None)
+    if sock is None:
+        response.close()
+        return
+    # socket.socket's method, as SSLSocket.shutdown would also drop the TLS state under the reader
+    socket.socket.shutdown(sock, socket.SHUT_RDWR)
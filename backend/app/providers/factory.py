@@ -1,7 +1,13 @@
 from app.providers.base import LLMProvider
-from app.providers.xai import XAIProvider, AVAILABLE_MODELS as XAI_MODELS
-from app.providers.openai import OpenAIProvider, AVAILABLE_MODELS as OPENAI_MODELS
-from app.providers.anthropic import AnthropicProvider, AVAILABLE_MODELS as ANTHROPIC_MODELS
+from app.providers.xai import XAIProvider, AVAILABLE_MODELS as XAI_MODELS, DEFAULT_MODEL as XAI_DEFAULT
+from app.providers.openai import OpenAIProvider, AVAILABLE_MODELS as OPENAI_MODELS, DEFAULT_MODEL as OPENAI_DEFAULT
+from app.providers.anthropic import (
+    AnthropicProvider, AVAILABLE_MODELS as ANTHROPIC_MODELS, DEFAULT_MODEL as ANTHROPIC_DEFAULT
+)
+from app.providers.openai_compatible import OpenAICompatibleProvider
+from app.providers.catalog import model_catalog
+from app.providers.key_pool import configured_keys, key_pools
+from app.providers.routing import model_router
 from app.config import settings
 from app.core.exceptions import APIKeyMissingError, ProviderConfigError
 
@@ -9,10 +15,26 @@ from app.core.exceptions import APIKeyMissingError, ProviderConfigError
 PROVIDER_MODELS = {
     "xai": XAI_MODELS,
     "openai": OPENAI_MODELS,
-    "anthropic": ANTHROPIC_MODELS
+    "anthropic": ANTHROPIC_MODELS,
+    # Listed from the server by the model catalog, see get_provider_models()
+    "openai-compatible": [],
+    # Equivalence classes, see settings.routing_classes
+    "auto": list(settings.routing_classes),
 }
 
-VALID_PROVIDERS = {"xai", "openai", "anthropic"}
+# Each provider's default model, also the cheapest one it offers
+DEFAULT_MODELS = {
+    "xai": XAI_DEFAULT,
+    "openai": OPENAI_DEFAULT,
+    "anthropic": ANTHROPIC_DEFAULT,
+}
+
+VALID_PROVIDERS = {"xai", "openai", "anthropic", "openai-compatible", "auto"}
+
+
+def get_provider_models() -> dict:
+    """Each provider's models from the cached catalog, plus the routing classes."""
+    return {**model_catalog.models(), "auto": PROVIDER_MODELS["auto"]}
 
 
 def get_provider(
@@ -24,9 +46,10 @@ def get_provider(
     Factory function to create the appropriate LLM provider.
 
     Args:
-        provider_name: Provider to use ("xai", "openai", "anthropic"). Defaults to settings.
+        provider_name: Provider to use ("xai", "openai", "anthropic", "openai-compatible", "auto"). Defaults to settings.
         api_key: API key for the provider. Falls back to settings if not provided.
         model: Model name to use. Falls back to provider default if not provided.
+            For "auto", the routing class to pick a model from.
 
     Returns:
         LLMProvider instance
@@ -42,25 +65,94 @@ def get_provider(
             f"Unknown provider: '{provider}'. Valid providers: {', '.join(VALID_PROVIDERS)}"
         )
 
+    if provider == "auto":
+        return _route(model or settings.routing_default_class)
+
     model = model or settings.llm_model
+    instance = _create_provider(provider, api_key, model)
+    instance.name = provider
+    return instance
+
+
+def _has_server_credentials(provider: str) -> bool:
+    if provider == "openai-compatible":
+        return bool(settings.openai_compatible_base_url)
+    return bool(configured_keys(provider))
+
+
+def route_provider(routing_class: str | None = None) -> str:
+    """
+    The provider an "auto" request for `routing_class` would run on, for
+    helper calls (story summaries, lore merging) that need a concrete
+    provider rather than a routing class.
+    """
+    choice, _ = _choose(routing_class or settings.routing_default_class)
+    return choice.split(":", 1)[0]
+
 
+def _choose(routing_class: str) -> tuple[str, str]:
+    """Return ("provider:model", reason) for a routing class."""
+    if routing_class not in settings.routing_classes:
+        raise ProviderConfigError(
+            f"Unknown routing class: '{routing_class}'. Valid classes: {', '.join(settings.routing_classes)}"
+        )
+
+    candidates = [
+        candidate for candidate in settings.routing_classes[routing_class]
+        if _has_server_credentials(candidate.split(":", 1)[0])
+    ]
+    if not candidates:
+        raise ProviderConfigError(f"No provider in routing class '{routing_class}' has an API key configured")
+    return model_router.choose(candidates)
+
+
+def _route(routing_class: str) -> LLMProvider:
+    """
+    Pick a model from a routing class by live latency statistics. Auto
+    routing spans providers, so it uses the server's configured keys rather
+    than a per-request key.
+    """
+    choice, reason = _choose(routing_class)
+    provider, model = choice.split(":", 1)
+    instance = _create_provider(provider, None, model)
+    instance.name = provider
+    instance.route = {"class": routing_class, "reason": reason}
+    return instance
+
+
+def _create_provider(provider: str, api_key: str | None, model: str | None) -> LLMProvider:
     if provider == "xai":
-        key = api_key or settings.xai_api_key
+        key = api_key or key_pools.acquire("xai")
         if not key:
             raise APIKeyMissingError("xai")
         return XAIProvider(api_key=key, model=model)
 
     elif provider == "openai":
-        key = api_key or settings.openai_api_key
+        key = api_key or key_pools.acquire("openai")
         if not key:
             raise APIKeyMissingError("openai")
         return OpenAIProvider(api_key=key, model=model)
 
     elif provider == "anthropic":
-        key = api_key or settings.anthropic_api_key
+        key = api_key or key_pools.acquire("anthropic")
         if not key:
             raise APIKeyMissingError("anthropic")
         return AnthropicProvider(api_key=key, model=model)
 
+    elif provider == "openai-compatible":
+        if not settings.openai_compatible_base_url:
+            raise ProviderConfigError(
+                "No OpenAI-compatible server configured. Set OPENAI_COMPATIBLE_BASE_URL."
+            )
+        # The server's first listed model is its default; the provider only
+        # asks the server itself while the catalog has no listing yet
+        listed = model_catalog.models()["openai-compatible"]
+        return OpenAICompatibleProvider(
+            base_url=settings.openai_compatible_base_url,
+            api_key=api_key or settings.openai_compatible_api_key,
+            model=model or (listed[0] if listed else None),
+            max_concurrency=settings.openai_compatible_max_concurrency,
+        )
+
     # This should never happen due to the check above, but satisfies type checker
     raise ProviderConfigError(f"Unknown provider: {provider}")
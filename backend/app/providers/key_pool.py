@@ -0,0 +1,197 @@
+import logging
+import re
+import threading
+import time
+from datetime import datetime
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Rate-limit response headers: (requests, tokens) x (limit, remaining, reset)
+_HEADERS = {
+    # OpenAI and xAI; resets are durations like "6m0s" or "20ms"
+    "openai": "x-ratelimit-{field}-{kind}",
+    "xai": "x-ratelimit-{field}-{kind}",
+    # Anthropic; resets are RFC 3339 timestamps
+    "anthropic": "anthropic-ratelimit-{kind}-{field}",
+}
+_DURATION = re.compile(r"(\d+(?:\.\d+)?)(ms|h|m|s)")
+_UNIT_SECONDS = {"ms": 0.001, "s": 1, "m": 60, "h": 3600}
+
+
+def _reset_at(value: str | None, now: float) -> float | None:
+    """Wall-clock time a rate-limit window resets, from a duration or a timestamp."""
+    if not value:
+        return None
+    parts = _DURATION.findall(value)
+    if parts and "".join(number + unit for number, unit in parts) == value:
+        return now + sum(float(number) * _UNIT_SECONDS[unit] for number, unit in parts)
+    try:
+        return datetime.fromisoformat(value.replace("Z", "+00:00")).timestamp()
+    except ValueError:
+        return None
+
+
+def _number(value: str | None) -> float | None:
+    try:
+        return float(value) if value is not None else None
+    except ValueError:
+        return None
+
+
+class KeyState:
+    """Rate-limit headroom of one API key, as last reported by the provider."""
+
+    def __init__(self, key: str):
+        self.key = key
+        self.limits: dict[str, int | None] = {"requests": None, "tokens": None}
+        self.remaining: dict[str, int | None] = {"requests": None, "tokens": None}
+        self.resets: dict[str, float | None] = {"requests": None, "tokens": None}
+        self.cooldown_until = 0.0
+        self.picks = 0
+        self.rate_limited = 0
+        self.last_picked = 0.0
+
+    @property
+    def label(self) -> str:
+        """Last four characters only, enough to tell configured keys apart in logs and /admin/keys."""
+        return f"…{self.key[-4:]}"
+
+    def headroom(self, now: float) -> float:
+        """Smallest remaining share of the request and token limits; 1.0 when unknown or reset."""
+        shares = []
+        for kind in ("requests", "tokens"):
+            limit, remaining, reset = self.limits[kind], self.remaining[kind], self.resets[kind]
+            if not limit or remaining is None or (reset is not None and now >= reset):
+                continue
+            shares.append(max(remaining, 0) / limit)
+        return min(shares, default=1.0)
+
+    def to_dict(self, now: float) -> dict:
+        return {
+            "key": self.label,
+            "headroom": round(self.headroom(now), 3),
+            "remaining_requests": self.remaining["requests"],
+            "limit_requests": self.limits["requests"],
+            "remaining_tokens": self.remaining["tokens"],
+            "limit_tokens": self.limits["tokens"],
+            "cooldown_seconds": round(max(self.cooldown_until - now, 0.0), 1),
+            "picks": self.picks,
+            "rate_limited": self.rate_limited,
+        }
+
+
+class KeyPool:
+    """
+    The server's API keys for one provider, handed out by remaining headroom.
+
+    Each pick goes to the key with the largest remaining share of its
+    request and token limits, as reported in the provider's rate-limit
+    response headers; ties (e.g. before any headers are seen) go to the key
+    picked least recently. Picking a key also counts one request against
+    its remaining requests until the next response corrects it, so bursts
+    spread out. A key that gets a 429 is skipped until the provider's
+    retry-after (or `cooldown` seconds) has passed, unless every key is
+    cooling down.
+    """
+
+    def __init__(self, provider: str, keys: list[str], cooldown: float):
+        self.provider = provider
+        self.cooldown = cooldown
+        self._keys = {key: KeyState(key) for key in keys}
+        self._lock = threading.Lock()
+
+    @property
+    def keys(self) -> list[str]:
+        return list(self._keys)
+
+    def acquire(self) -> str | None:
+        now = time.time()
+        with self._lock:
+            if not self._keys:
+                return None
+            states = list(self._keys.values())
+            available = [state for state in states if state.cooldown_until <= now] or [
+                min(states, key=lambda state: state.cooldown_until)
+            ]
+            state = max(available, key=lambda state: (state.headroom(now), -state.last_picked))
+            state.picks += 1
+            state.last_picked = now
+            if state.remaining["requests"] is not None:
+                state.remaining["requests"] -= 1
+            return state.key
+
+    def observe(self, key: str, status: int, headers) -> None:
+        """Update a key from a provider response's status and headers."""
+        now = time.time()
+        template = _HEADERS.get(self.provider)
+        with self._lock:
+            state = self._keys.get(key)
+            if state is None:
+                return  # A user's own key
+            if template:
+                for kind in ("requests", "tokens"):
+                    limit = _number(headers.get(template.format(field="limit", kind=kind)))
+                    remaining = _number(headers.get(template.format(field="remaining", kind=kind)))
+                    if limit is not None:
+                        state.limits[kind] = int(limit)
+                    if remaining is not None:
+                        state.remaining[kind] = int(remaining)
+                        state.resets[kind] = _reset_at(headers.get(template.format(field="reset", kind=kind)), now)
+            if status == 429:
+                retry_after = _number(headers.get("retry-after"))
+                state.cooldown_until = now + (retry_after if retry_after is not None else self.cooldown)
+                state.rate_limited += 1
+                logger.warning(
+                    f"{self.provider} key {state.label} rate limited, cooling down for "
+                    f"{state.cooldown_until - now:.0f}s"
+                )
+
+    def snapshot(self) -> list[dict]:
+        now = time.time()
+        with self._lock:
+            return [state.to_dict(now) for state in self._keys.values()]
+
+    def reconfigure(self, keys: list[str]) -> None:
+        """Switch to a new key list, keeping what is known about keys that stay."""
+        with self._lock:
+            self._keys = {key: self._keys.get(key) or KeyState(key) for key in keys}
+
+
+class KeyPools:
+    """One KeyPool per hosted provider, built from the configured keys."""
+
+    def __init__(self, cooldown: float):
+        self.cooldown = cooldown
+        self._pools: dict[str, KeyPool] = {}
+        self._lock = threading.Lock()
+
+    def pool(self, provider: str) -> KeyPool:
+        keys = configured_keys(provider)
+        with self._lock:
+            pool = self._pools.get(provider)
+            if pool is None:
+                pool = self._pools[provider] = KeyPool(provider, keys, self.cooldown)
+            elif pool.keys != keys:
+                pool.reconfigure(keys)
+            return pool
+
+    def acquire(self, provider: str) -> str | None:
+        return self.pool(provider).acquire()
+
+    def observe(self, provider: str, key: str | None, status: int, headers) -> None:
+        if key:
+            self.pool(provider).observe(key, status, headers)
+
+    def snapshot(self) -> dict:
+        return {provider: self.pool(provider).snapshot() for provider in _HEADERS}
+
+
+def configured_keys(provider: str) -> list[str]:
+    """The single `<provider>_api_key` setting followed by the `<provider>_api_keys` list, without duplicates."""
+    keys = [getattr(settings, f"{provider}_api_key", None), *getattr(settings, f"{provider}_api_keys", [])]
+    return list(dict.fromkeys(key for key in keys if key))
+
+
+key_pools = KeyPools(cooldown=settings.api_key_cooldown_seconds)
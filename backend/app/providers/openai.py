@@ -1,35 +1,88 @@
 from typing import Iterator
 
 from openai import OpenAI
-from app.providers.base import LLMProvider
+from app.providers.base import LLMProvider, openai_usage
+from app.providers.connections import http_client
 
 
 DEFAULT_MODEL = "gpt-4o-mini"
 AVAILABLE_MODELS = ["gpt-4o-mini", "gpt-4o", "gpt-4-turbo", "gpt-3.5-turbo"]
+# Models that accept predicted outputs
+PREDICTION_MODELS = {"gpt-4o-mini", "gpt-4o", "gpt-4.1", "gpt-4.1-mini", "gpt-4.1-nano"}
+# Context windows in tokens by model name prefix; the models API doesn't report them
+CONTEXT_WINDOWS = {
+    "gpt-4.1": 1_047_576,
+    "gpt-4o": 128_000,
+    "gpt-4-turbo": 128_000,
+    "gpt-4": 8_192,
+    "gpt-3.5-turbo": 16_385,
+    "gpt-5": 400_000,
+    "o1": 200_000,
+    "o3": 200_000,
+    "o4": 200_000,
+}
+_CHAT_PREFIXES = ("gpt-", "chatgpt-", "o1", "o3", "o4")
+_NON_CHAT = ("audio", "realtime", "transcribe", "tts", "image", "search", "instruct", "embedding")
+
+
+def list_models(api_key: str) -> dict[str, int | None]:
+    """Chat models the account can use; the API gives no context windows, so all are None."""
+    client = OpenAI(api_key=api_key, http_client=http_client("openai"))
+    return {
+        model.id: None for model in client.models.list()
+        if model.id.startswith(_CHAT_PREFIXES) and not any(word in model.id for word in _NON_CHAT)
+    }
 
 
 class OpenAIProvider(LLMProvider):
+    tokens_per_word = 1.3
+
     def __init__(self, api_key: str, model: str | None = None):
-        self.client = OpenAI(api_key=api_key)
+        self.client = OpenAI(api_key=api_key, http_client=http_client("openai"))
         self.model = model or DEFAULT_MODEL
 
-    def generate(self, messages: list[dict], temperature: float, max_tokens: int) -> str:
+    @property
+    def supports_prediction(self) -> bool:
+        return self.model in PREDICTION_MODELS
+
+    def _prediction(self, prediction: str | None) -> dict:
+        # Tokens matching the prediction are accepted without being generated one by one
+        return {"prediction": {"type": "content", "content": prediction}} if prediction else {}
+
+    def generate(self, messages: list[dict], temperature: float, max_tokens: int, prediction: str | None = None) -> str:
         response = self.client.chat.completions.create(
             model=self.model,
             messages=messages,
             temperature=temperature,
-            max_tokens=max_tokens
+            max_tokens=max_tokens,
+            **self._prediction(prediction)
         )
-        return response.choices[0].message.content.strip()
+        content = response.choices[0].message.content
+        usage = openai_usage(response.usage.model_dump()) if response.usage else None
+        self._record_usage(usage, messages, len(content))
+        return content.strip()
 
-    def stream(self, messages: list[dict], temperature: float, max_tokens: int) -> Iterator[str]:
+    def stream(self, messages: list[dict], temperature: float, max_tokens: int, prediction: str | None = None) -> Iterator[str]:
         stream = self.client.chat.completions.create(
             model=self.model,
             messages=messages,
             temperature=temperature,
             max_tokens=max_tokens,
-            stream=True
+            stream=True,
+            stream_options={"include_usage": True},
+            **self._prediction(prediction)
         )
-        for chunk in stream:
-            if chunk.choices[0].delta.content:
-                yield chunk.choices[0].delta.content
+        self._track_upstream(stream.response)
+        usage = None
+        output_chars = 0
+        try:
+            for chunk in stream:
+                # The final chunk carries usage and no choices
+                if chunk.usage:
+                    usage = openai_usage(chunk.usage.model_dump())
+                if chunk.choices and chunk.choices[0].delta.content:
+                    output_chars += len(chunk.choices[0].delta.content)
+                    yield chunk.choices[0].delta.content
+        finally:
+            stream.close()
+            self._record_usage(usage, messages, output_chars)
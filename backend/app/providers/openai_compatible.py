@@ -0,0 +1,161 @@
+import threading
+from typing import Iterator
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from app.config import settings
+from app.core.priority import PriorityLimiter
+from app.providers.base import LLMProvider, openai_usage
+from app.providers.sse import iter_sse_json
+
+
+# Pooled HTTP sessions and concurrency limits, shared by every provider
+# instance that talks to the same server
+_sessions: dict[str, requests.Session] = {}
+_limits: dict[str, PriorityLimiter] = {}
+_registry_lock = threading.Lock()
+
+
+def _endpoint_resources(base_url: str, max_concurrency: int) -> tuple[requests.Session, PriorityLimiter]:
+    with _registry_lock:
+        if base_url not in _sessions:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max_concurrency)
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            _sessions[base_url] = session
+            _limits[base_url] = PriorityLimiter(max_concurrency, settings.priority_preempt_after_seconds)
+        return _sessions[base_url], _limits[base_url]
+
+
+def _auth_headers(api_key: str | None) -> dict:
+    headers = {"Content-Type": "application/json"}
+    if api_key:
+        headers["Authorization"] = f"Bearer {api_key}"
+    return headers
+
+
+def list_models(base_url: str, api_key: str | None = None, max_concurrency: int = 4) -> dict[str, int | None]:
+    """
+    The models an OpenAI-compatible server has loaded (GET /models), with
+    context windows from the fields vLLM, llama.cpp and LM Studio add.
+    """
+    base_url = base_url.rstrip("/")
+    session, _ = _endpoint_resources(base_url, max_concurrency)
+    resp = session.get(f"{base_url}/models", headers=_auth_headers(api_key), timeout=10)
+    if resp.status_code != 200:
+        raise RuntimeError(f"OpenAI-compatible API error listing models: {resp.text}")
+    return {
+        model["id"]: (
+            model.get("max_model_len")
+            or (model.get("meta") or {}).get("n_ctx_train")
+            or model.get("context_length")
+        )
+        for model in resp.json().get("data", [])
+    }
+
+
+def discover_models(base_url: str, api_key: str | None = None, max_concurrency: int = 4) -> list[str]:
+    """List the models an OpenAI-compatible server has loaded via GET /models."""
+    return list(list_models(base_url, api_key, max_concurrency))
+
+
+class OpenAICompatibleProvider(LLMProvider):
+    """
+    Provider for any server exposing the OpenAI chat completions API, such
+    as llama.cpp server, vLLM or Ollama running on our own machines.
+
+    Connections are pooled per `base_url` and the number of in-flight
+    requests to each server is capped at `max_concurrency`; interactive
+    requests get a free slot before background ones (see PriorityLimiter).
+    """
+
+    def __init__(
+        self,
+        base_url: str,
+        api_key: str | None = None,
+        model: str | None = None,
+        max_concurrency: int = 4,
+        timeout: float = 300,
+    ):
+        self.base_url = base_url.rstrip("/")
+        self.api_key = api_key
+        self.timeout = timeout
+        self.session, self.limit = _endpoint_resources(self.base_url, max_concurrency)
+        self.model = model or self._default_model()
+
+    def _get_headers(self) -> dict:
+        return _auth_headers(self.api_key)
+
+    def _default_model(self) -> str:
+        """The server's first loaded model, listed live; get_provider passes the catalog's instead when it has one."""
+        models = discover_models(self.base_url, self.api_key)
+        if not models:
+            raise RuntimeError(f"No models available from OpenAI-compatible server at {self.base_url}")
+        return models[0]
+
+    def _raise_for_status(self, resp: requests.Response) -> None:
+        if resp.status_code != 200:
+            try:
+                err = resp.json()
+            except Exception:
+                err = resp.text
+            raise RuntimeError(f"OpenAI-compatible API error: {err}")
+
+    def generate(self, messages: list[dict], temperature: float, max_tokens: int) -> str:
+        payload = {
+            "model": self.model,
+            "messages": messages,
+            "temperature": temperature,
+            "max_tokens": max_tokens
+        }
+
+        # Wait for a free slot on this server rather than overloading it; interactive requests go first
+        with self.limit.slot(self.priority):
+            resp = self.session.post(
+                f"{self.base_url}/chat/completions",
+                headers=self._get_headers(),
+                json=payload,
+                timeout=self.timeout
+            )
+            self._raise_for_status(resp)
+            data = resp.json()
+
+        content = data["choices"][0]["message"]["content"]
+        self._record_usage(openai_usage(data.get("usage")), messages, len(content))
+        return content.strip()
+
+    def stream(self, messages: list[dict], temperature: float, max_tokens: int) -> Iterator[str]:
+        payload = {
+            "model": self.model,
+            "messages": messages,
+            "temperature": temperature,
+            "max_tokens": max_tokens,
+            "stream": True,
+            "stream_options": {"include_usage": True}
+        }
+
+        with self.limit.slot(self.priority):
+            resp = self.session.post(
+                f"{self.base_url}/chat/completions",
+                headers=self._get_headers(),
+                json=payload,
+                timeout=self.timeout,
+                stream=True
+            )
+            self._track_upstream(resp)
+            usage = None
+            output_chars = 0
+            try:
+                self._raise_for_status(resp)
+                for data in iter_sse_json(resp):
+                    usage = openai_usage(data.get("usage")) or usage
+                    choices = data.get("choices")
+                    content = choices[0]["delta"].get("content") if choices else None
+                    if content:
+                        output_chars += len(content)
+                        yield content
+            finally:
+                resp.close()
+                self._record_usage(usage, messages, output_chars)
@@ -0,0 +1,141 @@
+import random
+import threading
+import time
+from typing import Iterator
+
+from app.config import settings
+from app.core.exceptions import GenerationCancelledError
+
+# Length of a typical reply, used to weigh first-token latency against throughput
+_TYPICAL_REPLY_CHARS = 1500
+
+
+class ModelStats:
+    """Exponentially weighted live statistics for one provider/model."""
+
+    def __init__(self):
+        self.ttft: float | None = None          # Seconds to the first streamed chunk
+        self.throughput: float | None = None    # Characters per second after the first chunk
+        self.error_rate = 0.0
+        self.samples = 0
+        self.last_seen = 0.0
+
+    def expected_seconds(self) -> float | None:
+        if self.ttft is None or not self.throughput:
+            return None
+        return self.ttft + _TYPICAL_REPLY_CHARS / self.throughput
+
+    def to_dict(self) -> dict:
+        expected = self.expected_seconds()
+        return {
+            "ttft_seconds": round(self.ttft, 3) if self.ttft is not None else None,
+            "chars_per_second": round(self.throughput, 1) if self.throughput else None,
+            "error_rate": round(self.error_rate, 3),
+            "expected_seconds": round(expected, 3) if expected is not None else None,
+            "samples": self.samples,
+            "seconds_since_seen": round(time.monotonic() - self.last_seen, 1) if self.samples else None,
+        }
+
+
+class ModelRouter:
+    """
+    Picks the fastest healthy model from an equivalence class.
+
+    Statistics come from all live traffic (see `track_stream`/`track_call`),
+    not only auto-routed requests. Most requests go to the candidate with
+    the lowest expected reply time among those whose error rate is below
+    `max_error_rate`; a fraction `exploration` goes to another candidate,
+    weighted towards the ones observed least recently, so every candidate's
+    statistics stay fresh and a recovered provider gets picked up again.
+    """
+
+    def __init__(self, alpha: float, exploration: float, max_error_rate: float):
+        self.alpha = alpha
+        self.exploration = exploration
+        self.max_error_rate = max_error_rate
+        self._stats: dict[str, ModelStats] = {}
+        self._lock = threading.Lock()
+
+    def choose(self, candidates: list[str], rng: random.Random = random) -> tuple[str, str]:
+        """Return (candidate, reason) for candidates given as "provider:model"."""
+        if len(candidates) == 1:
+            return candidates[0], "only-candidate"
+
+        with self._lock:
+            stats = {c: self._stats.get(c) or ModelStats() for c in candidates}
+
+        unseen = [c for c, s in stats.items() if not s.samples]
+        if unseen:
+            return rng.choice(unseen), "cold-start"
+
+        healthy = [c for c, s in stats.items() if s.error_rate <= self.max_error_rate]
+        if healthy:
+            # Models only seen through non-streaming calls have no latency figures yet
+            best = min(healthy, key=lambda c: stats[c].expected_seconds() or float("inf"))
+        else:
+            best = min(candidates, key=lambda c: stats[c].error_rate)
+
+        if rng.random() < self.exploration:
+            others = [c for c in candidates if c != best]
+            now = time.monotonic()
+            weights = [max(now - stats[c].last_seen, 1.0) for c in others]
+            return rng.choices(others, weights=weights)[0], "explore"
+
+        return best, "fastest" if healthy else "least-errors"
+
+    def track_stream(self, key: str, chunks: Iterator[str]) -> Iterator[str]:
+        """Pass a provider stream through, recording its TTFT, throughput and outcome."""
+        start = time.monotonic()
+        first = None
+        chars = 0
+        failed = False
+        try:
+            for chunk in chunks:
+                if first is None:
+                    first = time.monotonic()
+                    self._update(key, ttft=first - start)
+                chars += len(chunk)
+                yield chunk
+        except GenerationCancelledError:
+            # Says nothing about the model; also skips the throughput sample
+            failed = True
+            raise
+        except Exception:
+            failed = True
+            self._update(key, ok=False)
+            raise
+        finally:
+            chunks.close()
+            # Also reached when the consumer stops early, e.g. at the word limit
+            if not failed and first is not None:
+                elapsed = time.monotonic() - first
+                if chars and elapsed > 0:
+                    self._update(key, throughput=chars / elapsed, ok=True)
+
+    def track_call(self, key: str, ok: bool) -> None:
+        """Record the outcome of a non-streaming call."""
+        self._update(key, ok=ok)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {key: stats.to_dict() for key, stats in self._stats.items()}
+
+    def _update(self, key: str, ttft: float | None = None, throughput: float | None = None, ok: bool | None = None) -> None:
+        a = self.alpha
+        with self._lock:
+            stats = self._stats.setdefault(key, ModelStats())
+            if ttft is not None:
+                stats.ttft = ttft if stats.ttft is None else (1 - a) * stats.ttft + a * ttft
+            if throughput is not None:
+                stats.throughput = throughput if stats.throughput is None else (1 - a) * stats.throughput + a * throughput
+            if ok is not None:
+                stats.error_rate = (1 - a) * stats.error_rate + a * (0.0 if ok else 1.0)
+                stats.samples += 1
+            stats.last_seen = time.monotonic()
+
+
+model_router = ModelRouter(
+    alpha=settings.routing_ewma_alpha,
+    exploration=settings.routing_exploration,
+    max_error_rate=settings.routing_max_error_rate,
+)
@@ -0,0 +1,78 @@
+import json
+import logging
+from typing import Iterator
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+logger = logging.getLogger(__name__)
+
+READ_SIZE = 64 * 1024
+
+_loads = orjson.loads if orjson is not None else json.loads
+
+
+def _read_chunks(response, size: int) -> Iterator[bytes]:
+    """
+    Body bytes of a streaming requests response as they arrive, up to `size`
+    at a time. `read1` returns whatever is buffered without waiting for a
+    full block, so large reads don't add latency when the stream is slow.
+    """
+    read1 = getattr(response.raw, "read1", None)
+    if read1 is None:
+        # urllib3 before 2.3: per HTTP chunk
+        yield from response.iter_content(chunk_size=None)
+        return
+    while True:
+        data = read1(size, decode_content=True)
+        if not data:
+            return
+        yield data
+
+
+def iter_sse_data(chunks: Iterator[bytes]) -> Iterator[bytes]:
+    """
+    Payloads of the data events in an SSE byte stream.
+
+    Works on bytes throughout: lines are split on b"\\n", which never occurs
+    inside a multi-byte UTF-8 character, so characters split across reads
+    are reassembled without an incremental decoder, and payloads go to the
+    JSON parser undecoded. Comment, event and id lines are skipped by their
+    first byte. Multi-line data is joined per the SSE spec.
+    """
+    pending = b""
+    data: list[bytes] = []
+    for chunk in chunks:
+        lines = (pending + chunk).split(b"\n") if pending else chunk.split(b"\n")
+        pending = lines.pop()
+        for line in lines:
+            if line[-1:] == b"\r":
+                line = line[:-1]
+            if not line:
+                # Blank line: dispatch the event
+                if data:
+                    yield data[0] if len(data) == 1 else b"\n".join(data)
+                    data = []
+            elif line[0] == 100 and line.startswith(b"data:"):  # b"d"
+                data.append(line[6:] if line[5:6] == b" " else line[5:])
+    if pending.startswith(b"data:"):
+        data.append(pending[6:] if pending[5:6] == b" " else pending[5:])
+    if data:
+        yield b"\n".join(data)
+
+
+def iter_sse_json(response, size: int = READ_SIZE) -> Iterator[dict]:
+    """
+    Parsed JSON events of an OpenAI-style streaming response, up to the
+    `[DONE]` sentinel. Events that aren't valid JSON are skipped. Uses
+    orjson when it is installed.
+    """
+    for payload in iter_sse_data(_read_chunks(response, size)):
+        if payload == b"[DONE]":
+            return
+        try:
+            yield _loads(payload)
+        except ValueError:  # Also orjson.JSONDecodeError
+            logger.debug(f"Skipping malformed stream event: {payload[:80]!r}")
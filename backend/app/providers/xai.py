@@ -1,19 +1,34 @@
-import json
 from typing import Iterator
 
-import requests
-from app.providers.base import LLMProvider
+from app.providers.base import LLMProvider, openai_usage
+from app.providers.connections import MODELS_URLS, http_session
+from app.providers.sse import iter_sse_json
 
 
 DEFAULT_MODEL = "grok-3-mini"
 AVAILABLE_MODELS = ["grok-3-mini", "grok-3"]
+# Reasoning models spend part of max_tokens thinking before they write
+REASONING_TOKENS = {"grok-3-mini": 512}
+# Context windows in tokens by model name prefix; the models API doesn't report them
+CONTEXT_WINDOWS = {"grok-3": 131_072, "grok-4": 256_000, "grok-code": 256_000}
+
+
+def list_models(api_key: str) -> dict[str, int | None]:
+    """Models the account can use; the API gives no context windows, so all are None."""
+    resp = http_session("xai").get(MODELS_URLS["xai"], headers={"Authorization": f"Bearer {api_key}"}, timeout=10)
+    if resp.status_code != 200:
+        raise RuntimeError(f"XAI API error listing models: {resp.text}")
+    return {model["id"]: None for model in resp.json().get("data", [])}
 
 
 class XAIProvider(LLMProvider):
+    tokens_per_word = 1.35
+
     def __init__(self, api_key: str, model: str | None = None):
         self.api_key = api_key
         self.model = model or DEFAULT_MODEL
         self.api_url = "https://api.x.ai/v1/chat/completions"
+        self.session = http_session("xai")
 
     def _get_headers(self) -> dict:
         return {
@@ -21,6 +36,9 @@ class XAIProvider(LLMProvider):
             "Content-Type": "application/json"
         }
 
+    def max_tokens_for_words(self, word_count: int) -> int:
+        return super().max_tokens_for_words(word_count) + REASONING_TOKENS.get(self.model, 0)
+
     def generate(self, messages: list[dict], temperature: float, max_tokens: int) -> str:
         payload = {
             "model": self.model,
@@ -29,7 +47,7 @@ class XAIProvider(LLMProvider):
             "max_tokens": max_tokens
         }
 
-        resp = requests.post(
+        resp = self.session.post(
             self.api_url,
             headers=self._get_headers(),
             json=payload,
@@ -44,7 +62,9 @@ class XAIProvider(LLMProvider):
             raise RuntimeError(f"XAI API error: {err}")
 
         data = resp.json()
-        return data["choices"][0]["message"]["content"].strip()
+        content = data["choices"][0]["message"]["content"]
+        self._record_usage(openai_usage(data.get("usage")), messages, len(content))
+        return content.strip()
 
     def stream(self, messages: list[dict], temperature: float, max_tokens: int) -> Iterator[str]:
         payload = {
@@ -52,10 +72,11 @@ class XAIProvider(LLMProvider):
             "messages": messages,
             "temperature": temperature,
             "max_tokens": max_tokens,
-            "stream": True
+            "stream": True,
+            "stream_options": {"include_usage": True}
         }
 
-        resp = requests.post(
+        resp = self.session.post(
             self.api_url,
             headers=self._get_headers(),
             json=payload,
@@ -70,17 +91,20 @@ class XAIProvider(LLMProvider):
                 err = resp.text
             raise RuntimeError(f"XAI API error: {err}")
 
-        for line in resp.iter_lines():
-            if line:
-                line = line.decode("utf-8")
-                if line.startswith("data: "):
-                    data_str = line[6:]
-                    if data_str == "[DONE]":
-                        break
-                    try:
-                        data = json.loads(data_str)
-                        content = data["choices"][0]["delta"].get("content")
-                        if content:
-                            yield content
-                    except json.JSONDecodeError:
-                        continue
+        self._track_upstream(resp)
+        usage = None
+        output_chars = 0
+        try:
+            for data in iter_sse_json(resp):
+                # The final chunk carries usage and no choices
+                usage = openai_usage(data.get("usage")) or usage
+                choices = data.get("choices")
+                content = choices[0]["delta"].get("content") if choices else None
+                if content:
+                    output_chars += len(content)
+                    yield content
+        finally:
+            # Closing the response drops the upstream connection when the
+            # consumer stops early (e.g. a repetition loop was detected)
+            resp.close()
+            self._record_usage(usage, messages, output_chars)
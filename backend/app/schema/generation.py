@@ -1,12 +1,12 @@
-from pydantic import BaseModel, Field
-from typing import Optional, List
+from pydantic import BaseModel, Field, model_validator
+from typing import Literal, Optional, List
 
 class LoreItem(BaseModel):
     category: str = Field(..., description="Category of lore: character, setting, or plot point")
     text: str = Field(..., description="The lore content text")
 
 class GenerateRequest(BaseModel):
-    text: str = Field(...)
+    text: str = Field("", description="Story text; required unless session_id is given")
     additional_instructions: Optional[str] = Field(None)
     word_count: int = Field(256, description="Number of words to generate.", example=100)
     current_position: Optional[int] = None
@@ -14,9 +14,58 @@ class GenerateRequest(BaseModel):
     text_before: Optional[str] = Field(None, description="Story text preceding the selected passage")
     text_after: Optional[str] = Field(None, description="Story text following the selected passage")
     lore: Optional[List[LoreItem]] = Field(None, description="Story context and lore items")
+    lore_ref: Optional[str] = Field(None, description="Stored lore as 'lore_id@version', sent instead of `lore`")
     provider: Optional[str] = Field(None, description="LLM provider: xai, openai, anthropic")
     model: Optional[str] = Field(None, description="Model name (e.g., gpt-4o, claude-sonnet-4)")
     api_key: Optional[str] = Field(None, description="API key (overridden by .env)")
+    session_id: Optional[str] = Field(None, description="Story session to read the text from instead of `text`")
+    session_hash: Optional[str] = Field(None, description="Hash of the client's copy of the session story")
+    story_memory: Optional[bool] = Field(None, description="Send earlier story text as rolling summaries (defaults to server setting)")
+    strip_markdown: bool = Field(False, description="Strip markdown syntax from the generated text")
+    long_form: Optional[bool] = Field(None, description="Start: outline and draft sections in parallel (defaults to on for long word counts)")
+    edit_mode: bool = Field(False, description="Modify: generate only the requested changes (predicted outputs or patches)")
+    priority: Optional[Literal["interactive", "background"]] = Field(None, description="Priority class; defaults to the endpoint's")
+
+    @model_validator(mode="after")
+    def _check_story_source(self):
+        if "text" not in self.model_fields_set and not self.session_id:
+            raise ValueError("Send the story as `text` or a `session_id`")
+        return self
+
+    @model_validator(mode="after")
+    def _check_lore_source(self):
+        if self.lore is not None and self.lore_ref:
+            raise ValueError("Send either `lore` or `lore_ref`, not both")
+        return self
 
 class GenerateResponse(BaseModel):
-    generated_text: str = Field(...)
\ No newline at end of file
+    generated_text: str = Field(...)
+
+class PassageRange(BaseModel):
+    start: int = Field(..., ge=0, description="Offset of the passage start in the story text")
+    end: int = Field(..., ge=0, description="Offset just past the passage end")
+
+class BulkImagePromptRequest(BaseModel):
+    text: str = Field("", description="Story text; required unless session_id is given")
+    ranges: List[PassageRange] = Field(..., description="Passages (e.g. media tags) to write image prompts for")
+    lore: Optional[List[LoreItem]] = Field(None, description="Story context and lore items")
+    lore_ref: Optional[str] = Field(None, description="Stored lore as 'lore_id@version', sent instead of `lore`")
+    provider: Optional[str] = Field(None, description="LLM provider: xai, openai, anthropic")
+    model: Optional[str] = Field(None, description="Model name (e.g., gpt-4o, claude-sonnet-4)")
+    api_key: Optional[str] = Field(None, description="API key (overridden by .env)")
+    session_id: Optional[str] = Field(None, description="Story session to read the text from instead of `text`")
+    session_hash: Optional[str] = Field(None, description="Hash of the client's copy of the session story")
+    strip_markdown: bool = Field(False, description="Strip markdown syntax from the generated prompts")
+    priority: Optional[Literal["interactive", "background"]] = Field(None, description="Priority class; defaults to background")
+
+    @model_validator(mode="after")
+    def _check_story_source(self):
+        if "text" not in self.model_fields_set and not self.session_id:
+            raise ValueError("Send the story as `text` or a `session_id`")
+        return self
+
+    @model_validator(mode="after")
+    def _check_lore_source(self):
+        if self.lore is not None and self.lore_ref:
+            raise ValueError("Send either `lore` or `lore_ref`, not both")
+        return self
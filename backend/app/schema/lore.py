@@ -0,0 +1,41 @@
+from pydantic import BaseModel, Field, model_validator
+from typing import List, Literal, Optional
+
+from app.schema.generation import LoreItem
+
+class LoreUpsertRequest(BaseModel):
+    items: List[LoreItem] = Field(..., description="The story's complete lore set")
+
+class LoreVersionResponse(BaseModel):
+    lore_id: str = Field(...)
+    version: str = Field(..., description="Content hash of the lore set")
+    ref: str = Field(..., description="Reference to pass as `lore_ref` in generation requests")
+    items: List[LoreItem] = Field(...)
+
+class LoreCompactRequest(BaseModel):
+    lore: Optional[List[LoreItem]] = Field(None, description="Lore items to compact")
+    lore_ref: Optional[str] = Field(None, description="Stored lore to compact, as lore_id@version")
+    threshold: Optional[float] = Field(None, ge=0.0, le=1.0, description="Share of the shorter item that must overlap for two items to be merged")
+    provider: Optional[str] = Field(None)
+    model: Optional[str] = Field(None, description="Model used for merging; defaults to the provider's cheapest. For provider \"auto\", the routing class")
+    api_key: Optional[str] = Field(None)
+    priority: Optional[Literal["interactive", "background"]] = Field(None, description="Priority class; defaults to background")
+
+    @model_validator(mode="after")
+    def _check_lore_source(self):
+        if self.lore is not None and self.lore_ref:
+            raise ValueError("Send either `lore` or `lore_ref`, not both")
+        return self
+
+class LoreCluster(BaseModel):
+    category: str = Field(...)
+    items: List[int] = Field(..., description="Indices of the merged items in the original lore")
+    merged: Optional[str] = Field(None, description="The merged item text")
+    error: Optional[str] = Field(None, description="Why the cluster was left unmerged")
+
+class LoreCompactResponse(BaseModel):
+    lore: List[LoreItem] = Field(..., description="Proposed compacted lore set")
+    clusters: List[LoreCluster] = Field(...)
+    tokens_before: int = Field(..., description="Estimated prompt tokens of the original lore")
+    tokens_after: int = Field(..., description="Estimated prompt tokens of the compacted lore")
+    tokens_saved_per_generation: int = Field(...)
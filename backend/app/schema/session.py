@@ -0,0 +1,19 @@
+from pydantic import BaseModel, Field
+from typing import List
+
+class StoryUpload(BaseModel):
+    text: str = Field(..., description="Full story text")
+
+class StoryDelta(BaseModel):
+    offset: int = Field(..., ge=0, description="Character offset the edit starts at")
+    delete: int = Field(0, ge=0, description="Number of characters removed at offset")
+    insert: str = Field("", description="Text inserted at offset")
+
+class StoryDeltaRequest(BaseModel):
+    base_hash: str = Field(..., description="Hash of the story the deltas were computed against")
+    deltas: List[StoryDelta] = Field(..., description="Edits, applied in order")
+
+class StorySessionResponse(BaseModel):
+    session_id: str = Field(...)
+    hash: str = Field(..., description="SHA-256 of the stored story text")
+    length: int = Field(...)
@@ -0,0 +1,115 @@
+"""
+Multi-worker launcher for production.
+
+    python -m app.serve --host 0.0.0.0 --port 8000 --workers 4
+
+The app is imported once in this parent process before the workers are
+forked, so they share its memory pages and start without re-importing the
+provider SDKs. Each worker runs uvicorn on the shared listening socket.
+
+SIGTERM (or Ctrl-C) is forwarded to the workers, which stop taking new
+generations, let active streams finish for up to `drain_timeout_seconds`
+and then exit; `/health` reports drain progress meanwhile. The socket is
+opened with SO_REUSEPORT where available, so a new release can start on the
+same port while the old one drains. Crashed workers are replaced.
+
+Admin commands that act on in-flight generations reach every worker: each
+listens on a Unix socket in a temporary directory (see app.core.workers).
+"""
+import argparse
+import logging
+import os
+import shutil
+import signal
+import socket
+import sys
+import tempfile
+import time
+
+import uvicorn
+
+from app.config import settings
+from app.core.workers import worker_control
+from app.main import app
+
+logger = logging.getLogger(__name__)
+
+
+def _bind(host: str, port: int) -> socket.socket:
+    sock = socket.socket(socket.AF_INET6 if ":" in host else socket.AF_INET)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    if hasattr(socket, "SO_REUSEPORT"):
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+    sock.bind((host, port))
+    sock.listen(2048)
+    sock.set_inheritable(True)
+    return sock
+
+
+def _spawn(sock: socket.socket) -> int:
+    pid = os.fork()
+    if pid:
+        return pid
+
+    # Worker: uvicorn installs its own signal handlers; the app's lifespan
+    # wraps SIGTERM to drain before uvicorn shuts down
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    worker_control.listen()
+    config = uvicorn.Config(
+        app,
+        lifespan="on",
+        timeout_graceful_shutdown=int(settings.drain_timeout_seconds) + 5,
+    )
+    uvicorn.Server(config).run(sockets=[sock])
+    os._exit(0)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Run the backend with preloaded, forked workers")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    sock = _bind(args.host, args.port)
+    worker_control.directory = tempfile.mkdtemp(prefix="vodnik-workers-")
+    workers = {_spawn(sock) for _ in range(args.workers)}
+    logger.info(f"Serving on {args.host}:{args.port} with {len(workers)} worker(s)")
+
+    stopping = False
+
+    def stop(signum, frame):
+        nonlocal stopping
+        if stopping and signum == signal.SIGINT:
+            # Second Ctrl-C: skip the drain
+            for pid in workers:
+                os.kill(pid, signal.SIGKILL)
+            return
+        stopping = True
+        for pid in workers:
+            os.kill(pid, signal.SIGTERM)
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+
+    while workers:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        except InterruptedError:
+            continue
+        workers.discard(pid)
+        if not stopping:
+            logger.warning(f"Worker {pid} exited with status {status}, restarting")
+            time.sleep(1)
+            workers.add(_spawn(sock))
+
+    sock.close()
+    shutil.rmtree(worker_control.directory, ignore_errors=True)
+    sys.exit(0)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,12 +1,20 @@
 from abc import ABC, abstractmethod
 from typing import Iterator
 
+from app.core.exceptions import GenerationCancelledError
+from app.core.generations import generations
+from app.core.priority import priorities
 from app.providers.base import LLMProvider
+from app.providers.routing import model_router
+from app.text_generation.lore import LoreVersion, format_lore
+from app.text_generation.story_memory import StoryMemory, format_story_summary
+from app.text_generation.word_limit import limit_words, truncate_words
 
 
 class TextGenerator(ABC):
-    def __init__(self, provider: LLMProvider):
+    def __init__(self, provider: LLMProvider, story_memory: StoryMemory | None = None):
         self.provider = provider
+        self.story_memory = story_memory
 
     @abstractmethod
     def generate(self, text: str, additional_instructions: str, word_count: int, **kwargs) -> str:
@@ -18,41 +26,83 @@ class TextGenerator(ABC):
         """Streams text generation, yielding chunks."""
         pass
 
-    def _format_lore(self, lore_items: list) -> str:
+    def _format_lore(self, lore_items) -> str:
         """Formats lore items into a structured context string for the LLM."""
-        if not lore_items:
-            return ""
-
-        # Group lore by category
-        categories = {}
-        for item in lore_items:
-            category = item.get('category', 'other')
-            if category not in categories:
-                categories[category] = []
-            categories[category].append(item.get('text', ''))
-
-        # Build formatted string
-        lore_text = "\n\nSTORY CONTEXT AND LORE:\n"
-
-        # Map category keys to display names
-        category_names = {
-            'character': 'Characters',
-            'setting': 'Setting',
-            'plot point': 'Plot Points'
-        }
-
-        for category_key, items in categories.items():
-            display_name = category_names.get(category_key, category_key.title())
-            lore_text += f"\n{display_name}:\n"
-            for item_text in items:
-                lore_text += f"• {item_text}\n"
-
-        return lore_text
-
-    def _call_llm(self, messages: list, temperature: float = 0.8, max_tokens: int = 1000) -> str:
-        """Call the LLM provider with the given messages."""
-        return self.provider.generate(messages, temperature, max_tokens)
-
-    def _stream_llm(self, messages: list, temperature: float = 0.8, max_tokens: int = 1000) -> Iterator[str]:
-        """Stream from the LLM provider, yielding text chunks."""
-        yield from self.provider.stream(messages, temperature, max_tokens)
+        if isinstance(lore_items, LoreVersion):
+            return lore_items.formatted
+        return format_lore(lore_items)
+
+    def _condense_story(self, text: str) -> tuple[str, str]:
+        """
+        Split story text into a prompt block summarizing older material and
+        the verbatim recent window. Without story memory the text is kept whole.
+        """
+        if self.story_memory is None:
+            return "", text
+        summary, recent = self.story_memory.condense(text)
+        return format_story_summary(summary), recent
+
+    @property
+    def _stats_key(self) -> str:
+        return f"{self.provider.name}:{self.provider.model}"
+
+    def _call_llm(
+        self,
+        messages: list,
+        temperature: float = 0.8,
+        max_tokens: int = 1000,
+        word_count: int | None = None,
+        prediction: str | None = None,
+    ) -> str:
+        """
+        Call the LLM provider with the given messages.
+
+        When `word_count` is given, max_tokens is derived from it and the
+        response is cut at the first sentence boundary past the target.
+        `prediction` is passed to providers that support predicted outputs.
+        """
+        if word_count is not None:
+            max_tokens = self.provider.max_tokens_for_words(word_count)
+        kwargs = {"prediction": prediction} if prediction else {}
+
+        try:
+            with priorities.slot(self.provider.priority), generations.track_call(self.provider):
+                text = self.provider.generate(messages, temperature, max_tokens, **kwargs)
+        except GenerationCancelledError:
+            raise
+        except Exception:
+            model_router.track_call(self._stats_key, ok=False)
+            raise
+        model_router.track_call(self._stats_key, ok=True)
+
+        return text if word_count is None else truncate_words(text, word_count)
+
+    def _stream_llm(
+        self,
+        messages: list,
+        temperature: float = 0.8,
+        max_tokens: int = 1000,
+        word_count: int | None = None,
+        prediction: str | None = None,
+    ) -> Iterator[str]:
+        """
+        Stream from the LLM provider, yielding text chunks.
+
+        When `word_count` is given, max_tokens is derived from it and the
+        upstream stream is closed at the first sentence boundary past the target.
+        `prediction` is passed to providers that support predicted outputs.
+        """
+        if word_count is not None:
+            max_tokens = self.provider.max_tokens_for_words(word_count)
+        kwargs = {"prediction": prediction} if prediction else {}
+
+        # Started once its priority class has a free slot; registered for
+        # inspection and cancellation; latency statistics from all traffic
+        # feed provider="auto" routing
+        stream = self.provider.stream(messages, temperature, max_tokens, **kwargs)
+        chunks = model_router.track_stream(self._stats_key, generations.track_stream(self.provider, stream))
+        chunks = priorities.track_stream(self.provider.priority, chunks)
+        if word_count is None:
+            yield from chunks
+        else:
+            yield from limit_words(chunks, word_count)
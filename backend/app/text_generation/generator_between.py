@@ -2,34 +2,42 @@ from typing import Iterator
 
 from app.text_generation.generator import TextGenerator
 from app.providers.base import LLMProvider
+from app.text_generation.story_memory import StoryMemory
 
 
 class TextGeneratorBetween(TextGenerator):
-    def __init__(self, provider: LLMProvider):
-        super().__init__(provider)
+    def __init__(self, provider: LLMProvider, story_memory: StoryMemory | None = None):
+        super().__init__(provider, story_memory)
 
     def _build_messages(self, text: str, additional_instructions: str, word_count: int, current_position: int, lore: list = None) -> list:
         """Build the messages for text generation."""
         lore_context = self._format_lore(lore) if lore else ""
+        text_after = text[current_position:]
+        if self.story_memory is not None:
+            # Keep whole paragraphs of the following text, up to the window size.
+            # Indexing the whole story first lets the text before reuse that index.
+            end = self.story_memory.index_for(text).window_after(current_position, self.story_memory.window_chars)
+            text_after = text[current_position:end]
+        story_summary, text_before = self._condense_story(text[:current_position])
 
         system_content = f"""You are a story writing assistant.
 The user is asking for you to add {word_count} words of text between two already written segments that they will share.
-You must return only your insertions, without any preamble or any of the text provided.{lore_context}
+You must return only your insertions, without any preamble or any of the text provided.{lore_context}{story_summary}
 
 In addition, they have provided these instructions:
 {additional_instructions}"""
 
         return [
             {"role": "system", "content": system_content},
-            {"role": "user", "content": f">>> Starting text: {text[:current_position]}. >>> Ending text: {text[current_position:]}"}
+            {"role": "user", "content": f">>> Starting text: {text_before}. >>> Ending text: {text_after}"}
         ]
 
     def generate(self, text: str, additional_instructions: str, word_count: int, current_position: int, lore: list = None, **kwargs) -> str:
         """Autogenerates text between two segments."""
         messages = self._build_messages(text, additional_instructions, word_count, current_position, lore)
-        return self._call_llm(messages)
+        return self._call_llm(messages, word_count=word_count)
 
     def stream(self, text: str, additional_instructions: str, word_count: int, current_position: int, lore: list = None, **kwargs) -> Iterator[str]:
         """Streams text between two segments."""
         messages = self._build_messages(text, additional_instructions, word_count, current_position, lore)
-        yield from self._stream_llm(messages)
+        yield from self._stream_llm(messages, word_count=word_count)
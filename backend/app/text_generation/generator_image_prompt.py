@@ -1,9 +1,23 @@
 from typing import Iterator
 
 from app.text_generation.generator import TextGenerator
+from app.text_generation.lore import LoreVersion, lore_fields
 from app.providers.base import LLMProvider
 
 
+# Upper bound for a 2–4 sentence image prompt
+IMAGE_PROMPT_WORDS = 120
+
+
+def _format_lore_lines(lore: list) -> str:
+    lines = []
+    for item in lore:
+        category, text = lore_fields(item)
+        if text.strip():
+            lines.append(f"- [{category}] {text}")
+    return "\n".join(lines)
+
+
 class TextGeneratorImagePrompt(TextGenerator):
     def __init__(self, provider: LLMProvider):
         super().__init__(provider)
@@ -13,18 +27,13 @@ class TextGeneratorImagePrompt(TextGenerator):
 
         lore_block = ""
         if lore:
-            lore_lines = "\n".join(
-                f"- [{item['category']}] {item['text']}" for item in lore if item.get("text", "").strip()
-            )
+            if isinstance(lore, LoreVersion):
+                lore_lines = lore.cached("image_prompt", _format_lore_lines)
+            else:
+                lore_lines = _format_lore_lines(lore)
             if lore_lines:
                 lore_block = f"\n\nStory lore for reference:\n{lore_lines}"
 
-        context_block = ""
-        if text_before or text_after:
-            before_excerpt = text_before[-400:] if len(text_before) > 400 else text_before
-            after_excerpt = text_after[:200] if len(text_after) > 200 else text_after
-            context_block = f"\n\nSurrounding context (for reference only):\n...{before_excerpt}[PASSAGE]{after_excerpt}..."
-
         system_content = (
             "You are an expert prompt engineer for text-to-image AI models such as Stable Diffusion, "
             "Midjourney, and DALL-E.\n\n"
@@ -35,18 +44,26 @@ class TextGeneratorImagePrompt(TextGenerator):
             "- Be specific: describe subjects, setting, lighting, mood, composition, and art style\n"
             "- Use evocative, concrete visual language\n"
             "- Keep it to 2–4 sentences or a rich comma-separated list of descriptors"
-            f"{lore_block}{context_block}"
+            f"{lore_block}"
         )
 
+        # Passage-specific context goes in the user message so the system
+        # prompt is an identical, cacheable prefix across passages of a story
+        context_block = ""
+        if text_before or text_after:
+            before_excerpt = text_before[-400:] if len(text_before) > 400 else text_before
+            after_excerpt = text_after[:200] if len(text_after) > 200 else text_after
+            context_block = f"Surrounding context (for reference only):\n...{before_excerpt}[PASSAGE]{after_excerpt}...\n\n"
+
         return [
             {"role": "system", "content": system_content},
-            {"role": "user", "content": f"Write an image prompt for this passage:\n\n{selected_text}"},
+            {"role": "user", "content": f"{context_block}Write an image prompt for this passage:\n\n{selected_text}"},
         ]
 
     def generate(self, selected_text: str, lore: list = None, text_before: str = "", text_after: str = "", **kwargs) -> str:
         messages = self._build_messages(selected_text, lore, text_before, text_after)
-        return self._call_llm(messages)
+        return self._call_llm(messages, word_count=IMAGE_PROMPT_WORDS)
 
     def stream(self, selected_text: str, lore: list = None, text_before: str = "", text_after: str = "", **kwargs) -> Iterator[str]:
         messages = self._build_messages(selected_text, lore, text_before, text_after)
-        yield from self._stream_llm(messages)
+        yield from self._stream_llm(messages, word_count=IMAGE_PROMPT_WORDS)
@@ -2,14 +2,35 @@ from typing import Iterator
 
 from app.text_generation.generator import TextGenerator
 from app.providers.base import LLMProvider
+from app.text_generation.patches import PATCH_FORMAT, apply_patches_stream
+from app.text_generation.story_memory import StoryMemory
+
+# Rewrites get room for several times the selection, and never less than the
+# generators' default budget, so short selections can be expanded
+REWRITE_GROWTH = 4
+REWRITE_MIN_MAX_TOKENS = 1000
 
 
 class TextGeneratorModify(TextGenerator):
-    def __init__(self, provider: LLMProvider):
-        super().__init__(provider)
+    def __init__(self, provider: LLMProvider, story_memory: StoryMemory | None = None):
+        super().__init__(provider, story_memory)
+
+    def _build_messages(
+        self,
+        selected_text: str,
+        additional_instructions: str,
+        lore: list = None,
+        text_before: str = "",
+        text_after: str = "",
+        output: str = "rewrite",
+    ) -> list:
+        """
+        Build the messages for section modification. `output` is "rewrite" for
+        the whole rewritten passage, "edit" for the passage with only the
+        requested changes made, or "patch" for search/replace blocks.
+        """
 
-    def _build_messages(self, selected_text: str, additional_instructions: str, lore: list = None, text_before: str = "", text_after: str = "") -> list:
-        """Build the messages for section modification."""
+        story_summary, text_before = self._condense_story(text_before)
 
         context_block = ""
         if text_before or text_after:
@@ -22,26 +43,85 @@ The passage appears in this story context (for reference only — do NOT rewrite
 ...{before_excerpt}[PASSAGE]{after_excerpt}...
 """
 
-        system_content = f"""You are a story editing assistant. The user has selected a passage from their story and wants you to rewrite it: {context_block}
+        if output == "patch":
+            response_rules = f"""Make only the changes the instructions require. Respond ONLY with search/replace blocks in this format, one per change, in the order they appear in the passage:
 
-Instructions from the user:
-{additional_instructions}
+{PATCH_FORMAT}
 
-You should keep your response to approximately the same length as the text being replaced - {len(selected_text.split(' '))} words. 
+The SEARCH text must be copied exactly from the passage and be just long enough to be unique. Respond with nothing if no change is needed."""
+        elif output == "edit":
+            response_rules = """Make only the changes the instructions require and keep every other word, line break and punctuation mark exactly as it is.
+
+Return ONLY the edited passage — no preamble, no explanation, no surrounding quotes."""
+        else:
+            response_rules = f"""You should keep your response to approximately the same length as the text being replaced - {len(selected_text.split(' '))} words. 
 
 Return ONLY the rewritten passage — no preamble, no explanation, no surrounding quotes. Match the surrounding prose style unless instructed otherwise."""
 
+        system_content = f"""You are a story editing assistant. The user has selected a passage from their story and wants you to rewrite it: {context_block}{story_summary}
+
+Instructions from the user:
+{additional_instructions}
+
+{response_rules}"""
+
         return [
             {"role": "system", "content": system_content},
             {"role": "user", "content": selected_text}
         ]
 
-    def generate(self, selected_text: str, additional_instructions: str, lore: list = None, text_before: str = "", text_after: str = "", **kwargs) -> str:
-        """Rewrites the selected passage according to instructions."""
-        messages = self._build_messages(selected_text, additional_instructions, lore, text_before, text_after)
-        return self._call_llm(messages)
+    def _output_mode(self, edit_mode: bool) -> str:
+        if not edit_mode:
+            return "rewrite"
+        return "edit" if self.provider.supports_prediction else "patch"
+
+    def _rewrite_max_tokens(self, selected_text: str) -> int:
+        # The passage may be asked to grow ("expand this"), so the output isn't
+        # cut at the selection's length; this only bounds runaway output
+        return max(REWRITE_MIN_MAX_TOKENS, self.provider.max_tokens_for_words(REWRITE_GROWTH * len(selected_text.split())))
+
+    def _patch_max_tokens(self, selected_text: str) -> int:
+        # Room for every word to appear once as search text and once as replacement
+        return self.provider.max_tokens_for_words(2 * len(selected_text.split()))
+
+    def generate(
+        self,
+        selected_text: str,
+        additional_instructions: str,
+        lore: list = None,
+        text_before: str = "",
+        text_after: str = "",
+        edit_mode: bool = False,
+        **kwargs,
+    ) -> str:
+        """
+        Rewrites the selected passage according to instructions. In edit mode
+        only the requested changes are generated: as predicted output where the
+        provider supports it, otherwise as patches applied to the passage.
+        """
+        output = self._output_mode(edit_mode)
+        if output == "patch":
+            return "".join(self.stream(selected_text, additional_instructions, lore, text_before, text_after, edit_mode=True))
+        messages = self._build_messages(selected_text, additional_instructions, lore, text_before, text_after, output)
+        prediction = selected_text if output == "edit" else None
+        return self._call_llm(messages, max_tokens=self._rewrite_max_tokens(selected_text), prediction=prediction)
 
-    def stream(self, selected_text: str, additional_instructions: str, lore: list = None, text_before: str = "", text_after: str = "", **kwargs) -> Iterator[str]:
-        """Streams the rewritten passage."""
-        messages = self._build_messages(selected_text, additional_instructions, lore, text_before, text_after)
-        yield from self._stream_llm(messages)
+    def stream(
+        self,
+        selected_text: str,
+        additional_instructions: str,
+        lore: list = None,
+        text_before: str = "",
+        text_after: str = "",
+        edit_mode: bool = False,
+        **kwargs,
+    ) -> Iterator[str]:
+        """Streams the rewritten passage; see `generate` for edit mode."""
+        output = self._output_mode(edit_mode)
+        messages = self._build_messages(selected_text, additional_instructions, lore, text_before, text_after, output)
+        if output == "patch":
+            patches = self._stream_llm(messages, temperature=0.3, max_tokens=self._patch_max_tokens(selected_text))
+            yield from apply_patches_stream(selected_text, patches)
+            return
+        prediction = selected_text if output == "edit" else None
+        yield from self._stream_llm(messages, max_tokens=self._rewrite_max_tokens(selected_text), prediction=prediction)
@@ -2,18 +2,20 @@ from typing import Iterator
 
 from app.text_generation.generator import TextGenerator
 from app.providers.base import LLMProvider
+from app.text_generation.story_memory import StoryMemory
 
 
 class TextGeneratorNext(TextGenerator):
-    def __init__(self, provider: LLMProvider):
-        super().__init__(provider)
+    def __init__(self, provider: LLMProvider, story_memory: StoryMemory | None = None):
+        super().__init__(provider, story_memory)
 
     def _build_messages(self, text: str, additional_instructions: str, word_count: int, lore: list = None) -> list:
         """Build the messages for text generation."""
         lore_context = self._format_lore(lore) if lore else ""
+        story_summary, text = self._condense_story(text)
 
         system_content = f"""You are a story writing assistant.
-The user will provide the last lines of text, append it with writing of your own.{lore_context}
+The user will provide the last lines of text, append it with writing of your own.{lore_context}{story_summary}
 
 The user has also provided some additional instructions on where they want the story to go:
 {additional_instructions}
@@ -28,9 +30,9 @@ Add about {word_count} words with no preamble, only the text."""
     def generate(self, text: str, additional_instructions: str, word_count: int, lore: list = None, **kwargs) -> str:
         """Autogenerates the next line of the text."""
         messages = self._build_messages(text, additional_instructions, word_count, lore)
-        return self._call_llm(messages)
+        return self._call_llm(messages, word_count=word_count)
 
     def stream(self, text: str, additional_instructions: str, word_count: int, lore: list = None, **kwargs) -> Iterator[str]:
         """Streams the next line of the text."""
         messages = self._build_messages(text, additional_instructions, word_count, lore)
-        yield from self._stream_llm(messages)
+        yield from self._stream_llm(messages, word_count=word_count)
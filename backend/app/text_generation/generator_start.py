@@ -1,9 +1,21 @@
+import math
+import queue
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from typing import Iterator
 
+from app.config import settings
 from app.text_generation.generator import TextGenerator
 from app.providers.base import LLMProvider
 
 
+_OUTLINE_LINE = re.compile(r"^\s*(?:section\s*)?\d+[.):]\s*(.+)$", re.IGNORECASE)
+# Room for up to long_form_max_sections outline lines; the outline is never cut at a word count
+OUTLINE_MAX_TOKENS = 1200
+_END = object()
+
+
 class TextGeneratorStart(TextGenerator):
     def __init__(self, provider: LLMProvider):
         super().__init__(provider)
@@ -28,12 +40,124 @@ Write about {word_count} words with no preamble, only the text."""
             {"role": "user", "content": text}
         ]
 
-    def generate(self, text: str, word_count: int, lore: list = None, **kwargs) -> str:
-        """Autogenerates the start of a story."""
+    def _build_outline_messages(self, text: str, sections: int, lore: list = None) -> list:
+        lore_context = self._format_lore(lore) if lore else ""
+        system_content = f"""You are a story writing assistant planning the opening of a story.{lore_context}
+
+Prompt:
+{text}
+
+Break the opening into {sections} consecutive sections. For each, write one line: its number, a period, and one or two sentences on what happens in it.
+Expand on the prompt but do not complete the story. Return only the {sections} numbered lines."""
+
+        return [
+            {"role": "system", "content": system_content},
+            {"role": "user", "content": text}
+        ]
+
+    def _build_section_messages(self, text: str, outline: list[str], index: int, word_count: int, lore: list = None) -> list:
+        lore_context = self._format_lore(lore) if lore else ""
+        numbered = "\n".join(f"{i + 1}. {line}" for i, line in enumerate(outline))
+        if index == 0:
+            position = "This is the first section: open the story."
+        else:
+            position = f"Section {index} ends with: {outline[index - 1]}\nPick up exactly where it leaves off, without recapping it."
+        if index < len(outline) - 1:
+            position += f"\nSection {index + 2} will cover: {outline[index + 1]}\nStop where it begins."
+
+        system_content = f"""You are a story writing assistant writing the start of a story section by section.{lore_context}
+
+Prompt:
+{text}
+
+Outline of the opening:
+{numbered}
+
+Write section {index + 1}: {outline[index]}
+{position}
+
+Write about {word_count} words of prose with no heading, preamble or section number, only the text."""
+
+        return [
+            {"role": "system", "content": system_content},
+            {"role": "user", "content": text}
+        ]
+
+    def _outline(self, text: str, sections: int, lore: list = None) -> list[str]:
+        messages = self._build_outline_messages(text, sections, lore)
+        response = self._call_llm(messages, temperature=0.7, max_tokens=OUTLINE_MAX_TOKENS)
+        lines = [match.group(1).strip() for match in map(_OUTLINE_LINE.match, response.splitlines()) if match]
+        return lines[:sections]
+
+    def _stream_long_form(self, text: str, word_count: int, lore: list = None) -> Iterator[str]:
+        """
+        Outline the opening, then draft its sections concurrently and stream
+        them in order: the first section streams live while later ones are
+        drafted into buffers, each of which is replayed and then followed
+        live once the sections before it are done.
+        """
+        sections = min(max(math.ceil(word_count / settings.long_form_section_words), 2), settings.long_form_max_sections)
+        outline = self._outline(text, sections, lore)
+        if len(outline) < 2:
+            # Couldn't get a usable outline; write it in one go
+            yield from self._stream_llm(self._build_messages(text, word_count, lore), word_count=word_count)
+            return
+
+        section_words = math.ceil(word_count / len(outline))
+        buffers = [queue.Queue() for _ in outline]
+        cancelled = threading.Event()
+
+        def draft(index: int) -> None:
+            try:
+                if cancelled.is_set():
+                    return
+                messages = self._build_section_messages(text, outline, index, section_words, lore)
+                stream = self._stream_llm(messages, word_count=section_words)
+                try:
+                    for chunk in stream:
+                        if cancelled.is_set():
+                            break
+                        buffers[index].put(chunk)
+                finally:
+                    stream.close()
+            except Exception as e:
+                buffers[index].put(e)
+            finally:
+                buffers[index].put(_END)
+
+        # Sections are submitted in order, so earlier ones get a slot first
+        pool = ThreadPoolExecutor(max_workers=settings.long_form_concurrency)
+        try:
+            for index in range(len(outline)):
+                pool.submit(draft, index)
+            for index, buffer in enumerate(buffers):
+                if index:
+                    yield "\n\n"
+                while (item := buffer.get()) is not _END:
+                    if isinstance(item, Exception):
+                        raise item
+                    yield item
+        finally:
+            cancelled.set()
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    def _use_long_form(self, word_count: int, long_form: bool | None) -> bool:
+        return word_count >= settings.long_form_min_words if long_form is None else long_form
+
+    def generate(self, text: str, word_count: int, lore: list = None, long_form: bool | None = None, **kwargs) -> str:
+        """
+        Autogenerates the start of a story. Long openings (see `long_form` and
+        settings.long_form_min_words) are outlined and drafted in parallel.
+        """
+        if self._use_long_form(word_count, long_form):
+            return "".join(self._stream_long_form(text, word_count, lore))
         messages = self._build_messages(text, word_count, lore)
-        return self._call_llm(messages)
+        return self._call_llm(messages, word_count=word_count)
 
-    def stream(self, text: str, word_count: int, lore: list = None, **kwargs) -> Iterator[str]:
+    def stream(self, text: str, word_count: int, lore: list = None, long_form: bool | None = None, **kwargs) -> Iterator[str]:
         """Streams the start of a story."""
+        if self._use_long_form(word_count, long_form):
+            yield from self._stream_long_form(text, word_count, lore)
+            return
         messages = self._build_messages(text, word_count, lore)
-        yield from self._stream_llm(messages)
+        yield from self._stream_llm(messages, word_count=word_count)
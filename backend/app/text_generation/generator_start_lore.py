@@ -1,6 +1,7 @@
 import json
 import logging
 
+from app.core.priority import priorities
 from app.providers.base import LLMProvider
 
 logger = logging.getLogger(__name__)
@@ -41,7 +42,8 @@ class TextGeneratorStartLore:
     def generate_lore(self, prompt: str, prose: str) -> list:
         """Returns a list of {category, text} dicts parsed from the LLM's JSON response."""
         messages = self._build_messages(prompt, prose)
-        raw = self.provider.generate(messages, temperature=0.7, max_tokens=800)
+        with priorities.slot(self.provider.priority):
+            raw = self.provider.generate(messages, temperature=0.7, max_tokens=800)
         raw = raw.strip()
 
         # Strip markdown code fences if the model wraps the JSON
@@ -0,0 +1,38 @@
+from typing import Iterator
+
+from app.text_generation.generator import TextGenerator
+from app.providers.base import LLMProvider
+
+
+class TextGeneratorSummary(TextGenerator):
+    """Summarizes story passages, or merges consecutive summaries, for story memory."""
+
+    def __init__(self, provider: LLMProvider):
+        super().__init__(provider)
+
+    def _build_messages(self, text: str, word_count: int, merge: bool = False) -> list:
+        if merge:
+            instruction = "Merge these consecutive story summaries into one"
+        else:
+            instruction = "Summarize this passage of a story"
+
+        return [
+            {
+                "role": "system",
+                "content": f"""You are a story continuity assistant. {instruction} in about {word_count} words.
+Keep character names, key events, relationships, locations and any unresolved threads.
+Return only the summary, no preamble.""",
+            },
+            {"role": "user", "content": text},
+        ]
+
+    def generate(self, text: str, additional_instructions: str = "", word_count: int = 120, merge: bool = False, **kwargs) -> str:
+        """Summarizes text in about `word_count` words."""
+        messages = self._build_messages(text, word_count, merge)
+        # A budget rather than a word limit, so summaries are never cut mid-thought
+        return self._call_llm(messages, temperature=0.3, max_tokens=self.provider.max_tokens_for_words(word_count))
+
+    def stream(self, text: str, additional_instructions: str = "", word_count: int = 120, merge: bool = False, **kwargs) -> Iterator[str]:
+        """Streams a summary of text in about `word_count` words."""
+        messages = self._build_messages(text, word_count, merge)
+        yield from self._stream_llm(messages, temperature=0.3, max_tokens=self.provider.max_tokens_for_words(word_count))
@@ -0,0 +1,85 @@
+import hashlib
+import json
+from typing import Callable
+
+
+def lore_fields(item) -> tuple[str, str]:
+    """(category, text) of a lore item given either as a dict or a LoreItem model."""
+    if isinstance(item, dict):
+        return item.get('category', 'other'), item.get('text', '')
+    return item.category, item.text
+
+
+def format_lore(lore_items: list) -> str:
+    """Formats lore items into a structured context string for the LLM."""
+    if not lore_items:
+        return ""
+
+    # Group lore by category
+    categories = {}
+    for item in lore_items:
+        category, text = lore_fields(item)
+        if category not in categories:
+            categories[category] = []
+        categories[category].append(text)
+
+    # Build formatted string
+    lore_text = "\n\nSTORY CONTEXT AND LORE:\n"
+
+    # Map category keys to display names
+    category_names = {
+        'character': 'Characters',
+        'setting': 'Setting',
+        'plot point': 'Plot Points'
+    }
+
+    for category_key, items in categories.items():
+        display_name = category_names.get(category_key, category_key.title())
+        lore_text += f"\n{display_name}:\n"
+        for item_text in items:
+            lore_text += f"• {item_text}\n"
+
+    return lore_text
+
+
+def lore_version(lore_items: list) -> str:
+    """Content hash identifying a lore set; identical items give the same version."""
+    canonical = json.dumps(lore_items, sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()[:16]
+
+
+class LoreVersion:
+    """
+    An immutable, already-validated lore set.
+
+    Behaves like the list of `{category, text}` dicts generators normally
+    receive, but memoizes anything derived from it (the formatted prompt
+    block, indexes) so repeated generations against the same version skip
+    that work.
+    """
+
+    def __init__(self, lore_id: str, items: list[dict]):
+        self.lore_id = lore_id
+        self.items = items
+        self.version = lore_version(items)
+        self._derived: dict[str, object] = {}
+
+    @property
+    def ref(self) -> str:
+        return f"{self.lore_id}@{self.version}"
+
+    @property
+    def formatted(self) -> str:
+        return self.cached("formatted", format_lore)
+
+    def cached(self, key: str, build: Callable[[list[dict]], object]):
+        """Return `build(items)`, computing it once per version."""
+        if key not in self._derived:
+            self._derived[key] = build(self.items)
+        return self._derived[key]
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def __len__(self) -> int:
+        return len(self.items)
@@ -0,0 +1,177 @@
+import hashlib
+import logging
+import random
+import re
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterator
+
+from app.providers.base import LLMProvider
+from app.text_generation.generator import TextGenerator
+from app.text_generation.lore import format_lore
+
+logger = logging.getLogger(__name__)
+
+_SHINGLE_CHARS = 4
+_NUM_HASHES = 64
+_BANDS = 32  # 2 rows per band: pairs with similarity around 0.2 or more usually share a bucket
+# Each MinHash function is the 64-bit shingle hash XORed with a fixed random mask
+_MASKS = [random.Random(1789 + i).getrandbits(64) for i in range(_NUM_HASHES)]
+
+
+def _shingles(text: str) -> set[int]:
+    """Hashed character 4-grams of the normalized text, so "smuggler" and "smuggles" overlap."""
+    normalized = " ".join(re.findall(r"\w+", text.lower()))
+    if not normalized:
+        return set()
+    if len(normalized) <= _SHINGLE_CHARS:
+        grams = {normalized}
+    else:
+        grams = {normalized[i:i + _SHINGLE_CHARS] for i in range(len(normalized) - _SHINGLE_CHARS + 1)}
+    return {int.from_bytes(hashlib.blake2b(g.encode("utf-8"), digest_size=8).digest(), "big") for g in grams}
+
+
+def _minhash(shingles: set[int]) -> tuple[int, ...]:
+    return tuple(min(s ^ mask for s in shingles) for mask in _MASKS)
+
+
+def _containment(sig_a: tuple, sig_b: tuple, size_a: int, size_b: int) -> float:
+    """
+    Estimated |A ∩ B| / min(|A|, |B|) from the MinHash Jaccard estimate, so a
+    short note that is mostly contained in a longer one still counts as overlap.
+    """
+    jaccard = sum(x == y for x, y in zip(sig_a, sig_b)) / _NUM_HASHES
+    intersection = jaccard * (size_a + size_b) / (1 + jaccard)
+    return intersection / max(min(size_a, size_b), 1)
+
+
+def find_clusters(items: list[tuple[str, str]], threshold: float = 0.5) -> list[list[int]]:
+    """
+    Group near-duplicate or overlapping lore items, given as (category, text),
+    into clusters of indices. Items are only compared within their category,
+    and only pairs that share a MinHash LSH bucket are scored.
+    """
+    shingles = [_shingles(text) for _, text in items]
+    signatures = [_minhash(s) if s else None for s in shingles]
+
+    rows = _NUM_HASHES // _BANDS
+    buckets: dict[tuple, list[int]] = defaultdict(list)
+    for i, (category, _) in enumerate(items):
+        if signatures[i] is None:
+            continue
+        for band in range(_BANDS):
+            buckets[(category, band, signatures[i][band * rows:(band + 1) * rows])].append(i)
+
+    parent = list(range(len(items)))
+
+    def root(i: int) -> int:
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    checked = set()
+    for members in buckets.values():
+        for x in range(len(members)):
+            for y in range(x + 1, len(members)):
+                i, j = members[x], members[y]
+                if (i, j) in checked or root(i) == root(j):
+                    continue
+                checked.add((i, j))
+                score = _containment(signatures[i], signatures[j], len(shingles[i]), len(shingles[j]))
+                if score >= threshold:
+                    parent[root(j)] = root(i)
+
+    clusters = defaultdict(list)
+    for i in range(len(items)):
+        clusters[root(i)].append(i)
+    return [members for members in clusters.values() if len(members) > 1]
+
+
+class TextGeneratorLoreMerge(TextGenerator):
+    """Merges a cluster of overlapping lore notes into one with a small model."""
+
+    def __init__(self, provider: LLMProvider):
+        super().__init__(provider)
+
+    def _build_messages(self, notes: str, category: str) -> list:
+        system_content = (
+            "You are a story worldbuilding assistant. The writer's lore notes below are all in the "
+            f'category "{category}" and overlap or repeat each other.\n\n'
+            "Merge them into a single note that keeps every distinct fact, name and detail, "
+            "drops the repetition, and is no longer than needed. "
+            "Return ONLY the merged note text — no preamble, no bullet, no quotes."
+        )
+        return [
+            {"role": "system", "content": system_content},
+            {"role": "user", "content": notes},
+        ]
+
+    def merge(self, category: str, texts: list[str]) -> str:
+        """Merges lore notes of one category into a single note."""
+        notes = "\n".join(f"- {text}" for text in texts)
+        return self.generate(notes, word_count=sum(len(text.split()) for text in texts), category=category)
+
+    def generate(self, text: str, additional_instructions: str = "", word_count: int = 100, category: str = "", **kwargs) -> str:
+        """Merges the bulleted notes in text, budgeting `word_count` words for the result."""
+        messages = self._build_messages(text, category)
+        return self._call_llm(messages, temperature=0.2, max_tokens=self.provider.max_tokens_for_words(word_count)).strip()
+
+    def stream(self, text: str, additional_instructions: str = "", word_count: int = 100, category: str = "", **kwargs) -> Iterator[str]:
+        """Streams the merge of the bulleted notes in text."""
+        messages = self._build_messages(text, category)
+        yield from self._stream_llm(messages, temperature=0.2, max_tokens=self.provider.max_tokens_for_words(word_count))
+
+
+def compact_lore(items: list[tuple[str, str]], merger: TextGeneratorLoreMerge, threshold: float = 0.5, concurrency: int = 4) -> dict:
+    """
+    Propose a compacted lore set: each cluster of overlapping items is merged
+    into one (kept in place of its first item), everything else is kept as
+    is. Clusters whose merge fails are left unmerged and reported.
+    """
+    clusters = find_clusters(items, threshold)
+
+    def merge(cluster: list[int]) -> str:
+        return merger.merge(items[cluster[0]][0], [items[i][1] for i in cluster])
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        futures = [pool.submit(merge, cluster) for cluster in clusters]
+
+    replaced: dict[int, str | None] = {}
+    report = []
+    for cluster, future in zip(clusters, futures):
+        entry = {"category": items[cluster[0]][0], "items": cluster}
+        try:
+            merged = future.result()
+        except Exception as e:
+            logger.warning(f"Lore merge failed for items {cluster}: {e}")
+            entry["error"] = str(e)
+            report.append(entry)
+            continue
+        entry["merged"] = merged
+        report.append(entry)
+        replaced[cluster[0]] = merged
+        for i in cluster[1:]:
+            replaced[i] = None
+
+    compacted = []
+    for i, (category, text) in enumerate(items):
+        text = replaced.get(i, text)
+        if text and text.strip():
+            compacted.append({"category": category, "text": text})
+
+    original = [{"category": category, "text": text} for category, text in items]
+    tokens_before = _prompt_tokens(original, merger.provider)
+    tokens_after = _prompt_tokens(compacted, merger.provider)
+    return {
+        "lore": compacted,
+        "clusters": report,
+        "tokens_before": tokens_before,
+        "tokens_after": tokens_after,
+        "tokens_saved_per_generation": tokens_before - tokens_after,
+    }
+
+
+def _prompt_tokens(items: list[dict], provider: LLMProvider) -> int:
+    """Estimated tokens the lore block adds to every generation prompt."""
+    return round(len(format_lore(items).split()) * provider.tokens_per_word)
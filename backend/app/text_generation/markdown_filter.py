@@ -0,0 +1,229 @@
+import re
+import string
+from typing import Iterator
+
+_PUNCTUATION = set(string.punctuation) | set("“”‘’«»…—–")
+# A single word in double underscores, such as __init__, is taken for a name rather than bold text
+_DUNDER_NAME = re.compile(r"\w+")
+
+
+def _is_space(char: str) -> bool:
+    return not char or char.isspace()
+
+
+def _is_punct(char: str) -> bool:
+    return char in _PUNCTUATION
+
+
+class MarkdownStripper:
+    """
+    Incremental, constant-memory transducer that removes markdown syntax
+    from streamed prose with minimal look-ahead.
+
+    Handles emphasis (`*`, `**`, `_`, `__`), inline code spans, heading
+    hashes, blockquote markers and code fence lines. Emphasis and code
+    markers are only removed in matching pairs, using CommonMark's flanking
+    rules, so "5 * 3", snake_case names and __init__ are kept as written.
+    Text after an opening marker is held back until its closer arrives, but
+    only for about a word: a span still open at the end of the line or
+    after `MAX_HOLD_CHARS` is emitted with its markers as plain text, so
+    longer emphasized passages keep their markers rather than delay the
+    stream.
+    """
+
+    MAX_HEADING_LEVEL = 6
+    MAX_HOLD_CHARS = 40
+
+    def __init__(self):
+        self._line_start = True
+        self._in_fence_line = False
+        self._held = ""        # Line-start marker (# or >) awaiting look-ahead
+        self._run = ""         # Run of *, _ or ` awaiting the character after it
+        self._run_prev = ""    # Character before that run
+        self._run_line_start = False
+        self._prev = "\n"      # Last character of the source text seen
+        self._pieces: list[str] = []  # Text since the outermost open marker
+        self._openers: list[list] = []  # [char, count, index of its marker in _pieces]
+        self._buffered = 0
+
+    def feed(self, chunk: str) -> str:
+        """Consume a chunk and return the text that is safe to emit."""
+        out = []
+        for char in chunk:
+            self._step(char, out)
+        return "".join(out)
+
+    def flush(self) -> str:
+        """Return any held-back text at the end of the stream."""
+        out = []
+        if self._run:
+            self._resolve_run("", out)
+        self._release(out)
+        held, self._held = self._held, ""
+        if held.startswith("#"):
+            out.append(held)
+        return "".join(out)
+
+    def _step(self, char: str, out: list) -> None:
+        if self._in_fence_line:
+            # Drop the whole ```lang line, including its newline
+            if char == "\n":
+                self._in_fence_line = False
+                self._line_start = True
+            return
+
+        if self._run:
+            if char == self._run[0] and len(self._run) < self.MAX_HOLD_CHARS:
+                self._run += char
+                return
+            self._resolve_run(char, out)
+            if self._in_fence_line:
+                self._step(char, out)
+                return
+
+        held = self._held
+        if held:
+            if held[0] == "#":
+                if char == "#" and len(held) < self.MAX_HEADING_LEVEL:
+                    self._held += char
+                    return
+                self._held = ""
+                if char == " ":
+                    return
+                self._emit(held, out)
+            elif held == ">":
+                self._held = ""
+                if char == " ":
+                    return
+
+        if self._line_start:
+            if char in "#>":
+                self._held = char
+                self._line_start = False
+                return
+            if char == " " or char == "\t":
+                out.append(char)
+                return
+
+        in_code = bool(self._openers) and self._openers[-1][0] == "`"
+        if char == "`" or (char in "*_" and not in_code):
+            self._run = char
+            self._run_prev = self._prev
+            self._run_line_start = self._line_start
+            self._line_start = False
+            return
+
+        if char == "\n":
+            # Emphasis and code spans don't continue past the line
+            self._release(out)
+            self._line_start = True
+        else:
+            self._line_start = False
+        self._emit(char, out)
+
+    def _resolve_run(self, next_char: str, out: list) -> None:
+        """Decide whether a complete run of markers opens, closes or is literal text."""
+        run, prev = self._run, self._run_prev
+        self._run = ""
+        self._prev = run[-1]
+        char = run[0]
+
+        if char == "`":
+            if self._openers and self._openers[-1][0] == "`":
+                opener = self._openers[-1]
+                if opener[1] == len(run):
+                    self._close(len(self._openers) - 1, len(run), out)
+                else:
+                    self._emit(run, out)
+            elif self._run_line_start and len(run) >= 3:
+                self._in_fence_line = True
+            else:
+                self._open(run, out)
+            return
+
+        left = not _is_space(next_char) and (not _is_punct(next_char) or _is_space(prev) or _is_punct(prev))
+        right = not _is_space(prev) and (not _is_punct(prev) or _is_space(next_char) or _is_punct(next_char))
+        if char == "*":
+            can_open, can_close = left, right
+            if run == "*" and self._run_line_start and next_char == " ":
+                return  # List bullet
+        else:
+            # Underscores inside a word (snake_case) neither open nor close
+            can_open = left and (not right or _is_punct(prev))
+            can_close = right and (not left or _is_punct(next_char))
+
+        if can_close:
+            for index in range(len(self._openers) - 1, -1, -1):
+                opener_char, count, marker = self._openers[index]
+                if opener_char != char:
+                    continue
+                content = "".join(self._pieces[marker + 1:])
+                if char == "_" and len(run) >= 2 and count >= 2 and _DUNDER_NAME.fullmatch(content):
+                    break
+                self._close(index, min(count, len(run)), out, rest=run[min(count, len(run)):])
+                return
+        if can_open:
+            self._open(run, out)
+        else:
+            self._emit(run, out)
+
+    def _open(self, run: str, out: list) -> None:
+        self._pieces.append(run)
+        self._buffered += len(run)
+        self._openers.append([run[0], len(run), len(self._pieces) - 1])
+
+    def _close(self, index: int, count: int, out: list, rest: str = "") -> None:
+        """Drop `count` markers from the opener at `index` and from its closer; openers above it stay literal."""
+        opener = self._openers[index]
+        del self._openers[index + 1:]
+        opener[1] -= count
+        self._pieces[opener[2]] = opener[0] * opener[1]
+        if not opener[1]:
+            self._openers.pop()
+        if not self._openers:
+            out.append("".join(self._pieces))
+            self._pieces = []
+            self._buffered = 0
+        if rest:
+            self._emit(rest, out)
+
+    def _emit(self, text: str, out: list) -> None:
+        self._prev = text[-1]
+        if not self._openers:
+            out.append(text)
+            return
+        self._pieces.append(text)
+        self._buffered += len(text)
+        if self._buffered > self.MAX_HOLD_CHARS:
+            self._release(out)
+
+    def _release(self, out: list) -> None:
+        """Give up on the open markers: emit them and the text after them as written."""
+        if self._pieces:
+            out.append("".join(self._pieces))
+        self._pieces = []
+        self._openers = []
+        self._buffered = 0
+
+
+def strip_markdown_stream(chunks: Iterator[str]) -> Iterator[str]:
+    """Wrap a chunk iterator, stripping markdown incrementally."""
+    stripper = MarkdownStripper()
+    try:
+        for chunk in chunks:
+            text = stripper.feed(chunk)
+            if text:
+                yield text
+        tail = stripper.flush()
+        if tail:
+            yield tail
+    finally:
+        close = getattr(chunks, "close", None)
+        if close:
+            close()
+
+
+def strip_markdown(text: str) -> str:
+    """Strip markdown from a complete (non-streamed) response."""
+    stripper = MarkdownStripper()
+    return stripper.feed(text) + stripper.flush()
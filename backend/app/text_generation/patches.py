@@ -0,0 +1,67 @@
+import logging
+import re
+from typing import Iterator
+
+logger = logging.getLogger(__name__)
+
+PATCH_FORMAT = """<<<<<<< SEARCH
+exact text copied from the passage
+=======
+replacement text
+>>>>>>> REPLACE"""
+
+_BLOCK = re.compile(r"<<<<<<< SEARCH\n(.*?)\n?=======\n(.*?)\n?>>>>>>> REPLACE", re.DOTALL)
+
+
+def _locate(text: str, find: str, start: int) -> tuple[int, int] | None:
+    """Span of `find` in `text` at or after `start`, tolerating whitespace differences."""
+    pos = text.find(find, start)
+    if pos >= 0:
+        return pos, pos + len(find)
+    words = find.split()
+    if not words:
+        return None
+    match = re.compile(r"\s+".join(re.escape(word) for word in words)).search(text, start)
+    return match.span() if match else None
+
+
+def apply_patches_stream(original: str, chunks: Iterator[str]) -> Iterator[str]:
+    """
+    Turn a stream of search/replace blocks into the rewritten passage.
+
+    Each block is applied as soon as it is complete: the untouched original
+    text up to its match and the replacement are yielded, so the rewritten
+    passage streams out in order while the model only emits the edits.
+    Blocks whose search text can't be found after the previous edit are
+    skipped. A response with no blocks at all is taken as a full rewrite.
+    """
+    buffer = ""
+    raw = []
+    cursor = 0
+    applied = 0
+    try:
+        for chunk in chunks:
+            raw.append(chunk)
+            buffer += chunk
+            consumed = 0
+            for match in _BLOCK.finditer(buffer):
+                consumed = match.end()
+                find, replace = match.group(1), match.group(2)
+                span = _locate(original, find, cursor) if find.strip() else None
+                if span is None:
+                    logger.warning(f"Edit patch search text not found in passage: {find[:60]!r}")
+                    continue
+                yield original[cursor:span[0]] + replace
+                cursor = span[1]
+                applied += 1
+            buffer = buffer[consumed:]
+    finally:
+        chunks.close()
+
+    response = "".join(raw).strip()
+    if not applied and response and "<<<<<<< SEARCH" not in response:
+        # The model rewrote the passage instead of patching it
+        yield response
+        return
+    yield original[cursor:]
+
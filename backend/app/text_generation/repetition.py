@@ -0,0 +1,152 @@
+import logging
+from collections import defaultdict, deque
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+_HASH_BASE = 1_000_003
+_HASH_MOD = (1 << 61) - 1
+
+
+class RepetitionDetector:
+    """
+    Incremental loop detector for streamed text.
+
+    Words are hashed as they complete and combined into a rolling polynomial
+    hash over the last `ngram_size` words. Each n-gram hash is kept in a
+    sliding window of `window_words` n-grams; when the same n-gram shows up
+    `max_repeats` times inside the window the output is considered looping.
+    """
+
+    def __init__(self, ngram_size: int = 8, window_words: int = 300, max_repeats: int = 3):
+        self.ngram_size = ngram_size
+        self.window_words = window_words
+        self.max_repeats = max_repeats
+
+        self._pending = ""           # Partial word carried over between chunks
+        self._pending_start = 0      # Character offset where the partial word starts
+        self._length = 0             # Characters fed so far
+        self._words: deque[tuple[int, int]] = deque()  # (word hash, start offset) of the current n-gram
+        self._rolling = 0
+        self._high_power = pow(_HASH_BASE, ngram_size - 1, _HASH_MOD)
+        self._window: deque[int] = deque()
+        self._offsets: dict[int, deque[int]] = defaultdict(deque)
+
+    def feed(self, chunk: str) -> int | None:
+        """
+        Consume a chunk of text.
+
+        Returns the character offset the output should be cut back to once a
+        loop is detected (the start of the second occurrence of the repeated
+        n-gram), or None while the text still looks healthy.
+        """
+        start = self._length
+        self._length += len(chunk)
+
+        for i, char in enumerate(chunk):
+            if char.isspace():
+                if self._pending:
+                    cut = self._push_word(self._pending, self._pending_start)
+                    self._pending = ""
+                    if cut is not None:
+                        return cut
+            else:
+                if not self._pending:
+                    self._pending_start = start + i
+                self._pending += char
+
+        return None
+
+    def _push_word(self, word: str, offset: int) -> int | None:
+        """Add a completed word to the rolling hash and check the window."""
+        word_hash = hash(word.lower().strip(".,;:!?\"'()")) % _HASH_MOD
+
+        if len(self._words) == self.ngram_size:
+            old_hash, _ = self._words.popleft()
+            self._rolling = (self._rolling - old_hash * self._high_power) % _HASH_MOD
+        self._words.append((word_hash, offset))
+        self._rolling = (self._rolling * _HASH_BASE + word_hash) % _HASH_MOD
+
+        if len(self._words) < self.ngram_size:
+            return None
+
+        ngram_start = self._words[0][1]
+        ngram_hash = self._rolling
+
+        if len(self._window) == self.window_words:
+            expired = self._window.popleft()
+            offsets = self._offsets[expired]
+            offsets.popleft()
+            if not offsets:
+                del self._offsets[expired]
+
+        self._window.append(ngram_hash)
+        offsets = self._offsets[ngram_hash]
+        offsets.append(ngram_start)
+
+        if len(offsets) >= self.max_repeats:
+            return offsets[1]
+        return None
+
+
+class RepetitionStats:
+    """In-memory counters of how often the detector fires, per endpoint."""
+
+    def __init__(self):
+        self.streams: dict[str, int] = defaultdict(int)
+        self.fired: dict[str, int] = defaultdict(int)
+        self.trimmed_chars: dict[str, int] = defaultdict(int)
+
+    def record(self, endpoint: str, fired: bool, trimmed_chars: int = 0) -> None:
+        self.streams[endpoint] += 1
+        if fired:
+            self.fired[endpoint] += 1
+            self.trimmed_chars[endpoint] += trimmed_chars
+
+    def snapshot(self) -> dict:
+        return {
+            endpoint: {
+                "streams": count,
+                "fired": self.fired[endpoint],
+                "fire_rate": round(self.fired[endpoint] / count, 4) if count else 0.0,
+                "trimmed_chars": self.trimmed_chars[endpoint],
+            }
+            for endpoint, count in self.streams.items()
+        }
+
+
+repetition_stats = RepetitionStats()
+
+
+def get_repetition_detector(endpoint: str) -> RepetitionDetector | None:
+    """
+    Build a detector using the global settings merged with any per-endpoint
+    override from `settings.repetition_overrides`. Returns None if detection
+    is disabled for the endpoint.
+    """
+    override = settings.repetition_overrides.get(endpoint, {})
+    if not override.get("enabled", settings.repetition_detection):
+        return None
+
+    return RepetitionDetector(
+        ngram_size=override.get("ngram_size", settings.repetition_ngram_size),
+        window_words=override.get("window_words", settings.repetition_window_words),
+        max_repeats=override.get("max_repeats", settings.repetition_max_repeats),
+    )
+
+
+def trim_repetition(text: str, endpoint: str) -> str:
+    """Trim a looping tail from a fully generated (non-streamed) response."""
+    detector = get_repetition_detector(endpoint)
+    if detector is None:
+        return text
+
+    cut = detector.feed(text + " ")
+    repetition_stats.record(endpoint, cut is not None, len(text) - cut if cut is not None else 0)
+    if cut is None:
+        return text
+
+    logger.warning(f"Repetition loop detected on '{endpoint}', trimmed {len(text) - cut} chars")
+    return text[:cut].rstrip()
@@ -0,0 +1,97 @@
+import re
+import zlib
+from bisect import bisect_left, bisect_right
+
+
+_PARAGRAPH_BREAK = re.compile(r"\n\s*")
+_CHAPTER_HEADING = re.compile(r"^\s*(#+\s|chapter\b|part\b|prologue\b|epilogue\b)", re.IGNORECASE)
+
+
+class StoryIndex:
+    """
+    Paragraph-level index of a story: each paragraph's offsets, word count,
+    chapter-heading flag and content checksum, in parallel lists.
+
+    A story session keeps its index and carries it across edits: `edit`
+    re-scans only the paragraphs the edit touches and shifts the offsets of
+    the rest, and `prefix` indexes the text before an offset (such as
+    `current_position`) by re-scanning only the paragraph the offset is in.
+    """
+
+    def __init__(self, text: str):
+        self._reset(text)
+        self._scan(0, len(text))
+
+    def _reset(self, text: str) -> None:
+        self.text = text
+        self.starts: list[int] = []
+        self.ends: list[int] = []
+        self.words: list[int] = []
+        self.headings: list[bool] = []
+        self.checksums: list[int] = []
+
+    def __len__(self) -> int:
+        return len(self.starts)
+
+    def _scan(self, lo: int, hi: int) -> None:
+        """Append the paragraphs of text[lo:hi]; lo is 0 or where a paragraph break starts."""
+        start = lo
+        for match in _PARAGRAPH_BREAK.finditer(self.text, lo, hi):
+            if match.start() > start:
+                self._add(start, match.start())
+            start = match.end()
+        if start < hi:
+            self._add(start, hi)
+
+    def _add(self, start: int, end: int) -> None:
+        paragraph = self.text[start:end]
+        self.starts.append(start)
+        self.ends.append(end)
+        self.words.append(len(paragraph.split()))
+        self.headings.append(bool(_CHAPTER_HEADING.match(paragraph)))
+        self.checksums.append(zlib.crc32(paragraph.encode("utf-8")))
+
+    def _copy(self, source: "StoryIndex", first: int, last: int, shift: int = 0) -> None:
+        """Append paragraphs first..last-1 of `source`, moved by `shift` characters."""
+        self.starts += [start + shift for start in source.starts[first:last]] if shift else source.starts[first:last]
+        self.ends += [end + shift for end in source.ends[first:last]] if shift else source.ends[first:last]
+        self.words += source.words[first:last]
+        self.headings += source.headings[first:last]
+        self.checksums += source.checksums[first:last]
+
+    def edit(self, offset: int, delete: int, insert: str) -> "StoryIndex":
+        """Index of the text with `delete` chars at `offset` replaced by `insert`."""
+        text = self.text[:offset] + insert + self.text[offset + delete:]
+        shift = len(insert) - delete
+
+        # Re-scan from the break before the paragraph the edit starts in to
+        # the first break after the edited range; the paragraphs on either
+        # side parse the same as before.
+        first = max(bisect_right(self.starts, offset) - 1, 0)
+        lo = self.ends[first - 1] if first else 0
+        last = bisect_left(self.ends, offset + delete) + 1
+        hi = self.ends[last - 1] if last < len(self) else len(self.text)
+
+        index = StoryIndex.__new__(StoryIndex)
+        index._reset(text)
+        index._copy(self, 0, first)
+        index._scan(lo, hi + shift)
+        index._copy(self, last, len(self), shift)
+        return index
+
+    def prefix(self, text: str) -> "StoryIndex":
+        """Index of `text`, which must be a prefix of the indexed text."""
+        first = bisect_left(self.ends, len(text))
+        index = StoryIndex.__new__(StoryIndex)
+        index._reset(text)
+        index._copy(self, 0, first)
+        index._scan(self.ends[first - 1] if first else 0, len(text))
+        return index
+
+    def window_after(self, offset: int, chars: int) -> int:
+        """End offset of the last whole paragraph within `chars` after `offset`."""
+        limit = offset + chars
+        if limit >= len(self.text) or not self.starts:
+            return len(self.text)
+        i = bisect_right(self.ends, limit) - 1
+        return self.ends[i] if i >= 0 and self.ends[i] > offset else limit
@@ -0,0 +1,184 @@
+import hashlib
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING
+
+from app.config import settings
+from app.text_generation.story_index import StoryIndex
+
+if TYPE_CHECKING:
+    # generator_summary imports the generator base, which imports this module
+    from app.text_generation.generator_summary import TextGeneratorSummary
+
+
+def _digest(*parts: str) -> str:
+    h = hashlib.sha256()
+    for part in parts:
+        h.update(part.encode("utf-8"))
+        h.update(b"\x00")
+    return h.hexdigest()
+
+
+def split_blocks(index: StoryIndex, block_words: int) -> list[tuple[int, int]]:
+    """
+    Split an indexed story into (start, end) blocks at paragraph boundaries.
+
+    Chapter headings always start a new block. Otherwise a block ends at a
+    paragraph whose checksum selects it once the block has at least
+    `block_words` words (or unconditionally at twice that). Because the
+    boundaries depend on content rather than position, an edit only changes
+    the block it lands in and the blocks after it stay cache hits.
+    """
+    blocks = []
+    block_start = None
+    words = 0
+
+    for start, end, words_in, heading, checksum in zip(
+        index.starts, index.ends, index.words, index.headings, index.checksums
+    ):
+        if block_start is not None and heading:
+            blocks.append((block_start, start))
+            block_start, words = None, 0
+
+        if block_start is None:
+            block_start = start
+        words += words_in
+        if words >= block_words * 2 or (words >= block_words and checksum % 3 == 0):
+            blocks.append((block_start, end))
+            block_start, words = None, 0
+
+    if block_start is not None:
+        blocks.append((block_start, len(index.text)))
+    return blocks
+
+
+class SummaryCache:
+    """LRU cache of summaries keyed by the hash of what was summarized."""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: OrderedDict[str, str] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str) -> str | None:
+        with self._lock:
+            summary = self._entries.get(key)
+            if summary is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._entries.move_to_end(key)
+            return summary
+
+    def put(self, key: str, summary: str) -> None:
+        with self._lock:
+            self._entries[key] = summary
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+summary_cache = SummaryCache(max_entries=settings.story_memory_cache_size)
+
+
+class StoryMemory:
+    """
+    Condenses long stories into "summary of everything earlier + verbatim
+    recent window".
+
+    The text before the window is split into content-defined blocks, each
+    summarized once with a cheap model and cached by content hash. Older
+    block summaries are rolled up hierarchically in groups of `fanout`, so
+    distant material is compressed more than recent material and only
+    edited blocks (plus their ancestors) are ever re-summarized. Summaries
+    are generated like any other call, so they take a priority slot and are
+    tracked by the generation registry and the routing statistics.
+    """
+
+    def __init__(
+        self,
+        summarizer: "TextGeneratorSummary",
+        window_chars: int = 12_000,
+        block_words: int = 1_200,
+        fanout: int = 4,
+        summary_words: int = 120,
+        cache: SummaryCache = summary_cache,
+        index: StoryIndex | None = None,
+    ):
+        self.summarizer = summarizer
+        self.window_chars = window_chars
+        self.block_words = block_words
+        self.fanout = fanout
+        self.summary_words = summary_words
+        self.cache = cache
+        self.index = index
+
+    def index_for(self, text: str) -> StoryIndex:
+        """
+        Index of `text`, reusing the kept index (the story session's, or the
+        last one built) when `text` is that story or a prefix of it.
+        """
+        index = self.index
+        if index is not None:
+            if text is index.text:
+                return index
+            if index.text.startswith(text):
+                return index.prefix(text)
+        self.index = StoryIndex(text)
+        return self.index
+
+    def condense(self, text: str) -> tuple[str, str]:
+        """Return (summary of earlier text, verbatim recent text)."""
+        if len(text) <= self.window_chars:
+            return "", text
+
+        blocks = split_blocks(self.index_for(text), self.block_words)
+
+        # Keep whole blocks verbatim until the recent window is covered
+        split = len(blocks)
+        while split > 0 and len(text) - blocks[split - 1][0] <= self.window_chars:
+            split -= 1
+        split = max(split - 1, 0)
+        if split == 0:
+            return "", text
+
+        summaries = self._summarize_all(
+            [("passage", text[start:end]) for start, end in blocks[:split]]
+        )
+        return "\n\n".join(self._roll_up(summaries)), text[blocks[split][0]:]
+
+    def _roll_up(self, summaries: list[str]) -> list[str]:
+        if len(summaries) <= self.fanout:
+            return summaries
+        older, newer = summaries[:-self.fanout], summaries[-self.fanout:]
+        groups = ["\n\n".join(older[i:i + self.fanout]) for i in range(0, len(older), self.fanout)]
+        merged = self._summarize_all([("summaries", group) for group in groups])
+        return self._roll_up(merged) + newer
+
+    def _summarize_all(self, jobs: list[tuple[str, str]]) -> list[str]:
+        """Summarize several texts, running cache misses concurrently."""
+        model = self.summarizer.provider.model
+        keys = [_digest(kind, model, content) for kind, content in jobs]
+        results = [self.cache.get(key) for key in keys]
+        missing = [i for i, result in enumerate(results) if result is None]
+
+        if missing:
+            with ThreadPoolExecutor(max_workers=min(4, len(missing))) as pool:
+                for i, summary in zip(missing, pool.map(lambda i: self._summarize(*jobs[i]), missing)):
+                    self.cache.put(keys[i], summary)
+                    results[i] = summary
+
+        return results
+
+    def _summarize(self, kind: str, content: str) -> str:
+        return self.summarizer.generate(content, word_count=self.summary_words, merge=kind == "summaries")
+
+
+def format_story_summary(summary: str) -> str:
+    """Prompt block for the condensed earlier part of the story."""
+    if not summary:
+        return ""
+    return f"\n\nSUMMARY OF THE STORY SO FAR (earlier text not shown verbatim):\n{summary}\n"
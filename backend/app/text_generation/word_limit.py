@@ -0,0 +1,69 @@
+from typing import Iterator
+
+
+_SENTENCE_END = ".!?…"
+_CLOSERS = "\"'”’)]*_"
+
+
+class WordLimiter:
+    """
+    Streaming word counter that ends output at the first sentence boundary
+    once `target_words` words have been produced.
+
+    Sentence-final punctuation is only treated as a boundary once the next
+    character is known (whitespace ends the sentence, a closing quote is
+    kept, anything else such as "3.5" continues), so a boundary split across
+    chunks is still found.
+    """
+
+    def __init__(self, target_words: int):
+        self.target_words = target_words
+        self.words = 0
+        self.done = False
+        self._in_word = False
+        self._after_terminal = False
+
+    def feed(self, chunk: str) -> str:
+        """Consume a chunk and return the part of it that should be emitted."""
+        if self.done:
+            return ""
+
+        for i, char in enumerate(chunk):
+            if char.isspace():
+                if self._in_word:
+                    self.words += 1
+                    self._in_word = False
+                if self._after_terminal and self.words >= self.target_words:
+                    self.done = True
+                    return chunk[:i]
+                self._after_terminal = False
+                continue
+
+            if self._after_terminal and char not in _CLOSERS and char not in _SENTENCE_END:
+                self._after_terminal = False
+            if char in _SENTENCE_END:
+                self._after_terminal = True
+            self._in_word = True
+
+        return chunk
+
+
+def limit_words(chunks: Iterator[str], target_words: int) -> Iterator[str]:
+    """Wrap a chunk iterator, closing it at the sentence boundary after `target_words`."""
+    limiter = WordLimiter(target_words)
+    try:
+        for chunk in chunks:
+            text = limiter.feed(chunk)
+            if text:
+                yield text
+            if limiter.done:
+                break
+    finally:
+        close = getattr(chunks, "close", None)
+        if close:
+            close()
+
+
+def truncate_words(text: str, target_words: int) -> str:
+    """Apply the same sentence-boundary cut to a complete response."""
+    return WordLimiter(target_words).feed(text)
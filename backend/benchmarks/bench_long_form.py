@@ -0,0 +1,88 @@
+"""
+Benchmark long-form /generate/start: sections drafted concurrently against
+the same sections drafted one after another.
+
+Uses a simulated provider, so the numbers reflect the scheduling rather
+than any real model: the outline call returns at once, and each section
+stream waits `--ttft` seconds before its first word and then yields
+`--words` words over `--duration` seconds. The sequential run is the same
+code with long_form_concurrency set to 1. Before timing, the streamed text
+is checked to hold every section in outline order.
+
+Run from backend/:  python -m benchmarks.bench_long_form [--word-count N]
+"""
+import argparse
+import re
+import time
+
+from app.config import settings
+from app.providers.base import LLMProvider
+from app.text_generation.generator_start import TextGeneratorStart
+
+_SECTIONS = re.compile(r"into (\d+) consecutive sections")
+_SECTION = re.compile(r"Write section (\d+)")
+
+
+class SimulatedProvider(LLMProvider):
+    name = "simulated"
+    model = "simulated"
+
+    def __init__(self, ttft: float, duration: float, words: int):
+        self.ttft = ttft
+        self.duration = duration
+        self.words = words
+
+    def generate(self, messages: list[dict], temperature: float, max_tokens: int) -> str:
+        sections = int(_SECTIONS.search(messages[0]["content"]).group(1))
+        return "\n".join(f"{i + 1}. Something happens in part {i + 1}." for i in range(sections))
+
+    def stream(self, messages: list[dict], temperature: float, max_tokens: int):
+        section = _SECTION.search(messages[0]["content"]).group(1)
+        time.sleep(self.ttft)
+        for i in range(self.words):
+            time.sleep(self.duration / self.words)
+            yield f"S{section}w{i}. "
+
+
+def _run(provider: SimulatedProvider, word_count: int) -> tuple[float, float, str]:
+    start = time.perf_counter()
+    first = None
+    chunks = []
+    for chunk in TextGeneratorStart(provider).stream("A lighthouse keeper finds a door in the rock.", word_count):
+        if first is None:
+            first = time.perf_counter() - start
+        chunks.append(chunk)
+    return first, time.perf_counter() - start, "".join(chunks)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--word-count", type=int, default=3000)
+    parser.add_argument("--ttft", type=float, default=0.3, help="seconds before a section's first word")
+    parser.add_argument("--duration", type=float, default=1.0, help="seconds of output per section")
+    parser.add_argument("--words", type=int, default=20, help="words streamed per section")
+    args = parser.parse_args()
+
+    provider = SimulatedProvider(args.ttft, args.duration, args.words)
+    concurrency = settings.long_form_concurrency
+
+    _, _, text = _run(provider, args.word_count)
+    sections = re.findall(r"S(\d+)w0\.", text)
+    assert sections == [str(i + 1) for i in range(len(sections))], f"sections out of order: {sections}"
+    print(f"Start of {args.word_count} words: {len(sections)} sections, "
+          f"{args.ttft:.2f}s TTFT and {args.duration:.2f}s of output each\n")
+
+    settings.long_form_concurrency = 1
+    try:
+        _, sequential, _ = _run(provider, args.word_count)
+    finally:
+        settings.long_form_concurrency = concurrency
+    first, concurrent, _ = _run(provider, args.word_count)
+
+    print(f"  {'sequential (long_form_concurrency=1)':<40} {sequential:6.2f} s")
+    print(f"  {f'concurrent (long_form_concurrency={concurrency})':<40} {concurrent:6.2f} s, first text after {first:.2f} s")
+    print(f"\n  {sequential / concurrent:.1f}x faster")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""
+Benchmark /generate/modify edit mode against a full rewrite on long passages.
+
+By default this runs TextGeneratorModify against a simulated provider that
+streams at a fixed time-to-first-token and output rate (sleeps are scaled
+down by --speedup and the reported times scaled back up). The rewrite
+emits the whole passage; edit mode emits only search/replace patches for a
+handful of word changes, which the server applies.
+
+With --live and OPENAI_API_KEY set, the same edits are also run against
+the real API: a full rewrite, edit mode with predicted outputs, and edit
+mode forced into patch format.
+
+Run from backend/:  python -m benchmarks.bench_modify_edit [--live]
+"""
+import argparse
+import os
+import time
+from typing import Iterator
+
+from app.providers.base import LLMProvider
+from app.text_generation.generator_modify import TextGeneratorModify
+from app.text_generation.patches import PATCH_FORMAT
+
+SENTENCE = "Mara pulled the tarp over the crates of saffron and listened for the harbour watch."
+EDITS = 4
+INSTRUCTIONS = "Rename Mara to Ilse throughout and change saffron to pepper in the first few sentences."
+
+
+class SimulatedProvider(LLMProvider):
+    """Streams a fixed response word by word at a given TTFT and tokens/second."""
+
+    def __init__(self, response: str, ttft: float, tokens_per_second: float, speedup: float):
+        self.response = response
+        self.ttft = ttft
+        self.tokens_per_second = tokens_per_second
+        self.speedup = speedup
+        self.model = "simulated"
+
+    def generate(self, messages: list[dict], temperature: float, max_tokens: int) -> str:
+        return "".join(self.stream(messages, temperature, max_tokens))
+
+    def stream(self, messages: list[dict], temperature: float, max_tokens: int) -> Iterator[str]:
+        time.sleep(self.ttft / self.speedup)
+        per_word = self.tokens_per_word / self.tokens_per_second / self.speedup
+        for word in self.response.split(" "):
+            time.sleep(per_word)
+            yield word + " "
+
+
+def _passage(words: int) -> str:
+    return " ".join([SENTENCE] * (words // len(SENTENCE.split())))
+
+
+def _patches(passage: str) -> str:
+    blocks = []
+    for old, new in [("Mara pulled", "Ilse pulled"), ("of saffron", "of pepper")] * (EDITS // 2):
+        blocks.append(PATCH_FORMAT.replace("exact text copied from the passage", old).replace("replacement text", new))
+    return "\n".join(blocks)
+
+
+def _run(generator: TextGeneratorModify, passage: str, edit_mode: bool) -> tuple[float, str]:
+    start = time.perf_counter()
+    text = "".join(generator.stream(passage, INSTRUCTIONS, edit_mode=edit_mode))
+    return time.perf_counter() - start, text
+
+
+def simulated(speedup: float) -> None:
+    print(f"Simulated provider: 0.4 s TTFT, 80 tokens/s ({EDITS} word edits per passage)")
+    for words in (250, 1000, 2500):
+        passage = _passage(words)
+        full = SimulatedProvider(passage, 0.4, 80, speedup)
+        patch = SimulatedProvider(_patches(passage), 0.4, 80, speedup)
+        full_time, _ = _run(TextGeneratorModify(full), passage, edit_mode=False)
+        patch_time, edited = _run(TextGeneratorModify(patch), passage, edit_mode=True)
+        assert edited.count("Ilse") == EDITS // 2
+        print(
+            f"  {words:>5} words   rewrite {full_time * speedup:6.2f} s   "
+            f"edit (patch) {patch_time * speedup:5.2f} s   {full_time / patch_time:5.1f}x faster"
+        )
+
+
+def live() -> None:
+    from app.providers.openai import OpenAIProvider
+
+    class PatchOnly(OpenAIProvider):
+        supports_prediction = False
+
+    key = os.environ["OPENAI_API_KEY"]
+    print("OpenAI gpt-4o-mini")
+    for words in (250, 1000):
+        passage = _passage(words)
+        results = []
+        for label, provider, edit_mode in [
+            ("rewrite", OpenAIProvider(key, "gpt-4o-mini"), False),
+            ("predicted", OpenAIProvider(key, "gpt-4o-mini"), True),
+            ("patch", PatchOnly(key, "gpt-4o-mini"), True),
+        ]:
+            elapsed, _ = _run(TextGeneratorModify(provider), passage, edit_mode)
+            results.append(f"{label} {elapsed:6.2f} s")
+        print(f"  {words:>5} words   " + "   ".join(results))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--live", action="store_true", help="Also run against the OpenAI API")
+    parser.add_argument("--speedup", type=float, default=20.0, help="Scale down simulated sleeps")
+    args = parser.parse_args()
+
+    simulated(args.speedup)
+    if args.live and os.environ.get("OPENAI_API_KEY"):
+        live()
+
+
+if __name__ == "__main__":
+    main()
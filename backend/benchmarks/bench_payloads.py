@@ -0,0 +1,74 @@
+"""
+Benchmark request handling for ~1 MB generation payloads.
+
+Compares stdlib JSON against orjson and Pydantic's native JSON parser, the
+old per-item lore dict conversion against passing LoreItem models straight
+through, and the cost of decompressing the body with each supported codec.
+
+Run from backend/:  python -m benchmarks.bench_payloads
+"""
+import gzip
+import json
+import time
+
+from app.core.compression import brotli, orjson, zstandard
+from app.schema.generation import GenerateRequest
+from app.text_generation.lore import format_lore
+
+
+def _payload(target_bytes: int = 1024 * 1024) -> bytes:
+    paragraph = (
+        "Mara pulled the tarp over the crates of saffron and listened for the harbour watch. "
+        "The guild would pay double if the shipment reached the north gate before dawn.\n\n"
+    )
+    lore = [
+        {"category": ["character", "setting", "plot point"][i % 3], "text": f"Lore note {i}: " + paragraph[:120]}
+        for i in range(400)
+    ]
+    story = paragraph * ((target_bytes - len(json.dumps(lore))) // len(paragraph))
+    return json.dumps({"text": story, "word_count": 256, "lore": lore}).encode("utf-8")
+
+
+def _time(label: str, fn, repeat: int = 20) -> None:
+    fn()
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    elapsed = (time.perf_counter() - start) / repeat * 1000
+    print(f"  {label:<48} {elapsed:8.3f} ms")
+
+
+def main() -> None:
+    body = _payload()
+    print(f"Payload: {len(body) / 1024:.0f} KiB\n")
+
+    print("Parse + validate")
+    _time("json.loads + model_validate (FastAPI default)", lambda: GenerateRequest.model_validate(json.loads(body)))
+    if orjson is not None:
+        _time("orjson.loads + model_validate", lambda: GenerateRequest.model_validate(orjson.loads(body)))
+    _time("model_validate_json", lambda: GenerateRequest.model_validate_json(body))
+
+    request = GenerateRequest.model_validate_json(body)
+    print("\nLore hand-off + formatting")
+    _time("item.model_dump() per item + format_lore", lambda: format_lore([item.model_dump() for item in request.lore]))
+    _time("LoreItem models + format_lore (zero-copy)", lambda: format_lore(request.lore))
+
+    response = {"generated_text": request.text}
+    print("\nResponse rendering")
+    _time("json.dumps", lambda: json.dumps(response, ensure_ascii=False).encode("utf-8"))
+    if orjson is not None:
+        _time("orjson.dumps", lambda: orjson.dumps(response))
+
+    print("\nRequest decompression")
+    codecs = [("gzip", gzip.compress(body), gzip.decompress)]
+    if brotli is not None:
+        codecs.append(("br", brotli.compress(body), brotli.decompress))
+    if zstandard is not None:
+        codecs.append(("zstd", zstandard.ZstdCompressor().compress(body), zstandard.ZstdDecompressor().decompress))
+    for name, compressed, decompress in codecs:
+        ratio = len(body) / len(compressed)
+        _time(f"{name} ({len(compressed) / 1024:.0f} KiB, {ratio:.0f}x)", lambda: decompress(compressed))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""
+Benchmark decoding of upstream OpenAI-style SSE streams (xAI and
+OpenAI-compatible servers).
+
+Compares the previous per-line decoder (requests' iter_lines, a UTF-8
+decode and json.loads per line) against the shared buffered decoder in
+app.providers.sse, on a synthetic stream of small delta events with
+multi-byte text, keep-alive comments and a final usage event. Both read
+the same in-memory body through requests and urllib3, so the numbers
+exclude network time. The decoder's correctness tests are in
+tests/test_sse.py.
+
+Run from backend/:  python -m benchmarks.bench_sse_decoder [--events N]
+"""
+import argparse
+import io
+import json
+import time
+
+import requests
+import urllib3
+
+from app.providers.sse import iter_sse_json, orjson
+
+_WORDS = ["The", " lantern", " swung", " over", " the", " café", " door", ",", " and", " Åsa", " counted",
+          " coins", " —", " 三", "枚", ".", " 🌙", "\n\n"]
+
+
+def _stream(events: int) -> bytes:
+    lines = []
+    for i in range(events):
+        chunk = {
+            "id": "chatcmpl-1", "object": "chat.completion.chunk", "created": 1700000000, "model": "grok-3-mini",
+            "choices": [{"index": 0, "delta": {"content": _WORDS[i % len(_WORDS)]}, "finish_reason": None}],
+        }
+        lines.append(f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n")
+        if i % 100 == 0:
+            lines.append(": keep-alive\n\n")
+    usage = {"id": "chatcmpl-1", "choices": [], "usage": {"prompt_tokens": 900, "completion_tokens": events}}
+    lines.append(f"data: {json.dumps(usage)}\n\ndata: [DONE]\n\n")
+    return "".join(lines).encode("utf-8")
+
+
+def _response(body: bytes) -> requests.Response:
+    response = requests.Response()
+    response.status_code = 200
+    response.raw = urllib3.HTTPResponse(body=io.BytesIO(body), preload_content=False, decode_content=False)
+    return response
+
+
+def _old(response: requests.Response) -> list[str]:
+    out = []
+    for line in response.iter_lines():
+        if line:
+            line = line.decode("utf-8")
+            if line.startswith("data: "):
+                data_str = line[6:]
+                if data_str == "[DONE]":
+                    break
+                try:
+                    data = json.loads(data_str)
+                    choices = data.get("choices")
+                    content = choices[0]["delta"].get("content") if choices else None
+                    if content:
+                        out.append(content)
+                except json.JSONDecodeError:
+                    continue
+    return out
+
+
+def _new(response: requests.Response) -> list[str]:
+    out = []
+    for data in iter_sse_json(response):
+        choices = data.get("choices")
+        content = choices[0]["delta"].get("content") if choices else None
+        if content:
+            out.append(content)
+    return out
+
+
+def _time(label: str, fn, body: bytes, repeat: int) -> float:
+    fn(_response(body))
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn(_response(body))
+    elapsed = (time.perf_counter() - start) / repeat * 1000
+    print(f"  {label:<48} {elapsed:8.2f} ms")
+    return elapsed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--events", type=int, default=20000, help="delta events per stream")
+    parser.add_argument("--repeat", type=int, default=10)
+    args = parser.parse_args()
+
+    body = _stream(args.events)
+    print(f"Stream: {args.events} events, {len(body) / 1024:.0f} KiB\n")
+
+    old = _time("iter_lines + decode + json.loads (previous)", _old, body, args.repeat)
+    new = _time(f"buffered decoder ({'orjson' if orjson is not None else 'json'})", _new, body, args.repeat)
+    print(f"\n  {old / new:.1f}x faster, {new * 1000 / args.events:.2f} µs per event")
+
+
+if __name__ == "__main__":
+    main()
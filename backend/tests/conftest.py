@@ -0,0 +1,51 @@
+import os
+from collections import defaultdict
+
+# Keep tests from writing to the real usage ledger; must be set before app.config is imported
+os.environ.setdefault("USAGE_LEDGER_PATH", "")
+
+import pytest  # noqa: E402
+
+from app.core.rate_limit import rate_limiter  # noqa: E402
+from app.providers.base import LLMProvider  # noqa: E402
+from openai_standin import StandinServer  # noqa: E402
+
+
+class FakeProvider(LLMProvider):
+    """Returns canned text, as one piece or in word-sized chunks, and records each call's max_tokens."""
+
+    name = "fake"
+    model = "fake-model"
+
+    def __init__(self, text: str = "Done."):
+        self.text = text
+        self.max_tokens: list[int] = []
+
+    def generate(self, messages: list[dict], temperature: float, max_tokens: int, **kwargs) -> str:
+        self.max_tokens.append(max_tokens)
+        return self.text
+
+    def stream(self, messages: list[dict], temperature: float, max_tokens: int, **kwargs):
+        self.max_tokens.append(max_tokens)
+        for word in self.text.split(" "):
+            yield word + " "
+
+
+@pytest.fixture
+def fake_provider():
+    return FakeProvider
+
+
+@pytest.fixture
+def standin_server():
+    """A running stand-in OpenAI-compatible server; set `.delay` to slow its streams."""
+    server = StandinServer().start()
+    yield server
+    server.stop()
+
+
+@pytest.fixture
+def fresh_rate_limits(monkeypatch):
+    """Start with empty rate-limit windows, so requests from earlier tests don't count."""
+    monkeypatch.setattr(rate_limiter, "request_log", defaultdict(list))
+    monkeypatch.setattr(rate_limiter, "burst_log", defaultdict(list))
@@ -0,0 +1,128 @@
+"""
+Stand-in for a self-hosted OpenAI-compatible server (llama.cpp, vLLM,
+Ollama): GET /models and streaming and non-streaming POST /chat/completions,
+served by a threaded http.server. Replies are canned; each request's
+model and the peak number of concurrent completions are recorded.
+
+Run from backend/ to try the provider by hand:
+    python tests/openai_standin.py --port 8080
+then set OPENAI_COMPATIBLE_BASE_URL=http://127.0.0.1:8080/v1.
+"""
+import argparse
+import json
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+MODELS = [{"id": "tiny-llama", "max_model_len": 8192}, {"id": "other", "meta": {"n_ctx_train": 4096}}]
+REPLY = ["Héllo ", "from ", "the ", "local ", "server."]
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server: "StandinServer"
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        if self.path.rstrip("/") != "/v1/models":
+            self._send_json(404, {"error": {"message": f"Unknown path {self.path}"}})
+            return
+        self._send_json(200, {"object": "list", "data": MODELS})
+
+    def do_POST(self):
+        if self.path != "/v1/chat/completions":
+            self._send_json(404, {"error": {"message": f"Unknown path {self.path}"}})
+            return
+        request = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        with self.server.track(request):
+            if request.get("stream"):
+                try:
+                    self._stream(request)
+                except (BrokenPipeError, ConnectionResetError):
+                    pass  # The client closed the stream early or was cancelled
+            else:
+                time.sleep(self.server.delay * len(REPLY))
+                self._send_json(200, {
+                    "choices": [{"index": 0, "message": {"role": "assistant", "content": " " + "".join(REPLY) + " "}}],
+                    "usage": {"prompt_tokens": 10, "completion_tokens": len(REPLY)},
+                })
+
+    def _stream(self, request: dict) -> None:
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        for word in REPLY:
+            time.sleep(self.server.delay)
+            self._send_event({"choices": [{"index": 0, "delta": {"content": word}}]})
+        if request.get("stream_options", {}).get("include_usage"):
+            self._send_event({"choices": [], "usage": {"prompt_tokens": 10, "completion_tokens": len(REPLY)}})
+        self._send_chunk(b"data: [DONE]\n\n")
+        self._send_chunk(b"")
+
+    def _send_event(self, data: dict) -> None:
+        self._send_chunk(f"data: {json.dumps(data)}\n\n".encode())
+
+    def _send_chunk(self, data: bytes) -> None:
+        self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+
+    def _send_json(self, status: int, data: dict) -> None:
+        body = json.dumps(data).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class StandinServer(ThreadingHTTPServer):
+    """The stand-in on a background thread; `delay` is the pause before each streamed word."""
+
+    daemon_threads = True
+
+    def __init__(self, port: int = 0, delay: float = 0.0):
+        super().__init__(("127.0.0.1", port), _Handler)
+        self.delay = delay
+        self.models_requested: list[str] = []
+        self.active = 0
+        self.peak_active = 0
+        self._lock = threading.Lock()
+        self._thread: threading.Thread | None = None
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}/v1"
+
+    @contextmanager
+    def track(self, request: dict):
+        with self._lock:
+            self.models_requested.append(request.get("model"))
+            self.active += 1
+            self.peak_active = max(self.peak_active, self.active)
+        try:
+            yield
+        finally:
+            with self._lock:
+                self.active -= 1
+
+    def start(self) -> "StandinServer":
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.shutdown()
+        self.server_close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--delay", type=float, default=0.05, help="seconds before each streamed word")
+    args = parser.parse_args()
+    server = StandinServer(args.port, args.delay)
+    print(f"Serving at {server.base_url}")
+    server.serve_forever()
@@ -0,0 +1,34 @@
+import pytest
+from fastapi.testclient import TestClient
+
+from app.config import settings
+from app.main import app
+
+client = TestClient(app)
+
+ADMIN_PATHS = [
+    ("GET", "/admin/generations"),
+    ("DELETE", "/admin/generations?provider=xai"),
+    ("GET", "/admin/keys"),
+    ("GET", "/admin/priorities"),
+]
+
+
+@pytest.fixture
+def admin_token(monkeypatch):
+    monkeypatch.setattr(settings, "admin_token", "s3cret")
+    return "s3cret"
+
+
+@pytest.mark.parametrize("method,path", ADMIN_PATHS)
+def test_admin_disabled_without_token_setting(monkeypatch, method, path):
+    monkeypatch.setattr(settings, "admin_token", None)
+    assert client.request(method, path).status_code == 403
+    assert client.request(method, path, headers={"X-Admin-Token": ""}).status_code == 403
+
+
+@pytest.mark.parametrize("method,path", ADMIN_PATHS)
+def test_admin_requires_matching_token(admin_token, method, path):
+    assert client.request(method, path).status_code == 403
+    assert client.request(method, path, headers={"X-Admin-Token": "wrong"}).status_code == 403
+    assert client.request(method, path, headers={"X-Admin-Token": admin_token}).status_code == 200
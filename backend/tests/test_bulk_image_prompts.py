@@ -0,0 +1,88 @@
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.api import generate as generate_api
+from app.config import settings
+from app.main import app
+
+STORY = "The lantern swung over the door. A storm broke over the bay. Mara counted her coins."
+
+
+@pytest.fixture
+def illustrator(monkeypatch, fake_provider, fresh_rate_limits):
+    """Answers "Prompt: <passage>", and fails on the passage about the storm."""
+
+    class Illustrator(fake_provider):
+        def generate(self, messages: list[dict], temperature: float, max_tokens: int, **kwargs) -> str:
+            passage = messages[-1]["content"].rsplit("\n\n", 1)[1]
+            if "storm" in passage:
+                raise RuntimeError("upstream failed")
+            return f"Prompt: {passage}"
+
+    monkeypatch.setattr(generate_api, "_get_provider", lambda *args, **kwargs: Illustrator())
+
+
+def _range(passage: str) -> dict:
+    start = STORY.index(passage)
+    return {"start": start, "end": start + len(passage)}
+
+
+def _post(ranges: list[dict]):
+    return TestClient(app).post("/generate/image-prompt/bulk", json={"text": STORY, "ranges": ranges})
+
+
+def _events(body: str) -> tuple[dict[int, dict], dict | None]:
+    """Per-range events by index, and the summary event."""
+    results, summary = {}, None
+    for block in body.strip().split("\n\n"):
+        data = block.rsplit("data: ", 1)[1]
+        if data == "[DONE]":
+            continue
+        if block.startswith("event: summary"):
+            summary = json.loads(data)
+        else:
+            event = json.loads(data)
+            results[event["index"]] = event
+    return results, summary
+
+
+def test_each_range_gets_its_own_prompt(illustrator):
+    ranges = [_range("The lantern swung over the door."), _range("Mara counted her coins.")]
+
+    results, summary = _events(_post(ranges).text)
+
+    assert results[0] == {"index": 0, "range": ranges[0], "prompt": "Prompt: The lantern swung over the door."}
+    assert results[1]["prompt"] == "Prompt: Mara counted her coins."
+    assert summary == {"completed": 2, "failed": 0}
+
+
+def test_failures_are_reported_per_range(illustrator):
+    ranges = [
+        _range("The lantern swung over the door."),
+        {"start": 10, "end": len(STORY) + 1},
+        _range("A storm broke over the bay."),
+        {"start": 20, "end": 20},
+        _range("Mara counted her coins."),
+    ]
+
+    results, summary = _events(_post(ranges).text)
+
+    assert results[1]["error"] == f"Range 10-{len(STORY) + 1} is outside the story text"
+    assert results[3]["error"] == "Range 20-20 is outside the story text"
+    assert results[2]["error"] == "upstream failed"
+    assert [results[i]["prompt"] for i in (0, 4)] == [
+        "Prompt: The lantern swung over the door.", "Prompt: Mara counted her coins.",
+    ]
+    assert summary == {"completed": 2, "failed": 3}
+
+
+def test_too_many_ranges_are_rejected(illustrator, monkeypatch):
+    monkeypatch.setattr(settings, "image_prompt_bulk_max_ranges", 2)
+    passage = _range("Mara counted her coins.")
+
+    assert _post([passage] * 2).status_code == 200
+    response = _post([passage] * 3)
+    assert response.status_code == 422
+    assert response.json()["detail"] == "At most 2 ranges per request"
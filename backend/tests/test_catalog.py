@@ -0,0 +1,118 @@
+import pytest
+
+from app.config import settings
+from app.providers import catalog
+from app.providers.catalog import ModelCatalog
+
+
+@pytest.fixture
+def warmed(monkeypatch):
+    """Providers the catalog warms, with no server API keys configured."""
+    calls = []
+    monkeypatch.setattr(catalog, "warm", calls.append)
+    monkeypatch.setattr(catalog, "configured_keys", lambda provider: [])
+    return calls
+
+
+@pytest.fixture
+def local_server(standin_server, monkeypatch):
+    """The openai-compatible provider pointed at the stand-in server."""
+    monkeypatch.setattr(settings, "openai_compatible_base_url", standin_server.base_url)
+    monkeypatch.setattr(settings, "openai_compatible_api_key", None)
+    return standin_server
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1_000.0]
+    monkeypatch.setattr(catalog.time, "time", lambda: now[0])
+    return now
+
+
+def test_unconfigured_providers_are_not_warmed_by_default(warmed, local_server):
+    ModelCatalog(ttl=60, retry=10).start(timeout=5)
+    assert warmed == []
+
+
+def test_unconfigured_providers_are_warmed_when_enabled(warmed, local_server):
+    ModelCatalog(ttl=60, retry=10, warm_unconfigured=True).start(timeout=5)
+    assert sorted(warmed) == ["anthropic", "openai", "xai"]
+
+
+def test_listing_replaces_the_builtin_list(warmed, local_server):
+    models = ModelCatalog(ttl=60, retry=10)
+    assert models.models()["openai-compatible"] == []
+
+    models.refresh(timeout=5)
+
+    assert models.models()["openai-compatible"] == ["tiny-llama", "other"]
+    assert models.context_window("openai-compatible", "tiny-llama") == 8192
+    assert models.snapshot()["openai-compatible"]["source"] == "api"
+
+
+def test_failed_fetch_keeps_the_last_listing(warmed, local_server, monkeypatch):
+    models = ModelCatalog(ttl=60, retry=10)
+    models.refresh(timeout=5)
+
+    monkeypatch.setattr(settings, "openai_compatible_base_url", "http://127.0.0.1:9/v1")
+    models.refresh(timeout=5)
+
+    snapshot = models.snapshot()["openai-compatible"]
+    assert [model["id"] for model in snapshot["models"]] == ["tiny-llama", "other"]
+    assert snapshot["source"] == "api"
+    assert snapshot["error"]
+
+
+def test_failed_first_fetch_keeps_the_builtin_list(warmed, monkeypatch):
+    monkeypatch.setattr(catalog, "configured_keys", lambda provider: ["sk-server"] if provider == "openai" else [])
+
+    def unreachable(api_key):
+        raise ConnectionError("unreachable")
+
+    monkeypatch.setattr(catalog.openai, "list_models", unreachable)
+    models = ModelCatalog(ttl=60, retry=10)
+    models.refresh(timeout=5)
+
+    assert models.models()["openai"] == catalog.BUILTIN_MODELS["openai"]
+    assert models.snapshot()["openai"]["error"] == "unreachable"
+
+
+def test_listings_are_due_after_ttl(warmed, local_server, clock):
+    models = ModelCatalog(ttl=60, retry=10)
+    assert models._due() == ["openai-compatible"]
+
+    models.refresh(timeout=5)
+    clock[0] += 59
+    assert models._due() == []
+    clock[0] += 1
+    assert models._due() == ["openai-compatible"]
+
+
+def test_failed_fetches_are_retried_after_retry_delay(warmed, local_server, clock, monkeypatch):
+    monkeypatch.setattr(settings, "openai_compatible_base_url", "http://127.0.0.1:9/v1")
+    models = ModelCatalog(ttl=60, retry=10)
+    models.refresh(timeout=5)
+
+    clock[0] += 9
+    assert models._due() == []
+    clock[0] += 1
+    assert models._due() == ["openai-compatible"]
+
+
+def test_context_window_matches_the_longest_prefix():
+    models = ModelCatalog(ttl=60, retry=10)
+
+    assert models.context_window("openai", "gpt-4o-2024-08-06") == 128_000
+    assert models.context_window("openai", "gpt-4-0613") == 8_192
+    assert models.context_window("openai", "gpt-4.1-mini") == 1_047_576
+    assert models.context_window("openai", "davinci-002") is None
+    assert models.context_window("openai-compatible", "tiny-llama") is None
+
+
+def test_reported_context_window_wins(warmed, monkeypatch):
+    monkeypatch.setattr(catalog, "configured_keys", lambda provider: ["sk-server"] if provider == "openai" else [])
+    monkeypatch.setattr(catalog.openai, "list_models", lambda api_key: {"gpt-4o-2024-08-06": 64_000})
+    models = ModelCatalog(ttl=60, retry=10)
+    models.refresh(timeout=5)
+
+    assert models.context_window("openai", "gpt-4o-2024-08-06") == 64_000
@@ -0,0 +1,60 @@
+import pytest
+from fastapi.testclient import TestClient
+from starlette.websockets import WebSocketDisconnect
+
+from app.config import settings
+from app.core.rate_limit import rate_limiter
+from app.main import app
+
+client = TestClient(app)
+
+
+@pytest.fixture
+def tight_rate_limits(fresh_rate_limits, monkeypatch):
+    monkeypatch.setattr(rate_limiter, "burst_limit", 2)
+
+
+def _start(request_id: str) -> dict:
+    return {"op": "start", "id": request_id, "endpoint": "next", "request": {"text": "Once.", "provider": "nope"}}
+
+
+def _frame_for(websocket, request_id: str) -> list:
+    while True:
+        frame = websocket.receive_json()
+        if frame[1] == request_id:
+            return frame
+
+
+def test_starts_share_the_http_rate_limit(tight_rate_limits):
+    assert client.post("/generate/next", json={"text": "Once.", "provider": "nope"}).status_code != 429
+
+    with client.websocket_connect("/generate/ws") as websocket:
+        websocket.send_json(_start("r1"))
+        assert "quick succession" not in str(_frame_for(websocket, "r1"))
+        websocket.send_json(_start("r2"))
+        assert _frame_for(websocket, "r2") == ["e", "r2", "Too many requests in quick succession. Please slow down."]
+
+    assert client.post("/generate/next", json={"text": "Once."}).status_code == 429
+
+
+def test_background_starts_have_their_own_budget(tight_rate_limits):
+    with client.websocket_connect("/generate/ws") as websocket:
+        for request_id in ("r1", "r2"):
+            websocket.send_json(_start(request_id))
+            _frame_for(websocket, request_id)
+        websocket.send_json({**_start("r3"), "endpoint": "image-prompt"})
+        assert "quick succession" not in str(_frame_for(websocket, "r3"))
+
+
+def test_connections_per_client_are_capped(monkeypatch):
+    monkeypatch.setattr(settings, "channel_max_per_client", 1)
+
+    with client.websocket_connect("/generate/ws"):
+        with pytest.raises(WebSocketDisconnect) as exc:
+            with client.websocket_connect("/generate/ws"):
+                pass
+        assert exc.value.code == 1008
+
+    # The slot is released on disconnect
+    with client.websocket_connect("/generate/ws"):
+        pass
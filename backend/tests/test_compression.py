@@ -0,0 +1,58 @@
+import gzip
+import zlib
+
+import pytest
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+
+from app.core.compression import RequestDecompressionMiddleware, brotli, zstandard
+
+LIMIT = 1024 * 1024
+# 200 MB of zeros compresses to a few hundred bytes (brotli) or a few KB
+BOMB_SIZE = 200 * 1024 * 1024
+
+app = FastAPI()
+app.add_middleware(RequestDecompressionMiddleware, max_body_size=LIMIT)
+
+
+@app.post("/echo")
+async def echo(request: Request) -> dict:
+    return {"size": len(await request.body())}
+
+
+client = TestClient(app)
+
+
+def _codecs():
+    codecs = [
+        ("gzip", lambda data: gzip.compress(data)),
+        ("deflate", lambda data: zlib.compress(data)),
+    ]
+    if brotli is not None:
+        codecs.append(("br", lambda data: brotli.compress(data, quality=5)))
+    if zstandard is not None:
+        codecs.append(("zstd", lambda data: zstandard.ZstdCompressor().compress(data)))
+    return codecs
+
+
+@pytest.mark.parametrize("encoding,compress", _codecs())
+def test_small_body_is_decompressed(encoding, compress):
+    body = b'{"text": "' + b"a" * 50_000 + b'"}'
+    response = client.post("/echo", content=compress(body), headers={"Content-Encoding": encoding})
+    assert response.status_code == 200
+    assert response.json() == {"size": len(body)}
+
+
+@pytest.mark.parametrize("encoding,compress", _codecs())
+def test_bomb_is_rejected_without_inflating(encoding, compress):
+    bomb = compress(b"\0" * BOMB_SIZE)
+    tracemalloc = pytest.importorskip("tracemalloc")
+    tracemalloc.start()
+    try:
+        response = client.post("/echo", content=bomb, headers={"Content-Encoding": encoding})
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    assert response.status_code == 413
+    # Bounded by the limit plus a decompression step, nowhere near the 200 MB it expands to
+    assert peak < 16 * LIMIT
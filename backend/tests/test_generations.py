@@ -0,0 +1,108 @@
+import multiprocessing
+import threading
+import time
+
+import pytest
+
+from app.api import admin  # noqa: F401  registers the worker commands
+from app.core.exceptions import GenerationCancelledError
+from app.core.generations import GenerationRegistry, generations
+from app.core.workers import worker_control
+from app.providers import base
+from app.providers.openai_compatible import OpenAICompatibleProvider
+
+
+def _stream(provider):
+    yield from provider.stream([{"role": "user", "content": "Hi"}], temperature=0.7, max_tokens=50)
+
+
+def test_cancelling_a_stream_breaks_its_upstream(standin_server, monkeypatch):
+    standin_server.delay = 2.0
+    aborted = []
+
+    def abort(response):
+        aborted.append(response)
+        base_abort(response)
+
+    base_abort = base.abort_response
+    monkeypatch.setattr(base, "abort_response", abort)
+    provider = OpenAICompatibleProvider(standin_server.base_url, model="tiny-llama")
+    provider.name = "openai-compatible"
+    outcome = []
+
+    def read():
+        try:
+            outcome.append(list(generations.track_stream(provider, _stream(provider))))
+        except Exception as e:
+            outcome.append(e)
+
+    reader = threading.Thread(target=read)
+    reader.start()
+    # Wait until the stream is registered and its upstream response is open
+    while not generations.list("openai-compatible") or standin_server.active == 0:
+        time.sleep(0.01)
+    time.sleep(0.1)
+
+    start = time.monotonic()
+    assert generations.cancel_provider("openai-compatible") == 1
+    reader.join(5)
+
+    assert len(aborted) == 1
+    assert isinstance(outcome[0], GenerationCancelledError)
+    assert time.monotonic() - start < standin_server.delay
+
+
+def test_cancel_provider_filters_by_model(fake_provider):
+    registry = GenerationRegistry()
+    providers = {}
+    streams = {}
+    for model in ("small", "large"):
+        providers[model] = fake_provider("One two three.")
+        providers[model].model = model
+        streams[model] = registry.track_stream(providers[model], _stream(providers[model]))
+        next(streams[model])
+
+    assert registry.cancel_provider("fake", "small") == 1
+    assert registry.cancel_provider("other") == 0
+
+    with pytest.raises(GenerationCancelledError):
+        next(streams["small"])
+    assert list(streams["large"]) == ["two ", "three. "]
+
+
+def _worker(directory, ready, done):
+    """A second worker with one stream in flight, answering commands until told to stop."""
+    worker_control.directory = directory
+    stream = generations.track_stream(_Provider(), (chunk for chunk in ["a ", "b "]))
+    next(stream)
+    worker_control.listen()
+    ready.set()
+    done.wait(10)
+
+
+class _Provider:
+    name = "fake"
+    model = "fake-model"
+    usage_tags = None
+    client = None
+    priority = "interactive"
+
+
+def test_cancel_reaches_every_worker(tmp_path, monkeypatch):
+    context = multiprocessing.get_context("fork")
+    ready, done = context.Event(), context.Event()
+    worker = context.Process(target=_worker, args=(str(tmp_path), ready, done))
+    worker.start()
+    try:
+        assert ready.wait(10)
+        monkeypatch.setattr(worker_control, "directory", str(tmp_path))
+
+        listed = worker_control.broadcast("list_generations", provider="fake")
+        assert [len(found) for found in listed] == [0, 1]
+        assert listed[1][0]["id"].startswith(f"{worker.pid}-")
+
+        assert sum(worker_control.broadcast("cancel_provider", provider="fake", model=None)) == 1
+        assert worker_control.broadcast("list_generations", provider="fake")[1][0]["cancelled"]
+    finally:
+        done.set()
+        worker.join(10)
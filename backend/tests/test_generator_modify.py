@@ -0,0 +1,30 @@
+from app.text_generation.generator_modify import REWRITE_MIN_MAX_TOKENS, TextGeneratorModify
+
+EXPANDED = " ".join(f"Sentence number {i} adds a detail to the scene." for i in range(40))
+
+
+def test_expansion_is_not_cut_at_selection_length(fake_provider):
+    provider = fake_provider(EXPANDED)
+    generator = TextGeneratorModify(provider)
+
+    text = generator.generate("The door opened.", "Expand this into a full scene.")
+
+    assert text == EXPANDED
+    assert provider.max_tokens == [REWRITE_MIN_MAX_TOKENS]
+
+
+def test_streamed_expansion_is_not_cut(fake_provider):
+    provider = fake_provider(EXPANDED)
+    generator = TextGeneratorModify(provider)
+
+    text = "".join(generator.stream("Door.", "Expand this into a full scene."))
+
+    assert text.strip() == EXPANDED
+
+
+def test_long_selection_gets_room_to_grow(fake_provider):
+    provider = fake_provider("Rewritten.")
+    selection = "word " * 1000
+    TextGeneratorModify(provider).generate(selection, "Rewrite it.")
+
+    assert provider.max_tokens[0] >= provider.max_tokens_for_words(1000) * 2
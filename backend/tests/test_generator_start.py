@@ -0,0 +1,43 @@
+import re
+
+from app.providers.base import LLMProvider
+from app.text_generation.generator_start import OUTLINE_MAX_TOKENS, TextGeneratorStart
+
+# Outline lines much longer than 40 words each
+DETAIL = " ".join(["and then something else happens to the keeper"] * 8)
+
+
+class OutlineProvider(LLMProvider):
+    """Writes a verbose outline and streams each section as its own number."""
+
+    name = "outline"
+    model = "outline-model"
+
+    def __init__(self):
+        self.outline_max_tokens: list[int] = []
+
+    def generate(self, messages, temperature, max_tokens, **kwargs) -> str:
+        self.outline_max_tokens.append(max_tokens)
+        sections = int(re.search(r"into (\d+) consecutive", messages[0]["content"]).group(1))
+        return "\n".join(f"{i + 1}. Part {i + 1} {DETAIL}." for i in range(sections))
+
+    def stream(self, messages, temperature, max_tokens, **kwargs):
+        section = re.search(r"Write section (\d+)", messages[0]["content"]).group(1)
+        yield f"Section {section} text."
+
+
+def test_verbose_outline_is_not_cut():
+    provider = OutlineProvider()
+    generator = TextGeneratorStart(provider)
+
+    outline = generator._outline("A prompt", 5)
+
+    assert [line.split()[1] for line in outline] == ["1", "2", "3", "4", "5"]
+    assert all(line.endswith(".") for line in outline)
+    assert provider.outline_max_tokens == [OUTLINE_MAX_TOKENS]
+
+
+def test_long_form_streams_every_section_in_order():
+    text = "".join(TextGeneratorStart(OutlineProvider()).stream("A prompt", word_count=3000, long_form=True))
+
+    assert text.split("\n\n") == [f"Section {i} text." for i in range(1, 6)]
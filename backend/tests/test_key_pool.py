@@ -0,0 +1,116 @@
+import time
+from datetime import datetime, timezone
+
+from app.providers import key_pool
+from app.providers.key_pool import KeyPool, _reset_at
+
+KEYS = ["xai-Abc123SECRETpart0001", "xai-Abc123SECRETpart0002"]
+
+
+def test_snapshot_shows_only_last_four_characters():
+    pool = KeyPool("xai", KEYS, cooldown=30.0)
+
+    labels = [entry["key"] for entry in pool.snapshot()]
+
+    assert labels == ["…0001", "…0002"]
+    assert not any("xai-" in label or "Abc" in label for label in labels)
+
+
+def _limits(requests_left: int, tokens_left: int = 90_000) -> dict:
+    return {
+        "x-ratelimit-limit-requests": "100",
+        "x-ratelimit-remaining-requests": str(requests_left),
+        "x-ratelimit-reset-requests": "6m0s",
+        "x-ratelimit-limit-tokens": "100000",
+        "x-ratelimit-remaining-tokens": str(tokens_left),
+        "x-ratelimit-reset-tokens": "20ms",
+    }
+
+
+def test_acquire_picks_the_key_with_most_headroom():
+    pool = KeyPool("xai", KEYS, cooldown=30.0)
+    pool.observe(KEYS[0], 200, _limits(requests_left=10))
+    pool.observe(KEYS[1], 200, _limits(requests_left=80))
+
+    assert [pool.acquire() for _ in range(3)] == [KEYS[1]] * 3
+    assert pool.snapshot()[1]["remaining_requests"] == 77
+
+
+def test_token_headroom_counts_too():
+    pool = KeyPool("xai", KEYS, cooldown=30.0)
+    pool.observe(KEYS[0], 200, {**_limits(requests_left=90, tokens_left=5_000), "x-ratelimit-reset-tokens": "1m"})
+    pool.observe(KEYS[1], 200, _limits(requests_left=50))
+
+    assert pool.acquire() == KEYS[1]
+
+
+def test_keys_alternate_before_any_headers():
+    pool = KeyPool("xai", KEYS, cooldown=30.0)
+    assert [pool.acquire() for _ in range(4)] == [KEYS[0], KEYS[1], KEYS[0], KEYS[1]]
+
+
+def test_reset_durations_and_timestamps():
+    now = 1_000.0
+    assert _reset_at("6m0s", now) == now + 360
+    assert _reset_at("20ms", now) == now + 0.02
+    assert _reset_at("1h2m3.5s", now) == now + 3723.5
+    assert _reset_at("2026-10-19T12:00:00Z", now) == datetime(2026, 10, 19, 12, tzinfo=timezone.utc).timestamp()
+    assert _reset_at("2026-10-19T14:00:00+02:00", now) == datetime(2026, 10, 19, 12, tzinfo=timezone.utc).timestamp()
+    assert _reset_at("soon", now) is None
+    assert _reset_at(None, now) is None
+
+
+def test_anthropic_headers_are_read():
+    pool = KeyPool("anthropic", KEYS, cooldown=30.0)
+    pool.observe(KEYS[0], 200, {
+        "anthropic-ratelimit-requests-limit": "50",
+        "anthropic-ratelimit-requests-remaining": "5",
+        "anthropic-ratelimit-requests-reset": "2999-01-01T00:00:00Z",
+    })
+
+    assert pool.snapshot()[0]["headroom"] == 0.1
+    assert pool.acquire() == KEYS[1]
+
+
+def test_rate_limited_key_cools_down_for_retry_after():
+    pool = KeyPool("xai", KEYS, cooldown=30.0)
+    pool.observe(KEYS[1], 200, _limits(requests_left=10))
+    pool.observe(KEYS[0], 429, {"retry-after": "12"})
+
+    entry = pool.snapshot()[0]
+    assert 11 <= entry["cooldown_seconds"] <= 12
+    assert entry["rate_limited"] == 1
+    assert pool.acquire() == KEYS[1]
+
+
+def test_rate_limited_key_without_retry_after_uses_the_default_cooldown():
+    pool = KeyPool("xai", KEYS, cooldown=30.0)
+    pool.observe(KEYS[0], 429, {})
+
+    assert 29 <= pool.snapshot()[0]["cooldown_seconds"] <= 30
+    assert pool.acquire() == KEYS[1]
+
+
+def test_cooled_down_key_is_used_again(monkeypatch):
+    pool = KeyPool("xai", KEYS, cooldown=30.0)
+    pool.observe(KEYS[0], 429, {"retry-after": "5"})
+    pool.observe(KEYS[1], 200, _limits(requests_left=1))
+
+    later = time.time() + 6
+    monkeypatch.setattr(key_pool.time, "time", lambda: later)
+    assert pool.acquire() == KEYS[0]
+
+
+def test_all_keys_cooling_down_uses_the_one_that_recovers_first():
+    pool = KeyPool("xai", KEYS, cooldown=30.0)
+    pool.observe(KEYS[0], 429, {"retry-after": "20"})
+    pool.observe(KEYS[1], 429, {"retry-after": "5"})
+
+    assert pool.acquire() == KEYS[1]
+
+
+def test_unknown_keys_are_ignored():
+    pool = KeyPool("xai", KEYS, cooldown=30.0)
+    pool.observe("user-own-key", 429, {"retry-after": "20"})
+
+    assert all(entry["rate_limited"] == 0 for entry in pool.snapshot())
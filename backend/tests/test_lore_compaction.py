@@ -0,0 +1,53 @@
+from fastapi.testclient import TestClient
+
+from app.api import lore as lore_api
+from app.main import app
+from app.providers.routing import model_router
+from app.text_generation.lore_compaction import TextGeneratorLoreMerge, find_clusters
+
+SHORT = "Mara Vell is a smuggler captain of the Grey Heron."
+LONG = (
+    "Mara Vell is a smuggler captain of the Grey Heron. She runs salt and rifles through "
+    "the northern straits, owes the harbour guild a fortune and never sails on a full moon."
+)
+OTHER = "The lighthouse on Skerry Point has been dark for thirty years."
+
+
+def test_note_contained_in_longer_one_merges():
+    assert find_clusters([("character", LONG), ("place", OTHER), ("character", SHORT)]) == [[0, 2]]
+
+
+def test_different_categories_never_merge():
+    assert find_clusters([("character", LONG), ("faction", LONG), ("place", SHORT)]) == []
+
+
+def test_blank_items_never_cluster():
+    assert find_clusters([("character", ""), ("character", "  "), ("character", "!")]) == []
+
+
+def test_compact_reports_indices_of_the_request_lore(monkeypatch, fake_provider):
+    monkeypatch.setattr(lore_api, "get_provider", lambda **kwargs: fake_provider("Merged note."))
+    lore = [
+        {"category": "character", "text": " "},
+        {"category": "character", "text": LONG},
+        {"category": "place", "text": OTHER},
+        {"category": "character", "text": SHORT},
+    ]
+
+    response = TestClient(app).post("/lore/compact", json={"lore": lore, "provider": "openai"})
+
+    assert response.status_code == 200
+    body = response.json()
+    assert [cluster["items"] for cluster in body["clusters"]] == [[1, 3]]
+    assert [item["text"] for item in body["lore"]] == ["Merged note.", OTHER]
+
+
+def test_merges_are_tracked_like_other_calls(fake_provider):
+    provider = fake_provider("  Merged note.\n")
+    before = model_router.snapshot().get("fake:fake-model", {}).get("samples", 0)
+
+    merged = TextGeneratorLoreMerge(provider).merge("character", [LONG, SHORT])
+
+    assert merged == "Merged note."
+    assert provider.max_tokens == [provider.max_tokens_for_words(len(LONG.split()) + len(SHORT.split()))]
+    assert model_router.snapshot()["fake:fake-model"]["samples"] - before == 1
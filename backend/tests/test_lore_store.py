@@ -0,0 +1,85 @@
+import pytest
+from fastapi.testclient import TestClient
+
+from app.core.exceptions import InvalidRequestError, LoreNotFoundError
+from app.core.lore_store import LoreStore
+from app.main import app
+
+HARBOUR = {"category": "setting", "text": "A quiet harbour town."}
+MARA = {"category": "character", "text": "Mara Vell, a smuggler captain."}
+
+
+def test_changed_lore_gets_a_new_version():
+    store = LoreStore(max_sets=10)
+    first = store.upsert("story", [HARBOUR])
+
+    assert store.upsert("story", [HARBOUR]).version == first.version
+    second = store.upsert("story", [HARBOUR, MARA])
+
+    assert second.version != first.version
+    assert store.latest("story").ref == second.ref
+    assert second.ref == f"story@{second.version}"
+
+
+def test_refs_resolve_to_their_version():
+    store = LoreStore(max_sets=10)
+    first = store.upsert("story@draft", [HARBOUR])
+    store.upsert("story@draft", [HARBOUR, MARA])
+
+    # Lore ids may contain "@"; the version is after the last one
+    assert list(store.resolve(first.ref)) == [HARBOUR]
+    assert store.latest("story@draft").items == [HARBOUR, MARA]
+
+
+@pytest.mark.parametrize("ref", ["story", "story@", "@abc"])
+def test_malformed_refs_are_rejected(ref):
+    with pytest.raises(InvalidRequestError):
+        LoreStore(max_sets=10).resolve(ref)
+
+
+def test_unknown_and_evicted_versions_are_not_found():
+    store = LoreStore(max_sets=10, versions_per_set=2)
+    first = store.upsert("story", [HARBOUR])
+    store.upsert("story", [MARA])
+    store.upsert("story", [HARBOUR, MARA])
+
+    with pytest.raises(LoreNotFoundError):
+        store.resolve(first.ref)
+    with pytest.raises(LoreNotFoundError):
+        store.resolve("story@0123456789abcdef")
+    with pytest.raises(LoreNotFoundError):
+        store.resolve("other@" + first.version)
+
+
+def test_least_recently_used_set_is_evicted():
+    store = LoreStore(max_sets=2)
+    first = store.upsert("first", [HARBOUR])
+    store.upsert("second", [HARBOUR])
+    store.resolve(first.ref)
+
+    store.upsert("third", [HARBOUR])
+
+    assert store.latest("first").version == first.version
+    with pytest.raises(LoreNotFoundError):
+        store.latest("second")
+
+
+def test_lore_api_round_trip():
+    client = TestClient(app)
+    created = client.put("/lore/api-story", json={"items": [HARBOUR, {"category": "other", "text": "  "}]}).json()
+
+    assert created["items"] == [HARBOUR]
+    assert client.get("/lore/api-story").json()["ref"] == created["ref"]
+    client.delete("/lore/api-story")
+    assert client.get("/lore/api-story").status_code == 404
+
+
+@pytest.mark.parametrize("path, body", [
+    ("/generate/next", {"text": "Once."}),
+    ("/generate/image-prompt/bulk", {"text": "Once.", "ranges": []}),
+    ("/lore/compact", {}),
+])
+def test_lore_and_lore_ref_together_are_rejected(fresh_rate_limits, path, body):
+    response = TestClient(app).post(path, json={**body, "lore": [HARBOUR], "lore_ref": "story@abc"})
+    assert response.status_code == 422
+    assert "not both" in response.text
@@ -0,0 +1,66 @@
+import pytest
+
+from app.text_generation.markdown_filter import MarkdownStripper, strip_markdown, strip_markdown_stream
+
+CASES = [
+    # Paired emphasis and code are removed
+    ("She was **very** tired.", "She was very tired."),
+    ("She was *very* tired.", "She was very tired."),
+    ("She was __very tired__ now.", "She was very tired now."),
+    ("She was _very_ tired.", "She was very tired."),
+    ("***Both*** at once.", "Both at once."),
+    ("**Bold with *italic* inside**.", "Bold with italic inside."),
+    ("Call `open()` now.", "Call open() now."),
+    ("# Chapter One\nIt began.", "Chapter One\nIt began."),
+    ("> A quote.", "A quote."),
+    ("```python\nx = 1\n```\nAfter.", "x = 1\nAfter."),
+    # Bare operators, intra-word underscores and names are kept
+    ("5 * 3 = 15", "5 * 3 = 15"),
+    ("2*3 is six", "2*3 is six"),
+    ("a snake_case_name here", "a snake_case_name here"),
+    ("the __init__ method", "the __init__ method"),
+    ("the `__init__` method", "the __init__ method"),
+    ("use a *2 multiplier", "use a *2 multiplier"),
+    # Unclosed markers are emitted at the end of the line
+    ("An *unclosed marker\nNext line.", "An *unclosed marker\nNext line."),
+    ("Trailing star *", "Trailing star *"),
+    ("An *uneven** pair.", "An uneven* pair."),
+]
+
+
+@pytest.mark.parametrize("text,expected", CASES)
+def test_strip_markdown(text, expected):
+    assert strip_markdown(text) == expected
+
+
+@pytest.mark.parametrize("text,expected", CASES)
+def test_strip_markdown_stream_char_by_char(text, expected):
+    assert "".join(strip_markdown_stream(iter(text))) == expected
+
+
+def test_long_unclosed_span_is_released():
+    text = "*" + "word " * 200
+    out = []
+    stream = strip_markdown_stream(iter([text[:500], text[500:]]))
+    out.append(next(stream))
+    # Released once the open span passes the limit, before the stream ends
+    assert out[0].startswith("*word")
+    assert "".join(out + list(stream)) == text
+
+
+def test_hold_back_is_bounded():
+    text = "She said **" + "a long emphasized passage that goes on " * 5 + "** and left. *" + "x" * 100
+    stripper = MarkdownStripper()
+    fed = emitted = 0
+    for char in text:
+        emitted += len(stripper.feed(char))
+        fed += 1
+        assert fed - emitted <= MarkdownStripper.MAX_HOLD_CHARS + 2
+    emitted += len(stripper.flush())
+    assert emitted == len(text)
+
+
+def test_span_past_the_hold_keeps_its_markers():
+    text = "**" + "word " * 10 + "end**"
+    assert strip_markdown(text) == text
+    assert strip_markdown("**one word** here") == "one word here"
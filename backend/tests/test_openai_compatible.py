@@ -0,0 +1,84 @@
+import threading
+
+import pytest
+
+from app.config import settings
+from app.providers import get_provider, openai_compatible
+from app.providers.openai_compatible import OpenAICompatibleProvider
+from app.providers.catalog import model_catalog
+
+
+@pytest.fixture
+def server_url(monkeypatch):
+    monkeypatch.setattr(settings, "openai_compatible_base_url", "http://127.0.0.1:9/v1")
+    return settings.openai_compatible_base_url
+
+
+def test_default_model_comes_from_catalog(server_url, monkeypatch):
+    monkeypatch.setitem(model_catalog._listings, "openai-compatible", {"llama-3-8b": 8192, "qwen-2": None})
+
+    def fail(*args, **kwargs):
+        raise AssertionError("server listed on the request path")
+
+    monkeypatch.setattr(openai_compatible, "discover_models", fail)
+
+    assert get_provider(provider_name="openai-compatible").model == "llama-3-8b"
+
+
+def test_default_model_listed_from_server_without_catalog(server_url, monkeypatch):
+    monkeypatch.delitem(model_catalog._listings, "openai-compatible", raising=False)
+    calls = []
+
+    def discover(base_url, api_key=None, max_concurrency=4):
+        calls.append(base_url)
+        return ["mistral-7b"]
+
+    monkeypatch.setattr(openai_compatible, "discover_models", discover)
+
+    assert get_provider(provider_name="openai-compatible").model == "mistral-7b"
+    assert calls == [server_url]
+
+
+def test_models_are_discovered_with_context_windows(standin_server):
+    assert openai_compatible.list_models(standin_server.base_url) == {"tiny-llama": 8192, "other": 4096}
+    assert openai_compatible.discover_models(standin_server.base_url) == ["tiny-llama", "other"]
+
+
+def test_generate_uses_first_model_by_default(standin_server):
+    provider = OpenAICompatibleProvider(standin_server.base_url)
+
+    text = provider.generate([{"role": "user", "content": "Hi"}], temperature=0.7, max_tokens=50)
+
+    assert text == "Héllo from the local server."
+    assert standin_server.models_requested == ["tiny-llama"]
+
+
+def test_stream_yields_deltas(standin_server):
+    provider = OpenAICompatibleProvider(standin_server.base_url, model="other")
+
+    chunks = list(provider.stream([{"role": "user", "content": "Hi"}], temperature=0.7, max_tokens=50))
+
+    assert chunks == ["Héllo ", "from ", "the ", "local ", "server."]
+    assert standin_server.models_requested == ["other"]
+
+
+def test_concurrent_requests_are_capped(standin_server):
+    standin_server.delay = 0.02
+    provider = OpenAICompatibleProvider(standin_server.base_url, model="tiny-llama", max_concurrency=2)
+    results = []
+
+    def run(streaming):
+        messages = [{"role": "user", "content": "Hi"}]
+        if streaming:
+            results.append("".join(provider.stream(messages, temperature=0.7, max_tokens=50)))
+        else:
+            results.append(provider.generate(messages, temperature=0.7, max_tokens=50))
+
+    threads = [threading.Thread(target=run, args=(i % 2 == 0,)) for i in range(6)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(10)
+
+    assert results == ["Héllo from the local server."] * 6
+    assert standin_server.peak_active == 2
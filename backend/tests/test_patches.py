@@ -0,0 +1,49 @@
+from app.text_generation.patches import apply_patches_stream
+
+ORIGINAL = "The door opened. A cold wind blew in.\nShe shivered and closed it."
+
+
+def _block(find: str, replace: str) -> str:
+    return f"<<<<<<< SEARCH\n{find}\n=======\n{replace}\n>>>>>>> REPLACE\n"
+
+
+def _apply(chunks: list[str]) -> str:
+    return "".join(apply_patches_stream(ORIGINAL, (chunk for chunk in chunks)))
+
+
+def test_block_split_across_chunks():
+    response = _block("A cold wind", "A warm breeze") + _block("shivered", "smiled")
+    chunks = [response[i:i + 7] for i in range(0, len(response), 7)]
+
+    assert _apply(chunks) == "The door opened. A warm breeze blew in.\nShe smiled and closed it."
+
+
+def test_edits_stream_out_as_blocks_complete():
+    response = _block("door", "gate") + _block("closed", "locked")
+    stream = apply_patches_stream(ORIGINAL, (chunk for chunk in [response[:60], response[60:]]))
+
+    assert next(stream) == "The gate"
+    assert "".join(stream) == " opened. A cold wind blew in.\nShe shivered and locked it."
+
+
+def test_whitespace_differences_are_tolerated():
+    response = _block("blew in. She   shivered", "blew in. She shook")
+    assert _apply([response]) == "The door opened. A cold wind blew in. She shook and closed it."
+
+
+def test_block_that_cannot_be_found_is_skipped():
+    response = _block("a window", "a hatch") + _block("closed", "locked")
+    assert _apply([response]) == "The door opened. A cold wind blew in.\nShe shivered and locked it."
+
+
+def test_block_before_the_previous_edit_is_skipped():
+    response = _block("closed", "locked") + _block("door", "gate")
+    assert _apply([response]) == "The door opened. A cold wind blew in.\nShe shivered and locked it."
+
+
+def test_response_without_blocks_is_a_full_rewrite():
+    assert _apply(["The gate swung wide. ", "Nobody came in."]) == "The gate swung wide. Nobody came in."
+
+
+def test_unusable_blocks_leave_the_passage_unchanged():
+    assert _apply([_block("nowhere", "else")]) == ORIGINAL
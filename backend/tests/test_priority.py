@@ -0,0 +1,225 @@
+import asyncio
+import threading
+import time
+
+from fastapi.testclient import TestClient
+
+from app.core import priority
+from app.core.generations import Generation, _current
+from app.core.priority import BACKGROUND, INTERACTIVE, PriorityLimiter, PriorityScheduler, _Admission, _Pool
+from app.main import app
+
+
+def _scheduler() -> PriorityScheduler:
+    return PriorityScheduler(interactive_concurrency=24, background_concurrency=8, ttft_target=1.0)
+
+
+def test_background_backs_off_while_interactive_is_slow(monkeypatch):
+    scheduler = _scheduler()
+    for _ in range(priority._MIN_TTFT_SAMPLES):
+        scheduler._record_ttft(3.0)
+    assert scheduler.pools[BACKGROUND].limit == 4
+
+    # Not again within the adjustment interval
+    scheduler._adjust()
+    assert scheduler.pools[BACKGROUND].limit == 4
+
+    monkeypatch.setattr(priority, "_ADJUST_INTERVAL_SECONDS", 0.0)
+    for expected in (2, 1, 1):
+        scheduler._adjust()
+        assert scheduler.pools[BACKGROUND].limit == expected
+
+
+def test_background_recovers_one_slot_at_a_time(monkeypatch):
+    scheduler = _scheduler()
+    for _ in range(priority._MIN_TTFT_SAMPLES):
+        scheduler._record_ttft(3.0)
+    monkeypatch.setattr(priority, "_ADJUST_INTERVAL_SECONDS", 0.0)
+    scheduler._adjust()
+    scheduler._adjust()
+    assert scheduler.pools[BACKGROUND].limit == 1
+
+    # Slow samples age out of the window
+    monkeypatch.setattr(priority, "_TTFT_WINDOW_SECONDS", -1.0)
+    limits = []
+    for _ in range(9):
+        scheduler._adjust()
+        limits.append(scheduler.pools[BACKGROUND].limit)
+    assert limits == [2, 3, 4, 5, 6, 7, 8, 8, 8]
+
+
+def test_fast_interactive_traffic_keeps_background_at_max():
+    scheduler = _scheduler()
+    for _ in range(20):
+        scheduler._record_ttft(0.2)
+    assert scheduler.pools[BACKGROUND].limit == 8
+    assert scheduler.p95_ttft() == 0.2
+
+
+def _hold_background(limiter: PriorityLimiter, generation: Generation, entered: threading.Event, release: threading.Event):
+    """Hold a background slot on another thread until released or preempted."""
+    def run():
+        _current.generation = generation
+        try:
+            with limiter.slot(BACKGROUND):
+                entered.set()
+                while not (release.is_set() or generation.cancelled.is_set()):
+                    time.sleep(0.005)
+        finally:
+            _current.generation = None
+
+    thread = threading.Thread(target=run)
+    thread.start()
+    return thread
+
+
+def test_interactive_preempts_background_stream(fake_provider):
+    limiter = PriorityLimiter(1, preempt_after=0.05)
+    generation = Generation("1", "stream", fake_provider(), None)
+    entered = threading.Event()
+    thread = _hold_background(limiter, generation, entered, threading.Event())
+    entered.wait(5)
+
+    start = time.monotonic()
+    with limiter.slot(INTERACTIVE):
+        waited = time.monotonic() - start
+    thread.join(5)
+
+    assert generation.cancelled.is_set()
+    assert limiter.preempted == 1
+    assert waited >= 0.05
+
+
+def test_no_preemption_without_deadline(fake_provider):
+    limiter = PriorityLimiter(1, preempt_after=None)
+    generation = Generation("1", "stream", fake_provider(), None)
+    entered, release = threading.Event(), threading.Event()
+    thread = _hold_background(limiter, generation, entered, release)
+    entered.wait(5)
+
+    threading.Timer(0.1, release.set).start()
+    with limiter.slot(INTERACTIVE):
+        pass
+    thread.join(5)
+
+    assert not generation.cancelled.is_set()
+    assert limiter.preempted == 0
+
+
+def test_freed_slot_goes_to_interactive_first():
+    limiter = PriorityLimiter(1)
+    order = []
+
+    def wait(priority_class):
+        with limiter.slot(priority_class):
+            order.append(priority_class)
+
+    with limiter.slot(INTERACTIVE):
+        background = threading.Thread(target=wait, args=(BACKGROUND,))
+        background.start()
+        while not limiter._waiting[BACKGROUND]:
+            time.sleep(0.001)
+        interactive = threading.Thread(target=wait, args=(INTERACTIVE,))
+        interactive.start()
+        while not limiter._waiting[INTERACTIVE]:
+            time.sleep(0.001)
+    background.join(5)
+    interactive.join(5)
+
+    assert order == [INTERACTIVE, BACKGROUND]
+
+
+def test_admission_queues_in_order_up_to_cap():
+    async def scenario():
+        admission = _Admission(_Pool(1), max_waiting=1)
+        order = []
+        releases = {name: asyncio.Event() for name in "ab"}
+
+        async def request(name):
+            async with admission.admit():
+                order.append(name)
+                await releases[name].wait()
+
+        first = asyncio.create_task(request("a"))
+        await asyncio.sleep(0)
+        assert not admission.full()
+        second = asyncio.create_task(request("b"))
+        await asyncio.sleep(0)
+        assert order == ["a"]
+        assert admission.full()
+
+        releases["a"].set()
+        await first
+        await asyncio.sleep(0.01)
+        assert order == ["a", "b"]
+        assert not admission.full()
+        releases["b"].set()
+        await second
+        assert admission.to_dict() == {"active": 0, "waiting": 0, "rejected": 0}
+
+    asyncio.run(scenario())
+
+
+def test_admission_follows_resized_pool(monkeypatch):
+    monkeypatch.setattr(priority, "_ADMISSION_RECHECK_SECONDS", 0.01)
+
+    async def scenario():
+        pool = _Pool(1)
+        admission = _Admission(pool)
+        release = asyncio.Event()
+        admitted = []
+
+        async def request(name):
+            async with admission.admit():
+                admitted.append(name)
+                await release.wait()
+
+        tasks = [asyncio.create_task(request(name)) for name in "ab"]
+        await asyncio.sleep(0.05)
+        assert admitted == ["a"]
+
+        pool.resize(2)
+        await asyncio.sleep(0.05)
+        assert admitted == ["a", "b"]
+        release.set()
+        await asyncio.gather(*tasks)
+
+    asyncio.run(scenario())
+
+
+def test_cancelled_waiter_leaves_queue():
+    async def scenario():
+        admission = _Admission(_Pool(1))
+        release = asyncio.Event()
+
+        async def request():
+            async with admission.admit():
+                await release.wait()
+
+        first = asyncio.create_task(request())
+        await asyncio.sleep(0)
+        second = asyncio.create_task(request())
+        await asyncio.sleep(0)
+        second.cancel()
+        await asyncio.gather(second, return_exceptions=True)
+        assert admission.to_dict()["waiting"] == 0
+
+        release.set()
+        await first
+        assert admission.active == 0
+
+    asyncio.run(scenario())
+
+
+def test_background_requests_past_queue_cap_get_503(monkeypatch):
+    monkeypatch.setitem(priority.priorities.admissions, BACKGROUND, _Admission(_Pool(0), max_waiting=0))
+    client = TestClient(app)
+
+    response = client.post("/generate/image-prompt/stream", json={})
+    assert response.status_code == 503
+    assert response.headers["retry-after"] == "5"
+    assert response.json()["error_type"] == "overloaded"
+    assert priority.priorities.admissions[BACKGROUND].rejected == 1
+
+    # Interactive endpoints are admitted as usual (and fail validation here)
+    assert client.post("/generate/next/stream", json={"text": 1}).status_code == 422
@@ -0,0 +1,49 @@
+import pytest
+from fastapi.testclient import TestClient
+
+from app.api import generate as generate_api
+from app.core.lifecycle import lifecycle
+from app.main import app
+from app.providers.base import LLMProvider
+
+client = TestClient(app)
+
+
+class FailingProvider(LLMProvider):
+    """Stands in for the provider that provider="auto" picked; every call fails upstream."""
+
+    name = "xai"
+    model = "grok-3-mini"
+
+    def generate(self, messages, temperature, max_tokens, **kwargs) -> str:
+        raise RuntimeError("upstream exploded")
+
+    def stream(self, messages, temperature, max_tokens, **kwargs):
+        raise RuntimeError("upstream exploded")
+        yield
+
+
+@pytest.fixture
+def auto_routed_failures(monkeypatch, fresh_rate_limits):
+    monkeypatch.setattr(generate_api, "get_provider", lambda **kwargs: FailingProvider())
+    monkeypatch.setattr(lifecycle, "_failures", {})
+    monkeypatch.setattr(lifecycle, "_opened_at", {})
+    return lifecycle._failures
+
+
+@pytest.mark.parametrize("path", ["/generate/next", "/generate/next/stream", "/generate/start/stream"])
+def test_failures_count_against_the_routed_provider(auto_routed_failures, path):
+    response = client.post(path, json={"text": "Once upon a time.", "provider": "auto", "model": "fast-drafting"})
+    assert "upstream exploded" in response.text
+
+    assert auto_routed_failures == {"xai": 1}
+
+
+def test_setup_errors_are_not_upstream_failures(monkeypatch, auto_routed_failures):
+    def missing_key(**kwargs):
+        raise RuntimeError("No api_key configured")
+
+    monkeypatch.setattr(generate_api, "get_provider", missing_key)
+
+    assert client.post("/generate/next", json={"text": "Once.", "provider": "auto"}).status_code >= 400
+    assert auto_routed_failures == {}
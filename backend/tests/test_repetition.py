@@ -0,0 +1,89 @@
+import json
+import random
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.api import generate as generate_api
+from app.config import settings
+from app.main import app
+from app.text_generation.repetition import RepetitionDetector, get_repetition_detector, trim_repetition
+
+INTRO = "Rain fell on the quiet town before the bells rang out. "
+LOOP = "The ship sailed into the grey harbour at dawn again. "
+
+
+def _feed(detector: RepetitionDetector, chunks) -> int | None:
+    for chunk in chunks:
+        cut = detector.feed(chunk)
+        if cut is not None:
+            return cut
+    return None
+
+
+def test_loop_fires_on_the_third_repeat():
+    assert _feed(RepetitionDetector(), [INTRO + LOOP * 2 + "The end. "]) is None
+
+    cut = _feed(RepetitionDetector(), [INTRO + LOOP * 3])
+
+    # Cut back to the start of the second occurrence
+    assert cut == len(INTRO + LOOP)
+
+
+def test_repeats_outside_the_window_do_not_fire():
+    filler = " ".join(f"word{i}" for i in range(40)) + " "
+    detector = RepetitionDetector(window_words=30)
+    assert _feed(detector, [INTRO + LOOP + filler + LOOP + filler + LOOP]) is None
+
+
+def test_cut_is_the_same_for_any_chunking():
+    text = INTRO + LOOP * 4
+    expected = _feed(RepetitionDetector(), [text])
+    rng = random.Random(3)
+    for _ in range(50):
+        chunks, start = [], 0
+        while start < len(text):
+            size = rng.randint(1, 12)
+            chunks.append(text[start:start + size])
+            start += size
+        assert _feed(RepetitionDetector(), chunks) == expected
+
+
+def test_endpoint_overrides(monkeypatch):
+    monkeypatch.setattr(settings, "repetition_overrides", {
+        "image-prompt": {"enabled": False},
+        "between": {"max_repeats": 2},
+    })
+
+    assert get_repetition_detector("image-prompt") is None
+    assert _feed(get_repetition_detector("next"), [INTRO + LOOP * 2 + "The end. "]) is None
+    assert _feed(get_repetition_detector("between"), [INTRO + LOOP * 2 + "The end. "]) == len(INTRO + LOOP)
+    assert trim_repetition(INTRO + LOOP * 4, "image-prompt") == INTRO + LOOP * 4
+    assert trim_repetition(INTRO + LOOP * 4, "next") == (INTRO + LOOP).rstrip()
+
+
+def _events(body: str) -> list[tuple[str, dict]]:
+    events = []
+    for block in body.split("\n\n"):
+        lines = block.splitlines()
+        data = next((line[6:] for line in lines if line.startswith("data: ")), None)
+        if data and data != "[DONE]":
+            kind = next((line[7:] for line in lines if line.startswith("event: ")), "text")
+            events.append((kind, json.loads(data)))
+    return events
+
+
+@pytest.mark.parametrize("strip_markdown", [False, True])
+def test_stream_reports_how_much_sent_text_to_trim(monkeypatch, fake_provider, fresh_rate_limits, strip_markdown):
+    monkeypatch.setattr(generate_api, "_get_provider", lambda *args, **kwargs: fake_provider((INTRO + LOOP * 6).strip()))
+
+    response = TestClient(app).post("/generate/next/stream", json={
+        "text": "Once.", "provider": "openai", "strip_markdown": strip_markdown,
+    })
+
+    events = _events(response.text)
+    sent = "".join(data["text"] for kind, data in events if kind == "text")
+    kind, data = events[-1]
+    assert kind == "repetition"
+    assert data["repetition"]["length"] == len(INTRO + LOOP)
+    assert sent[:len(sent) - data["repetition"]["trim"]] == INTRO + LOOP
@@ -0,0 +1,118 @@
+import random
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.api import generate as generate_api
+from app.api import lore as lore_api
+from app.config import settings
+from app.core.exceptions import GenerationCancelledError
+from app.main import app
+from app.providers import DEFAULT_MODELS, get_provider
+from app.providers.routing import ModelRouter
+from app.schema.generation import GenerateRequest
+
+FAST, SLOW = "xai:fast", "openai:slow"
+
+
+def _router() -> ModelRouter:
+    router = ModelRouter(alpha=1.0, exploration=0.0, max_error_rate=0.3)
+    for key, ttft in ((FAST, 0.1), (SLOW, 2.0)):
+        router.track_call(key, ok=True)
+        router._update(key, ttft=ttft, throughput=1000.0)
+    return router
+
+
+def _drain(router: ModelRouter, key: str, chunks):
+    return list(router.track_stream(key, (chunk for chunk in chunks)))
+
+
+def test_unseen_candidates_are_tried_first():
+    router = _router()
+    assert router.choose([FAST, SLOW, "anthropic:new"]) == ("anthropic:new", "cold-start")
+
+
+def test_fastest_healthy_candidate_wins():
+    assert _router().choose([FAST, SLOW]) == (FAST, "fastest")
+
+
+def test_unhealthy_candidate_is_skipped():
+    router = _router()
+    router.track_call(FAST, ok=False)
+    assert router.choose([FAST, SLOW]) == (SLOW, "fastest")
+
+
+def test_all_unhealthy_picks_fewest_errors():
+    router = ModelRouter(alpha=0.5, exploration=0.0, max_error_rate=0.3)
+    for ok in (True, False):
+        router.track_call(FAST, ok=ok)
+    for ok in (False, False):
+        router.track_call(SLOW, ok=ok)
+    assert router.choose([FAST, SLOW]) == (FAST, "least-errors")
+
+
+def test_exploration_picks_another_candidate():
+    router = _router()
+    router.exploration = 1.0
+    assert router.choose([FAST, SLOW], rng=random.Random(0)) == (SLOW, "explore")
+
+
+def test_track_stream_records_latency_and_outcome():
+    router = ModelRouter(alpha=1.0, exploration=0.0, max_error_rate=0.3)
+    assert _drain(router, FAST, ["Once ", "upon"]) == ["Once ", "upon"]
+
+    stats = router.snapshot()[FAST]
+    assert stats["samples"] == 1
+    assert stats["error_rate"] == 0.0
+    assert stats["ttft_seconds"] is not None
+
+
+def test_track_stream_counts_failures_but_not_cancellations():
+    router = ModelRouter(alpha=1.0, exploration=0.0, max_error_rate=0.3)
+
+    def failing(error):
+        yield "Once "
+        raise error
+
+    with pytest.raises(RuntimeError):
+        _drain(router, FAST, failing(RuntimeError("boom")))
+    with pytest.raises(GenerationCancelledError):
+        _drain(router, SLOW, failing(GenerationCancelledError()))
+
+    stats = router.snapshot()
+    assert stats[FAST]["error_rate"] == 1.0
+    assert stats[SLOW]["samples"] == 0
+
+
+@pytest.fixture
+def routed_to_openai(monkeypatch):
+    monkeypatch.setattr(settings, "routing_classes", {"fast-drafting": ["openai:gpt-4o"]})
+    monkeypatch.setattr(settings, "openai_api_key", "sk-server")
+    monkeypatch.setattr(settings, "story_memory_model", None)
+    monkeypatch.setattr(settings, "lore_compaction_model", None)
+
+
+def test_story_memory_runs_on_the_routed_provider(routed_to_openai):
+    request = GenerateRequest(text="Once.", provider="auto", model="fast-drafting", story_memory=True)
+    provider = get_provider(provider_name="auto", model="fast-drafting")
+
+    memory = generate_api._story_memory(request, provider)
+
+    assert memory.summarizer.provider.name == "openai"
+    assert memory.summarizer.provider.model == DEFAULT_MODELS["openai"]
+
+
+def test_lore_compaction_runs_on_the_routed_provider(routed_to_openai, monkeypatch, fake_provider):
+    calls = []
+
+    def fake_get_provider(**kwargs):
+        calls.append(kwargs)
+        return fake_provider("Merged.")
+
+    monkeypatch.setattr(lore_api, "get_provider", fake_get_provider)
+    lore = [{"category": "place", "text": "A quiet harbour town."}]
+
+    response = TestClient(app).post("/lore/compact", json={"lore": lore, "provider": "auto", "model": "fast-drafting"})
+
+    assert response.status_code == 200
+    assert calls == [{"provider_name": "openai", "api_key": None, "model": DEFAULT_MODELS["openai"]}]
@@ -0,0 +1,261 @@
+import json
+import threading
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.api import generate as generate_api
+from app.config import settings
+from app.core import speculation as speculation_module
+from app.core.speculation import SpeculationManager, speculation_key
+from app.main import app
+
+CLIENT = "10.0.0.1"
+
+
+class Clock:
+    """Stands in for the time module, so the hourly budget and TTL can be skipped ahead."""
+
+    def __init__(self):
+        self.now = 1_000.0
+
+    def monotonic(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(speculation_module, "time", clock)
+    return clock
+
+
+def _manager(ttl: float = 120.0, tokens: int = 1_000) -> SpeculationManager:
+    return SpeculationManager(max_per_client=2, max_global=4, tokens_per_client_per_hour=tokens, ttl_seconds=ttl)
+
+
+def _stream(*chunks):
+    return lambda: (chunk for chunk in chunks)
+
+
+def _blocking(release: threading.Event):
+    def stream():
+        release.wait(5)
+        yield "late"
+    return stream
+
+
+def _wait_buffered(manager: SpeculationManager, count: int = 1) -> None:
+    deadline = time.monotonic() + 5
+    while manager.snapshot()["buffered"] < count and time.monotonic() < deadline:
+        time.sleep(0.005)
+
+
+def test_claim_replays_the_matching_run():
+    manager = _manager()
+    assert manager.start(CLIENT, "k", _stream("Once ", "more."), tokens=100) == (True, None)
+    _wait_buffered(manager)
+
+    run = manager.claim(CLIENT, "k")
+
+    assert "".join(run.chunks()) == "Once more."
+    assert manager.claim(CLIENT, "k") is None
+    assert manager.snapshot()["hits"] == 1
+
+
+def test_claim_follows_a_run_still_in_progress():
+    manager = _manager()
+    release = threading.Event()
+    manager.start(CLIENT, "k", _blocking(release), tokens=100)
+
+    run = manager.claim(CLIENT, "k")
+    release.set()
+
+    assert list(run.chunks()) == ["late"]
+
+
+def test_claim_with_another_key_misses_and_drops_stale_runs():
+    manager = _manager()
+    manager.start(CLIENT, "old", _stream("Stale."), tokens=100)
+    _wait_buffered(manager)
+
+    assert manager.claim(CLIENT, "new") is None
+    assert manager.claim(CLIENT, "old") is None
+    snapshot = manager.snapshot()
+    assert (snapshot["misses"], snapshot["buffered"]) == (1, 0)
+
+
+def test_runs_are_per_client():
+    manager = _manager()
+    manager.start(CLIENT, "k", _stream("Mine."), tokens=100)
+    _wait_buffered(manager)
+
+    assert manager.claim("10.0.0.2", "k") is None
+    assert "".join(manager.claim(CLIENT, "k").chunks()) == "Mine."
+
+
+def test_starting_the_same_key_twice_is_one_run():
+    manager = _manager()
+    release = threading.Event()
+    assert manager.start(CLIENT, "k", _blocking(release), tokens=100) == (True, None)
+    assert manager.start(CLIENT, "k", _blocking(release), tokens=100) == (True, "already running")
+    release.set()
+
+    assert manager.snapshot()["started"] == 1
+
+
+def test_new_text_cancels_the_previous_run():
+    manager = _manager()
+    release = threading.Event()
+    manager.start(CLIENT, "first", _blocking(release), tokens=100)
+    manager.start(CLIENT, "second", _stream("Fresh."), tokens=100)
+    release.set()
+    _wait_buffered(manager)
+
+    assert manager.snapshot()["cancelled"] == 1
+    assert "".join(manager.claim(CLIENT, "second").chunks()) == "Fresh."
+    assert manager.claim(CLIENT, "first") is None
+
+
+def test_concurrency_limit_counts_cancelled_runs_until_they_stop():
+    manager = _manager()
+    release = threading.Event()
+    manager.start(CLIENT, "a", _blocking(release), tokens=100)
+    manager.start(CLIENT, "b", _blocking(release), tokens=100)
+
+    assert manager.start(CLIENT, "c", _stream("x"), tokens=100) == (False, "concurrency limit reached")
+
+    # Both runs were cancelled; once their threads stop the client may start again
+    release.set()
+    deadline = time.monotonic() + 5
+    while manager.start(CLIENT, "c", _stream("x"), tokens=100) != (True, None):
+        assert time.monotonic() < deadline
+        time.sleep(0.005)
+
+
+def test_token_budget_is_hourly(clock):
+    manager = _manager(tokens=250)
+    manager.start(CLIENT, "a", _stream("x"), tokens=100)
+    manager.start(CLIENT, "b", _stream("x"), tokens=100)
+
+    assert manager.start(CLIENT, "c", _stream("x"), tokens=100) == (False, "hourly speculative token budget exhausted")
+
+    clock.now += 3601
+    assert manager.start(CLIENT, "c", _stream("x"), tokens=100) == (True, None)
+    assert manager.snapshot()["rejected"] == 1
+
+
+def test_unclaimed_runs_expire(clock):
+    manager = _manager(ttl=60)
+    manager.start(CLIENT, "k", _stream("Unclaimed."), tokens=100)
+    _wait_buffered(manager)
+
+    clock.now += 61
+    assert manager.claim(CLIENT, "k") is None
+    assert manager.snapshot()["expired"] == 1
+
+
+def test_clients_that_never_return_are_swept(clock, monkeypatch):
+    monkeypatch.setattr(speculation_module, "_SWEEP_INTERVAL_SECONDS", 30.0)
+    manager = _manager(ttl=60)
+    manager.start(CLIENT, "k", _stream("Unclaimed."), tokens=100)
+    _wait_buffered(manager)
+
+    clock.now += 61
+    manager.start("10.0.0.2", "k", _stream("Other."), tokens=100)
+
+    assert manager.snapshot()["expired"] == 1
+
+
+def test_cancel_client_and_session():
+    manager = _manager()
+    release = threading.Event()
+    manager.start(CLIENT, "a", _blocking(release), tokens=100)
+    manager.start("10.0.0.2", "b", _blocking(release), tokens=100, session_id="story")
+
+    assert manager.cancel_client(CLIENT) == 1
+    manager.cancel_session("story")
+    release.set()
+
+    assert manager.claim(CLIENT, "a") is None
+    assert manager.claim("10.0.0.2", "b") is None
+    assert manager.snapshot()["active"] == 0
+
+
+def test_failed_runs_are_not_served():
+    manager = _manager()
+
+    def failing():
+        yield "Half"
+        raise RuntimeError("upstream failed")
+
+    manager.start(CLIENT, "k", failing, tokens=100)
+    _wait_buffered(manager)
+
+    assert manager.claim(CLIENT, "k") is None
+
+
+def test_key_covers_everything_that_changes_the_output():
+    base = ("Once.", None, "openai", "gpt-4o", None, 100, None)
+    variants = [
+        ("Once more.", None, "openai", "gpt-4o", None, 100, None),
+        ("Once.", [{"category": "place", "text": "A harbour."}], "openai", "gpt-4o", None, 100, None),
+        ("Once.", None, "xai", "gpt-4o", None, 100, None),
+        ("Once.", None, "openai", "gpt-4.1", None, 100, None),
+        ("Once.", None, "openai", "gpt-4o", "Darker.", 100, None),
+        ("Once.", None, "openai", "gpt-4o", None, 200, None),
+        ("Once.", None, "openai", "gpt-4o", None, 100, True),
+    ]
+    keys = {speculation_key(*params) for params in [base, *variants]}
+    assert len(keys) == len(variants) + 1
+    assert speculation_key(*base) == speculation_key(*base)
+
+
+@pytest.fixture
+def speculating(monkeypatch, fake_provider, fresh_rate_limits):
+    """Speculation on, with a fresh manager and a fake provider behind the endpoints."""
+    manager = _manager()
+    monkeypatch.setattr(settings, "speculation_enabled", True)
+    monkeypatch.setattr(generate_api, "speculation", manager)
+    monkeypatch.setattr(generate_api, "_get_provider", lambda *args, **kwargs: fake_provider("The tide turned."))
+    return manager
+
+
+def _texts(body: str) -> str:
+    return "".join(json.loads(line[6:])["text"] for line in body.splitlines() if line.startswith("data: {"))
+
+
+def test_stream_is_served_from_a_matching_speculation(speculating):
+    client = TestClient(app)
+    request = {"text": "Once.", "provider": "openai", "word_count": 50}
+
+    assert client.post("/generate/next/speculate", json=request).json() == {"started": True, "reason": None}
+    _wait_buffered(speculating)
+    response = client.post("/generate/next/stream", json=request)
+
+    assert response.headers["X-Speculation"] == "hit"
+    assert _texts(response.text) == "The tide turned. "
+
+
+@pytest.mark.parametrize("change", [{"text": "Once more."}, {"word_count": 80}, {"story_memory": False}])
+def test_stream_misses_when_the_request_changed(speculating, change):
+    client = TestClient(app)
+    request = {"text": "Once.", "provider": "openai", "word_count": 50}
+
+    client.post("/generate/next/speculate", json=request)
+    _wait_buffered(speculating)
+    response = client.post("/generate/next/stream", json={**request, **change})
+
+    assert response.headers["X-Speculation"] == "miss"
+    assert _texts(response.text) == "The tide turned. "
+    assert speculating.snapshot()["misses"] == 1
+
+
+def test_speculate_is_off_unless_enabled(speculating, monkeypatch):
+    monkeypatch.setattr(settings, "speculation_enabled", False)
+    client = TestClient(app)
+    request = {"text": "Once.", "provider": "openai"}
+
+    assert client.post("/generate/next/speculate", json=request).json()["started"] is False
+    assert "X-Speculation" not in client.post("/generate/next/stream", json=request).headers
@@ -0,0 +1,63 @@
+import io
+import json
+
+import pytest
+import requests
+import urllib3
+
+from app.providers.sse import iter_sse_data, iter_sse_json
+
+
+def _pieces(body: bytes, size: int):
+    for start in range(0, len(body), size):
+        yield body[start:start + size]
+
+
+def _response(body: bytes) -> requests.Response:
+    response = requests.Response()
+    response.status_code = 200
+    response.raw = urllib3.HTTPResponse(body=io.BytesIO(body), preload_content=False, decode_content=False)
+    return response
+
+
+def _event(content: str) -> str:
+    return "data: " + json.dumps({"choices": [{"delta": {"content": content}}]}, ensure_ascii=False) + "\n\n"
+
+
+@pytest.mark.parametrize("size", range(1, 17))
+def test_multibyte_characters_split_across_reads(size):
+    words = ["café ", "Åsa ", "三枚 ", "🌙"]
+    body = "".join(_event(word) for word in words).encode()
+
+    payloads = iter_sse_data(_pieces(body, size))
+
+    assert [json.loads(payload)["choices"][0]["delta"]["content"] for payload in payloads] == words
+
+
+def test_crlf_line_endings():
+    body = b'data: {"a": 1}\r\n\r\ndata: {"a": 2}\r\n\r\n'
+    assert list(iter_sse_data(_pieces(body, 5))) == [b'{"a": 1}', b'{"a": 2}']
+
+
+def test_multi_line_data_is_joined():
+    body = b"data: first\ndata:second\ndata:  third\n\n"
+    assert list(iter_sse_data([body])) == [b"first\nsecond\n third"]
+
+
+def test_comment_event_and_id_lines_are_skipped():
+    body = b": keep-alive\n\nevent: message\nid: 7\ndata: {}\nretry: 100\n\n: ping\n\n"
+    assert list(iter_sse_data([body])) == [b"{}"]
+
+
+def test_last_event_without_a_blank_line():
+    assert list(iter_sse_data([b"data: one\n\ndata: two"])) == [b"one", b"two"]
+
+
+def test_json_events_stop_at_done():
+    body = (_event("Once ") + "data: [DONE]\n\n" + _event("after")).encode()
+    assert list(iter_sse_json(_response(body), size=7)) == [{"choices": [{"delta": {"content": "Once "}}]}]
+
+
+def test_malformed_json_is_skipped():
+    body = ('data: {"choices": [\n\n' + _event("kept") + "data: [DONE]\n\n").encode()
+    assert [event["choices"][0]["delta"]["content"] for event in iter_sse_json(_response(body))] == ["kept"]
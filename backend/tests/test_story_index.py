@@ -0,0 +1,116 @@
+import random
+
+import pytest
+
+from app.core.story_sessions import StorySessionStore
+from app.schema.session import StoryDelta
+from app.text_generation.generator_between import TextGeneratorBetween
+from app.text_generation.generator_summary import TextGeneratorSummary
+from app.text_generation.story_index import StoryIndex
+from app.text_generation.story_memory import StoryMemory, SummaryCache
+
+
+def _fields(index: StoryIndex) -> tuple:
+    return index.starts, index.ends, index.words, index.headings, index.checksums
+
+
+@pytest.fixture
+def scanned(monkeypatch):
+    """Paragraph texts the index scans, in order."""
+    paragraphs = []
+    add = StoryIndex._add
+
+    def record(self, start, end):
+        paragraphs.append(self.text[start:end])
+        add(self, start, end)
+
+    monkeypatch.setattr(StoryIndex, "_add", record)
+    return paragraphs
+
+
+def _story(paragraphs: int) -> str:
+    return "".join(f"Paragraph {i} goes on a while.\n\n" for i in range(paragraphs))
+
+
+def test_edits_match_a_full_rebuild():
+    rng = random.Random(7)
+    pieces = ["a", "b c", " ", "\n", "\n\n", "  \n", "Chapter 2\n"]
+    for _ in range(500):
+        text = "".join(rng.choice(pieces) for _ in range(rng.randint(0, 20)))
+        index = StoryIndex(text)
+        for _ in range(4):
+            offset = rng.randint(0, len(text))
+            delete = rng.randint(0, len(text) - offset)
+            insert = "".join(rng.choice(pieces) for _ in range(rng.randint(0, 3)))
+            index = index.edit(offset, delete, insert)
+            text = text[:offset] + insert + text[offset + delete:]
+            assert index.text == text
+            assert _fields(index) == _fields(StoryIndex(text))
+
+            end = rng.randint(0, len(text))
+            assert _fields(index.prefix(text[:end])) == _fields(StoryIndex(text[:end]))
+
+
+def test_session_index_is_carried_across_edits(scanned):
+    store = StorySessionStore(max_chars=100_000, max_sessions=10)
+    session = store.create(_story(100))
+    assert len(session.index) == 100
+    assert len(scanned) == 100
+
+    scanned.clear()
+    offset = session.text.index("Paragraph 50") + len("Paragraph 50")
+    session = store.apply_deltas(session.session_id, session.hash, [
+        StoryDelta(offset=offset, delete=0, insert=" (revised)"),
+        StoryDelta(offset=0, delete=0, insert="Chapter 1\n\n"),
+    ])
+
+    # Only the paragraphs the edits landed in were re-scanned
+    assert scanned == ["Paragraph 50 (revised) goes on a while.", "Chapter 1", "Paragraph 0 goes on a while."]
+    assert _fields(session.index) == _fields(StoryIndex(session.text))
+
+
+def test_session_is_not_indexed_until_used(scanned):
+    store = StorySessionStore(max_chars=100_000, max_sessions=10)
+    session = store.create(_story(10))
+    session = store.apply_deltas(session.session_id, session.hash, [StoryDelta(offset=0, delete=0, insert="New. ")])
+
+    assert scanned == []
+    assert session.index.text == session.text
+
+
+def test_between_indexes_the_story_once(scanned, fake_provider):
+    text = _story(200)
+    memory = StoryMemory(TextGeneratorSummary(fake_provider("Summary.")), window_chars=1_000, block_words=50, cache=SummaryCache(100))
+    generator = TextGeneratorBetween(fake_provider(), memory)
+    position = text.index("Paragraph 150")
+
+    messages = generator._build_messages(text, "", 100, position)
+
+    assert len(scanned) == 200
+    assert "Paragraph 149" in messages[1]["content"]
+    assert "Summary." in messages[0]["content"]
+
+
+def test_memory_reuses_the_session_index(scanned, fake_provider):
+    store = StorySessionStore(max_chars=100_000, max_sessions=10)
+    session = store.create(_story(200))
+    session.index
+    scanned.clear()
+
+    memory = StoryMemory(TextGeneratorSummary(fake_provider("Summary.")), window_chars=1_000, block_words=50,
+                         cache=SummaryCache(100), index=session.index)
+    summary, recent = memory.condense(session.text)
+
+    assert scanned == []
+    assert summary
+    assert recent.endswith("Paragraph 199 goes on a while.\n\n")
+
+
+def test_window_after_keeps_whole_paragraphs():
+    text = "One two.\n\nThree four.\n\nFive six."
+    index = StoryIndex(text)
+
+    assert index.window_after(0, 15) == len("One two.")
+    assert index.window_after(0, 25) == len("One two.\n\nThree four.")
+    assert index.window_after(0, 4) == 4
+    assert index.window_after(10, 100) == len(text)
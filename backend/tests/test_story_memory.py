@@ -0,0 +1,95 @@
+import pytest
+
+from app.providers.base import LLMProvider
+from app.providers.routing import model_router
+from app.text_generation.generator_summary import TextGeneratorSummary
+from app.text_generation.story_index import StoryIndex
+from app.text_generation.story_memory import StoryMemory, SummaryCache, split_blocks
+
+
+class Summarizer(LLMProvider):
+    """Summarizes a chapter as "S<number>" and merges summaries as "M(a+b)"."""
+
+    name = "fake"
+    model = "summary-model"
+
+    def __init__(self):
+        self.calls = []
+
+    def generate(self, messages: list[dict], temperature: float, max_tokens: int) -> str:
+        content = messages[1]["content"]
+        self.calls.append(content)
+        if messages[0]["content"].startswith("You are a story continuity assistant. Merge"):
+            return "M(" + "+".join(content.split("\n\n")) + ")"
+        return "S" + content.split()[1]
+
+    def stream(self, messages: list[dict], temperature: float, max_tokens: int):
+        yield self.generate(messages, temperature, max_tokens)
+
+
+def _chapters(count: int, body: str = "The tide came in over the flats again.") -> list[str]:
+    return [f"Chapter {i}\n\n{body} {body}\n\n" for i in range(count)]
+
+
+@pytest.fixture
+def summarizer():
+    return Summarizer()
+
+
+def _memory(summarizer: Summarizer) -> StoryMemory:
+    return StoryMemory(
+        TextGeneratorSummary(summarizer), window_chars=150, block_words=1_000, fanout=2, cache=SummaryCache(100),
+    )
+
+
+def test_blocks_start_at_chapter_headings():
+    text = "".join(_chapters(3))
+    starts = [start for start, _ in split_blocks(StoryIndex(text), block_words=1_000)]
+    assert starts == [text.index(f"Chapter {i}") for i in range(3)]
+
+
+def test_blocks_after_an_edit_are_unchanged():
+    text = "".join(f"Paragraph {i} has a handful of words in it.\n\n" for i in range(200))
+    blocks = split_blocks(StoryIndex(text), block_words=60)
+    assert all(text[start:end].count("Paragraph") < 20 for start, end in blocks)
+
+    edited = text.replace("Paragraph 3 has", "Paragraph 3 now has", 1)
+    edited_blocks = split_blocks(StoryIndex(edited), block_words=60)
+
+    assert [edited[start:end] for start, end in edited_blocks[1:]] == [text[start:end] for start, end in blocks[1:]]
+
+
+def test_older_summaries_are_rolled_up_in_fanout_groups(summarizer):
+    chapters = _chapters(8)
+    summary, recent = _memory(summarizer).condense("".join(chapters))
+
+    # Chapters 0-5 are summarized; groups of two of the older ones are merged
+    assert summary.split("\n\n") == ["M(S0+S1)", "M(S2+S3)", "S4", "S5"]
+    assert recent == "".join(chapters[6:])
+
+
+def test_deeper_levels_merge_merged_summaries(summarizer):
+    summary, _ = _memory(summarizer).condense("".join(_chapters(12)))
+    assert summary.split("\n\n") == ["M(M(S0+S1)+M(S2+S3))", "M(S4+S5)", "M(S6+S7)", "S8", "S9"]
+
+
+def test_unchanged_blocks_are_cache_hits(summarizer):
+    memory = _memory(summarizer)
+    chapters = _chapters(8)
+    memory.condense("".join(chapters))
+    first_calls = len(summarizer.calls)
+
+    summarizer.calls.clear()
+    memory.condense("".join(chapters))
+    assert summarizer.calls == []
+
+    chapters[4] = chapters[4].replace("tide", "storm")
+    memory.condense("".join(chapters))
+    assert summarizer.calls == [chapters[4]]
+    assert first_calls == 8  # Six chapters and two merges
+
+
+def test_summaries_are_tracked_like_other_calls(summarizer):
+    before = model_router.snapshot().get("fake:summary-model", {}).get("samples", 0)
+    _memory(summarizer).condense("".join(_chapters(8)))
+    assert model_router.snapshot()["fake:summary-model"]["samples"] - before == len(summarizer.calls)
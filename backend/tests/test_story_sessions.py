@@ -0,0 +1,98 @@
+import pytest
+from fastapi.testclient import TestClient
+from pydantic import ValidationError
+
+from app.core.exceptions import InvalidRequestError, SessionConflictError, SessionNotFoundError
+from app.core.story_sessions import StorySessionStore, story_hash
+from app.main import app
+from app.schema.generation import BulkImagePromptRequest, GenerateRequest
+from app.schema.session import StoryDelta
+
+
+def _store(max_chars: int = 1_000, max_sessions: int = 10) -> StorySessionStore:
+    return StorySessionStore(max_chars=max_chars, max_sessions=max_sessions)
+
+
+def test_deltas_are_applied_in_order():
+    store = _store()
+    session = store.create("The cat sat.")
+
+    session = store.apply_deltas(session.session_id, session.hash, [
+        StoryDelta(offset=4, delete=3, insert="dog"),
+        StoryDelta(offset=11, insert=" down"),
+        StoryDelta(offset=0, delete=4),
+    ])
+
+    assert session.text == "dog sat down."
+    assert session.hash == story_hash("dog sat down.")
+    assert store.get(session.session_id, session.hash).text == "dog sat down."
+
+
+def test_stale_hash_is_a_conflict():
+    store = _store()
+    session = store.create("The cat sat.")
+    edited = store.apply_deltas(session.session_id, session.hash, [StoryDelta(offset=0, insert="Then ")])
+
+    with pytest.raises(SessionConflictError) as conflict:
+        store.apply_deltas(session.session_id, session.hash, [StoryDelta(offset=0, insert="So ")])
+    assert conflict.value.headers["X-Story-Hash"] == edited.hash
+    with pytest.raises(SessionConflictError):
+        store.get(session.session_id, session.hash)
+    assert store.get(session.session_id).text == "Then The cat sat."
+
+
+def test_delta_outside_the_story_is_rejected_without_changes():
+    store = _store()
+    session = store.create("Short.")
+
+    with pytest.raises(InvalidRequestError):
+        store.apply_deltas(session.session_id, session.hash, [
+            StoryDelta(offset=0, insert="A "),
+            StoryDelta(offset=7, delete=10),
+        ])
+    assert store.get(session.session_id, session.hash).text == "Short."
+
+
+def test_least_recently_used_session_is_evicted_by_count():
+    store = _store(max_sessions=2)
+    first, second = store.create("one"), store.create("two")
+    store.get(first.session_id)
+
+    store.create("three")
+
+    assert store.get(first.session_id).text == "one"
+    with pytest.raises(SessionNotFoundError):
+        store.get(second.session_id)
+
+
+def test_least_recently_used_sessions_are_evicted_by_chars():
+    store = _store(max_chars=25)
+    first, second, third = store.create("a" * 10), store.create("b" * 10), store.create("c" * 5)
+    store.apply_deltas(first.session_id, first.hash, [StoryDelta(offset=0, insert="a")])
+
+    # 11 + 10 + 5 + 8 chars: the least recently used, second, has to go
+    fourth = store.create("d" * 8)
+
+    with pytest.raises(SessionNotFoundError):
+        store.get(second.session_id)
+    assert [len(store.get(s.session_id).text) for s in (first, third, fourth)] == [11, 5, 8]
+
+
+def test_story_larger_than_the_limit_is_rejected():
+    store = _store(max_chars=10)
+    with pytest.raises(InvalidRequestError):
+        store.create("x" * 11)
+
+
+@pytest.mark.parametrize("model", [GenerateRequest, BulkImagePromptRequest])
+def test_requests_need_text_or_a_session(model):
+    extra = {"ranges": []} if model is BulkImagePromptRequest else {}
+    with pytest.raises(ValidationError):
+        model(**extra)
+    assert model(text="", **extra).text == ""
+    assert model(session_id="abc", **extra).session_id == "abc"
+
+
+def test_generation_without_text_or_session_is_rejected(fresh_rate_limits):
+    response = TestClient(app).post("/generate/next", json={"provider": "openai"})
+    assert response.status_code == 422
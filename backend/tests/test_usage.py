@@ -0,0 +1,128 @@
+import pytest
+from fastapi.testclient import TestClient
+
+from app.api import usage as usage_api
+from app.config import settings
+from app.core import usage
+from app.core.usage import UsageLedger
+from app.main import app
+from app.providers import base
+from app.providers.openai_compatible import OpenAICompatibleProvider
+from openai_standin import REPLY
+
+MESSAGES = [{"role": "user", "content": "Tell me a story about a lighthouse."}]
+
+
+@pytest.fixture
+def ledger(tmp_path):
+    ledger = UsageLedger(str(tmp_path / "usage.db"), batch_size=3, flush_interval=60.0)
+    yield ledger
+    ledger.close()
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Sets the timestamp rows are recorded with."""
+    now = [1_000.0]
+    monkeypatch.setattr(usage.time, "time", lambda: now[0])
+    return now
+
+
+def _record(ledger, clock, ts, provider, model, tokens, user="server", endpoint="next", cached=0):
+    clock[0] = ts
+    ledger.record(provider, model, tokens, tokens // 2, cached, user=user, endpoint=endpoint)
+
+
+def test_rows_are_written_in_batches(ledger):
+    for _ in range(3):
+        ledger.record("xai", "grok", 10, 5)
+    # A full batch is written without waiting for the flush interval
+    for _ in range(100):
+        if ledger.report([]):
+            break
+        usage.time.sleep(0.01)
+    assert ledger.report([]) == [
+        {"requests": 3, "input_tokens": 30, "output_tokens": 15, "cached_tokens": 0, "estimated_requests": 0}
+    ]
+
+
+def test_close_flushes_a_partial_batch(ledger):
+    ledger.record("xai", "grok", 10, 5)
+    ledger.close()
+    assert ledger.report(["model"])[0]["requests"] == 1
+
+
+def test_report_groups_and_filters_by_time(ledger, clock):
+    _record(ledger, clock, 100.0, "xai", "grok", 100, user="a")
+    _record(ledger, clock, 200.0, "openai", "gpt", 10, user="a", endpoint="between")
+    _record(ledger, clock, 300.0, "openai", "gpt", 20, user="b")
+    ledger.close()
+
+    assert ledger.report(["provider"]) == [
+        {"provider": "xai", "requests": 1, "input_tokens": 100, "output_tokens": 50, "cached_tokens": 0, "estimated_requests": 0},
+        {"provider": "openai", "requests": 2, "input_tokens": 30, "output_tokens": 15, "cached_tokens": 0, "estimated_requests": 0},
+    ]
+    assert [(row["user"], row["endpoint"]) for row in ledger.report(["user", "endpoint"])] == [
+        ("a", "next"), ("b", "next"), ("a", "between"),
+    ]
+    assert [row["input_tokens"] for row in ledger.report([], since=200.0)] == [30]
+    assert [row["input_tokens"] for row in ledger.report([], until=200.0)] == [100]
+    assert [row["input_tokens"] for row in ledger.report([], since=200.0, until=300.0)] == [10]
+    assert ledger.report([], since=400.0) == []
+
+
+def test_rows_past_the_backlog_limit_are_dropped(tmp_path):
+    ledger = UsageLedger(str(tmp_path / "usage.db"), max_pending=0)
+    ledger.record("xai", "grok", 10, 5)
+    assert ledger.dropped == 1
+
+
+def test_disabled_ledger_records_nothing():
+    ledger = UsageLedger(None)
+    ledger.record("xai", "grok", 10, 5)
+    assert ledger._writer is None
+
+
+def test_cost_is_rolled_up_per_model(ledger, clock, monkeypatch):
+    monkeypatch.setattr(usage_api, "usage_ledger", ledger)
+    monkeypatch.setattr(settings, "model_prices", {"gpt": {"input": 1.0, "output": 2.0, "cached": 0.5}})
+    _record(ledger, clock, 100.0, "openai", "gpt", 1_000_000, cached=200_000)
+    _record(ledger, clock, 100.0, "openai", "gpt-unpriced", 10)
+    _record(ledger, clock, 100.0, "xai", "grok", 10)
+    ledger.close()
+
+    response = TestClient(app).get("/usage", params={"group_by": "provider"})
+
+    rows = {row["provider"]: row for row in response.json()["rows"]}
+    # One model without a price makes the provider's total unknown
+    assert rows["openai"]["cost_usd"] is None
+    assert rows["openai"]["requests"] == 2
+    assert rows["xai"]["cost_usd"] is None
+
+    response = TestClient(app).get("/usage", params={"group_by": "model"})
+    rows = {row["model"]: row for row in response.json()["rows"]}
+    # 800k input at $1, 200k cached at $0.5, 500k output at $2 per million
+    assert rows["gpt"]["cost_usd"] == 0.8 + 0.1 + 1.0
+
+
+def test_unknown_group_column_is_rejected(ledger, monkeypatch):
+    monkeypatch.setattr(usage_api, "usage_ledger", ledger)
+    assert TestClient(app).get("/usage", params={"group_by": "ts"}).status_code == 422
+
+
+def test_stream_closed_before_usage_is_estimated(ledger, standin_server, monkeypatch):
+    monkeypatch.setattr(base, "usage_ledger", ledger)
+    provider = OpenAICompatibleProvider(standin_server.base_url, model="tiny-llama")
+    provider.name = "openai-compatible"
+
+    stream = provider.stream(MESSAGES, temperature=0.7, max_tokens=50)
+    assert next(stream) == "Héllo "
+    stream.close()
+    "".join(provider.stream(MESSAGES, temperature=0.7, max_tokens=50))
+    ledger.close()
+
+    # The closed stream is estimated from characters; the finished one has the server's usage
+    assert ledger.report(["model"]) == [{
+        "model": "tiny-llama", "requests": 2, "input_tokens": len(MESSAGES[0]["content"]) // 4 + 10,
+        "output_tokens": len(REPLY[0]) // 4 + len(REPLY), "cached_tokens": 0, "estimated_requests": 1,
+    }]